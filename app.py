@@ -1,13 +1,26 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, send_from_directory, jsonify, Response, stream_with_context
+from flask import Flask, render_template, request, redirect, url_for, flash, send_from_directory, send_file, jsonify, Response, stream_with_context, g
 import os
-import pandas as pd
+import re
+import json
+import time
+import zipfile
+import tempfile
+from markupsafe import Markup, escape
 from werkzeug.utils import secure_filename
-from services.youtube_service import fetch_channel_videos_generator
+from services.youtube_service import fetch_channel_videos_generator, MAX_CONCURRENT_CHANNELS, SYNC_MODES
+from services.quota_scheduler import DAILY_QUOTA_UNITS
+from services.export_service import EXPORT_FORMATS
+from services.filter_service import VideoFilters
 import services.browser_service as browser_service
+from services import catalog_service, completion_service, job_service, metrics, transcript_service
 
 from flask_cors import CORS
-import json
-from datetime import datetime
+from services.log_store import LogStore, migrate_json_log, filters_from_args, LOG_PAGE_SIZE, MAX_LOG_PAGE_SIZE
+from services.download_registry import DownloadRegistry, REGISTRY_PATH, transcript_file_name
+from services.corpus_store import (CorpusStore, TranscriptIngester, to_fts_query, CORPUS_PATH, SEARCH_PAGE_SIZE,
+                                   MAX_SEARCH_PAGE_SIZE, DELETE_INGESTED_FILES)
+from services.progress_stream import stream_progress, choose_format, MIMETYPES, PROGRESS_FORMATS, ONE_SHOT_FORMATS
+from services.sheet_cache import SheetCache, parse_row_ranges, SHEET_PAGE_SIZE, MAX_SHEET_PAGE_SIZE
 
 app = Flask(__name__)
 # Enable CORS for all routes to allow Tampermonkey (from youtube.com) to call us
@@ -16,26 +29,131 @@ CORS(app)
 app.secret_key = 'supersecretkey'  # Change this for production
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['STATIC_FOLDER'] = 'static'
-app.config['LOG_FILE'] = 'download_logs.json'
+app.config['LOG_FILE'] = 'download_logs.json'  # Old log format, imported into LOG_DB on start-up
+app.config['LOG_DB'] = 'download_logs.db'
 
 # Ensure directories exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['STATIC_FOLDER'], exist_ok=True)
 
+log_store = LogStore(app.config['LOG_DB'])
+migrate_json_log(log_store, app.config['LOG_FILE'])
+
+# Videos whose transcript is already downloaded; browser runs skip them
+download_registry = DownloadRegistry(REGISTRY_PATH)
+if not len(download_registry):
+    download_registry.add_many([(video_id, None, None) for video_id in log_store.successful_video_ids()], "log")
+
+# Uploaded spreadsheets, parsed once and paged from a sidecar (see /process)
+sheet_cache = SheetCache()
+
+# Transcript download backends: Chrome + userscript, or direct caption requests
+ENGINES = ("browser", "http")
+
+# Worker threads of the production server (see run_server); each open
+# progress stream holds one for as long as the client watches
+SERVER_THREADS = 256
+
+# Seconds waitress keeps an idle keep-alive connection open between requests
+STREAM_CHANNEL_TIMEOUT = 120
+
+def run_videos(video_urls, engine="browser", chromedriver_path=None, refresh_profile=False, **options):
+    if engine == "http":
+        return transcript_service.fetch_transcripts_generator(
+            video_urls, registry=download_registry, report=record_report, **options)
+    return browser_service.open_videos_generator(
+        video_urls, chromedriver_path=chromedriver_path, refresh_profile=refresh_profile,
+        registry=download_registry, **options)
+
+# Browser automation runs as persistent jobs (see /jobs)
+job_store = job_service.JobStore(job_service.JOBS_PATH)
+job_manager = job_service.JobManager(job_store, run_videos)
+
+def submit_job(video_urls, options):
+    if options.get('download_dir'):
+        corpus.add_folder(options['download_dir'])  # its transcripts go into the corpus
+    return job_manager.submit(video_urls, options)
+
+# Downloaded transcript files are copied into a searchable corpus (see /search)
+corpus = CorpusStore(CORPUS_PATH)
+
+def resolve_transcript(file_name):
+    """Metadata for a transcript file: its videoId (from the registry) joined to the fetched catalog."""
+    video_id = download_registry.video_for_file(file_name)
+    if not video_id:
+        return None
+    row = catalog_service.get_videos([video_id]).get(video_id, {})
+    published = row.get('Published Date')
+    return {
+        "video_id": video_id,
+        "title": row.get('Video Title') or file_name[:-len("_transcript.txt")],
+        "channel_id": row.get('channel_id'),
+        "channel": row.get('Channel'),
+        "published_at": published.isoformat() if published else None,
+    }
+
+def record_ingested(records):
+    download_registry.add_many([(r['video_id'], r.get('title'), r['file_name'])
+                                for r in records if r.get('video_id')], "corpus")
+
+# Only folders the user chose are watched: a job's download_dir or /api/corpus/folders
+corpus_ingester = TranscriptIngester(corpus, resolve_transcript, keep_files=not DELETE_INGESTED_FILES,
+                                     on_ingested=record_ingested)
+
+def start_background_work():
+    # Picks up jobs left by a restart and watches the download folders;
+    # no-op after the first call
+    job_manager.resume_unfinished()
+    corpus_ingester.start()
+
+@app.before_request
+def resume_jobs():
+    # Under the debug reloader (or another WSGI host) only the process that
+    # serves requests should do this, not the reloader's watcher process
+    start_background_work()
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    # Labelled by route pattern, not path, so video IDs do not become label values
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+    if 'request_started' in g:
+        metrics.HTTP_REQUEST_SECONDS.observe(time.perf_counter() - g.request_started, route=route)
+    return response
+
+# Current state, read when /metrics is scraped
+metrics.REGISTRY.callback("downloaded_videos", "Videos in the download registry.", lambda: len(download_registry))
+metrics.REGISTRY.callback("jobs", "Download jobs by status.",
+                          lambda: {(status,): n for status, n in job_store.count_by_status().items()}, ("status",))
+metrics.REGISTRY.callback("browser_pool_browsers", "Pooled browsers running (leased or idle) and idle.",
+                          lambda: {(state,): browser_service.browser_pool.snapshot()[state]
+                                   for state in ("running", "idle")}, ("state",))
+metrics.REGISTRY.callback("browser_pool_events_total", "Browser pool events since start-up.",
+                          lambda: {(event,): browser_service.browser_pool.snapshot()[event]
+                                   for event in ("launched", "reused", "recycled", "crashed", "expired")},
+                          ("event",), kind="counter")
+
+@app.route('/metrics')
+def prometheus_metrics():
+    # Prometheus text exposition format
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
 def append_log(data):
-    logs = []
-    if os.path.exists(app.config['LOG_FILE']):
-        try:
-            with open(app.config['LOG_FILE'], 'r') as f:
-                logs = json.load(f)
-        except:
-            logs = []
-            
-    data['timestamp'] = datetime.now().isoformat()
-    logs.append(data)
-    
-    with open(app.config['LOG_FILE'], 'w') as f:
-        json.dump(logs, f, indent=4)
+    return log_store.append(data)
+
+def record_report(data):
+    """Handles a download report, from the userscript (/api/log) or the HTTP engine."""
+    entry = append_log(data)
+    # SKIPPED means the userscript already had the video downloaded
+    if entry.get('status') in ('SUCCESS', 'SKIPPED'):
+        download_registry.add(entry.get('videoId'), entry.get('title'), "log", entry.get('message'))
+    # Let a waiting /open-videos-stream move on to the next video
+    completion_service.notify(entry)
+    return entry
 
 @app.route('/')
 def index():
@@ -50,59 +168,286 @@ def log_status():
     data = request.json
     # data expects: { videoId, title, status, message }
     if data:
-        append_log(data)
+        record_report(data)
         return jsonify({"status": "logged"}), 200
     return jsonify({"error": "no data"}), 400
 
+@app.route('/api/downloaded/<video_id>')
+def is_downloaded(video_id):
+    # Called by the userscript before it opens the transcript panel
+    return jsonify({"videoId": video_id, "downloaded": video_id in download_registry})
+
+@app.route('/api/downloaded')
+def downloaded_videos():
+    # ?ids=a,b,c -> which of these are already downloaded
+    ids = [i for i in request.args.get('ids', '').split(',') if i]
+    downloaded = sorted(download_registry.contains_many(ids))
+    return jsonify({"downloaded": downloaded, "count": len(downloaded), "registry_size": len(download_registry)})
+
+@app.route('/api/downloaded/scan', methods=['POST'])
+def scan_downloaded():
+    """
+    Records transcripts already present in a download folder.
+    Body: { download_dir, videos: [{videoId, title}] } or { download_dir, sheet_id }
+    for the videos of an uploaded sheet (the response then also lists their rows).
+    """
+    data = request.json or {}
+    download_dir = data.get('download_dir')
+    if not download_dir or not os.path.isdir(download_dir):
+        return jsonify({"error": "download_dir is not a folder"}), 400
+    sheet_rows = None
+    if data.get('sheet_id'):
+        sheet_rows = sheet_cache.select(data['sheet_id'])
+        if sheet_rows is None:
+            return jsonify({"error": "Unknown sheet_id"}), 404
+        videos = [(video_id, title) for _, video_id, title, _ in sheet_rows if video_id]
+    else:
+        videos = [(v.get('videoId'), v.get('title')) for v in data.get('videos', []) if v.get('videoId')]
+    downloaded = download_registry.scan_directory(download_dir, videos)
+    result = {"downloaded": sorted(downloaded), "count": len(downloaded)}
+    if sheet_rows is not None:
+        result["rows"] = [row_no for row_no, video_id, _, _ in sheet_rows if video_id in downloaded]
+    return jsonify(result)
+
 @app.route('/logs')
 def view_logs():
-    logs = []
-    if os.path.exists(app.config['LOG_FILE']):
+    # One page at a time, newest first; ?before=<id> walks to older entries
+    try:
+        filters = filters_from_args(request.args)
+    except ValueError:
+        flash('Invalid time range: use YYYY-MM-DD or YYYY-MM-DDTHH:MM', 'error')
+        filters = filters_from_args({})
+    before_id = request.args.get('before', type=int)
+    limit = min(max(request.args.get('limit', LOG_PAGE_SIZE, type=int), 1), MAX_LOG_PAGE_SIZE)
+
+    logs, next_before_id = log_store.query(before_id=before_id, limit=limit, **filters)
+    total = log_store.count(**filters)
+    # Keep the active filters on the pager links
+    page_args = {k: v for k, v in request.args.items() if k != 'before' and v}
+    return render_template('logs.html', logs=logs, total=total, filters=filters,
+                           next_before_id=next_before_id, before_id=before_id, page_args=page_args)
+
+@app.route('/api/logs/summary')
+def logs_summary():
+    # Success/failure counts, downloads per hour and top failure reasons
+    try:
+        filters = filters_from_args(request.args)
+    except ValueError:
+        return jsonify({"error": "since/until must be ISO dates (YYYY-MM-DD[THH:MM])"}), 400
+    return jsonify(log_store.summary(since=filters['since'], until=filters['until']))
+
+@app.route('/api/logs/timings')
+def logs_timings():
+    # Per-video latency percentiles from the userscript's timing fields
+    try:
+        filters = filters_from_args(request.args)
+    except ValueError:
+        return jsonify({"error": "since/until must be ISO dates (YYYY-MM-DD[THH:MM])"}), 400
+    return jsonify(log_store.timings(since=filters['since'], until=filters['until'],
+                                     status=filters['status'] or "SUCCESS"))
+
+def parse_video_job(form):
+    """
+    Reads the browser automation settings shared by /open-videos-stream and
+    /jobs from a form or JSON body. Returns (video_urls, options, error).
+    """
+    if hasattr(form, 'getlist'):
+        video_urls = form.getlist('video_urls')
+    else:
+        video_urls = form.get('video_urls') or []
+    if not video_urls and form.get('sheet_id'):
+        # Videos of an uploaded sheet: `rows` ("1-200,305") and/or the table filter (`q`, `channel`)
         try:
-            with open(app.config['LOG_FILE'], 'r') as f:
-                logs = json.load(f)
-        except:
-            pass
-    # Sort by new
-    logs.reverse()
-    return render_template('logs.html', logs=logs)
+            row_ranges = parse_row_ranges(form.get('rows')) if form.get('rows') else None
+        except ValueError:
+            return None, None, "rows must look like 1-200,305"
+        selected = sheet_cache.select(form.get('sheet_id'), query=form.get('q') or None,
+                                      channel=form.get('channel') or None, row_ranges=row_ranges)
+        if selected is None:
+            return None, None, "Unknown sheet_id; upload the spreadsheet again"
+        video_urls = [url for _, _, _, url in selected if url]
+    if not video_urls:
+        return None, None, "No videos provided"
+
+    engine = form.get('engine') or "browser"
+    if engine not in ENGINES:
+        return None, None, f"engine must be one of: {', '.join(ENGINES)}"
+    max_workers = transcript_service.MAX_HTTP_WORKERS if engine == "http" else browser_service.MAX_BROWSER_WORKERS
+
+    try:
+        timeout = form.get('timeout')
+        wait_seconds = float(timeout) if timeout else browser_service.WAIT_TIME_SECONDS
+        workers = int(form.get('workers') or 1)
+        max_attempts = int(form.get('max_attempts') or job_service.DEFAULT_MAX_ATTEMPTS)
+        retry_delay = float(form.get('retry_delay') or job_service.DEFAULT_RETRY_DELAY_SECONDS)
+    except (TypeError, ValueError):
+        return None, None, "timeout, workers, max_attempts and retry_delay must be numbers"
+    if wait_seconds <= 0:
+        return None, None, "timeout must be positive"
+    if not 1 <= workers <= max_workers:
+        return None, None, f"workers must be between 1 and {max_workers}"
+    if max_attempts < 1 or retry_delay < 0:
+        return None, None, "max_attempts must be at least 1 and retry_delay not negative"
+
+    options = {
+        "engine": engine,
+        "download_dir": form.get('download_dir') or None,
+        "chromedriver_path": form.get('chromedriver_path') or None,
+        "wait_seconds": wait_seconds,
+        "workers": workers,
+        "refresh_profile": form.get('refresh_profile') in ('1', 'true', 'on', True),
+        "max_attempts": max_attempts,
+        "retry_delay": retry_delay,
+        "retry_reported_failures": form.get('retry_failed') in ('1', 'true', 'on', True),
+    }
+    return video_urls, options, None
 
 @app.route('/open-videos-stream', methods=['POST'])
 def open_videos_stream():
-    video_urls = request.form.getlist('video_urls')
-    download_dir = request.form.get('download_dir')
-    chromedriver_path = request.form.get('chromedriver_path')
-    
     # If using fetch/XHR, we might receive JSON
-    if not video_urls and request.is_json:
-        data = request.json
-        video_urls = data.get('video_urls', [])
-        download_dir = data.get('download_dir')
-        chromedriver_path = data.get('chromedriver_path')
+    form = request.json if not request.form and request.is_json else request.form
+    video_urls, options, error = parse_video_job(form)
+    if error:
+         return jsonify({"error": error}), 400
 
-    if not video_urls:
-         return jsonify({"error": "No videos provided"}), 400
+    # Not sse: a reconnect would submit the job again (re-attach with /jobs/<id>/stream)
+    fmt = progress_format(form.get('stream'), ONE_SHOT_FORMATS)
+    if fmt is None:
+        return jsonify({"error": f"stream must be one of: {', '.join(ONE_SHOT_FORMATS)}"}), 400
+
+    # Runs as a job: closing this stream does not stop it (see /jobs/<id>/stream).
+    # Up to job_service.MAX_CONCURRENT_JOBS run at once; more wait in the queue.
+    job_id = submit_job(video_urls, options)
+    response = job_progress_response(job_id, 0, fmt)
+    response.headers['X-Job-Id'] = job_id
+    return response
+
+def progress_format(requested=None, formats=PROGRESS_FORMATS):
+    """Progress stream format: ?stream=text|ndjson|sse, or by Accept header. None if not in `formats`."""
+    return choose_format(requested or request.args.get('stream'), request.headers.get('Accept', ''), formats)
+
+def progress_response(lines, fmt, start_id=0, start=None):
+    response = Response(stream_with_context(stream_progress(lines, fmt, start_id, start)), mimetype=MIMETYPES[fmt])
+    if fmt != "text":
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'  # proxies must not hold events back
+    return response
+
+def job_progress(job_id, offset=0):
+    if offset == 0:
+        yield f"Job {job_id}: {url_for('job_stream', job_id=job_id)} re-attaches to this progress."
+    yield from job_manager.follow(job_id, offset)
+
+def job_progress_response(job_id, offset, fmt):
+    if fmt == "text":
+        return progress_response(job_progress(job_id, offset), fmt)
+    # Event ids count job lines, so an EventSource reconnect resumes where it left off
+    start = {"job_id": job_id, "stream_url": url_for('job_stream', job_id=job_id)}
+    return progress_response(job_manager.follow(job_id, offset), fmt, start_id=offset, start=start)
 
-    return Response(stream_with_context(browser_service.open_videos_generator(video_urls, download_dir, chromedriver_path)), 
-                   mimetype='text/plain')
+@app.route('/jobs', methods=['GET', 'POST'])
+def jobs():
+    if request.method == 'POST':
+        form = request.json if not request.form and request.is_json else request.form
+        video_urls, options, error = parse_video_job(form)
+        if error:
+            return jsonify({"error": error}), 400
+        job_id = submit_job(video_urls, options)
+        return jsonify({
+            "job_id": job_id,
+            "status_url": url_for('job_status', job_id=job_id),
+            "stream_url": url_for('job_stream', job_id=job_id),
+        }), 202
+    limit = min(max(request.args.get('limit', job_service.JOB_PAGE_SIZE, type=int), 1), job_service.MAX_JOB_PAGE_SIZE)
+    return jsonify(job_store.list_jobs(limit=limit))
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = job_store.get_job(job_id)
+    if job is None:
+        return jsonify({"error": "unknown job"}), 404
+    # ?videos=1 adds every video's state, ?state=failed only those
+    if request.args.get('videos') or request.args.get('state'):
+        job["video_states"] = job_store.get_videos(job_id, request.args.get('state'))
+    return jsonify(job)
+
+@app.route('/jobs/<job_id>/stream')
+def job_stream(job_id):
+    # Re-attach to a job's progress; ?from=N (or SSE's Last-Event-ID) skips the first N lines
+    if job_store.get_job(job_id) is None:
+        return "Error: unknown job", 404
+    fmt = progress_format()
+    if fmt is None:
+        return f"Error: stream must be one of {', '.join(PROGRESS_FORMATS)}", 400
+    offset = request.args.get('from', type=int)
+    if offset is None:
+        last_event_id = request.headers.get('Last-Event-ID', '')
+        offset = int(last_event_id) if last_event_id.isdigit() else 0
+    return job_progress_response(job_id, offset, fmt)
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    if job_store.get_job(job_id) is None:
+        return jsonify({"error": "unknown job"}), 404
+    return jsonify({"cancelled": job_manager.cancel(job_id)})
+
+@app.route('/jobs/<job_id>/resume', methods=['POST'])
+def resume_job(job_id):
+    # Runs a failed or cancelled job again for the videos it has not done
+    if job_store.get_job(job_id) is None:
+        return jsonify({"error": "unknown job"}), 404
+    return jsonify({"resumed": job_manager.resume(job_id),
+                    "stream_url": url_for('job_stream', job_id=job_id)})
+
+@app.route('/api/browser-pool')
+def browser_pool_stats():
+    # Warm browser reuse: launches, reuses, start-up seconds avoided, recycled/crashed
+    return jsonify(browser_service.browser_pool.snapshot())
 
 @app.route('/fetch-stream')
 def fetch_videos_stream():
     api_key = request.args.get('api_key')
     channel_id = request.args.get('channel_id')
+    concurrency = request.args.get('concurrency', MAX_CONCURRENT_CHANNELS, type=int)
+    sync_mode = request.args.get('sync', 'full')
+    use_cache = request.args.get('cache', '1') != '0'
+    quota_budget = request.args.get('quota_budget', DAILY_QUOTA_UNITS, type=int)
+    # Otherwise a run that uses up the quota stops with a partial export
+    wait_for_quota_reset = request.args.get('quota_wait') == '1'
+    export_format = request.args.get('format', 'xlsx')
+    try:
+        filters = VideoFilters.from_args(request.args)
+    except ValueError:
+        return "Error: published_after/published_before must be dates (YYYY-MM-DD)", 400
     
     if not api_key or not channel_id:
         return "Error: API Key and Channel ID are required", 400
 
-    def generate():
-        for message in fetch_channel_videos_generator(api_key, channel_id.strip()):
-            yield message + "\n"
-            
-    return Response(stream_with_context(generate()), mimetype='text/plain')
+    if sync_mode not in SYNC_MODES:
+        return f"Error: sync must be one of {', '.join(SYNC_MODES)}", 400
+
+    if export_format not in EXPORT_FORMATS:
+        return f"Error: format must be one of {', '.join(EXPORT_FORMATS)}", 400
+
+    # ?stream= picks the progress format (?format= is the export format). Not sse:
+    # EventSource would reconnect after the end and fetch (and spend quota) again
+    fmt = progress_format(formats=ONE_SHOT_FORMATS)
+    if fmt is None:
+        return f"Error: stream must be one of {', '.join(ONE_SHOT_FORMATS)}", 400
+
+    messages = fetch_channel_videos_generator(api_key, channel_id.strip(), max_workers=concurrency, sync_mode=sync_mode,
+                                              use_cache=use_cache, quota_budget=quota_budget,
+                                              export_format=export_format, filters=filters,
+                                              wait_for_quota_reset=wait_for_quota_reset)
+    return progress_response(messages, fmt)
 
 @app.route('/process')
 def process_page():
-    return render_template('process.html')
+    sheet = sheet_cache.info(request.args.get('sheet'))
+    if request.args.get('sheet') and not sheet:
+        flash('That spreadsheet is no longer cached; please upload it again', 'error')
+    return render_template('process.html', sheet=sheet, filename=sheet and sheet['file_name'],
+                           full_path=sheet and sheet['full_path'])
 
 @app.route('/upload', methods=['POST'])
 def upload_file():
@@ -119,22 +464,165 @@ def upload_file():
         filename = secure_filename(file.filename)
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
         file.save(filepath)
-        
-        # Absolute path for display
-        full_path = os.path.abspath(filepath)
-        
-        # Read the file to display
-        df = pd.read_excel(filepath)
-        # Convert to records for template
-        videos = df.to_dict('records')
-        
-        return render_template('process.html', videos=videos, filename=filename, full_path=full_path)
+
+        # Parsed once per distinct file; the page then loads rows from /api/sheets/<id>/rows
+        try:
+            sheet_id, _ = sheet_cache.add(filepath, filename)
+        except Exception as e:
+            flash(f'Could not read {filename}: {e}', 'error')
+            return redirect(url_for('process_page'))
+        return redirect(url_for('process_page', sheet=sheet_id))
     else:
         flash('Allowed file types are .xlsx', 'error')
         return redirect(url_for('process_page'))
 
-        flash(f'Error opening videos: {str(e)}', 'error')
-        return redirect(url_for('process_page'))
+@app.route('/api/sheets/<sheet_id>')
+def sheet_info(sheet_id):
+    info = sheet_cache.info(sheet_id)
+    if not info:
+        return jsonify({"error": "Unknown sheet"}), 404
+    return jsonify(info)
+
+@app.route('/api/sheets/<sheet_id>/rows')
+def sheet_rows(sheet_id):
+    """
+    A page of the uploaded sheet for the process table (no descriptions).
+    ?offset=&limit=&q=&channel=&sort=Video Title|Published Date|Channel&order=asc|desc
+    """
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', SHEET_PAGE_SIZE, type=int), 1), MAX_SHEET_PAGE_SIZE)
+    page = sheet_cache.rows(sheet_id, query=request.args.get('q') or None, channel=request.args.get('channel') or None,
+                            sort=request.args.get('sort', 'row'), descending=request.args.get('order') == 'desc',
+                            offset=offset, limit=limit)
+    if page is None:
+        return jsonify({"error": "Unknown sheet"}), 404
+    rows, total = page
+    downloaded = download_registry.contains_many(r['videoId'] for r in rows)
+    for r in rows:
+        r['downloaded'] = r['videoId'] in downloaded
+    return jsonify({"rows": rows, "total": total, "offset": offset, "limit": limit})
+
+@app.route('/api/sheets/<sheet_id>/rows/<int:row_no>')
+def sheet_record(sheet_id, row_no):
+    # Every column of one row, descriptions included
+    record = sheet_cache.record(sheet_id, row_no)
+    if record is None:
+        return jsonify({"error": "Unknown sheet or row"}), 404
+    return jsonify(record)
+
+@app.route('/api/sheets/<sheet_id>/select')
+def sheet_selection(sheet_id):
+    """Row numbers matching ?q=&channel= that are not downloaded yet, for "select all"."""
+    selected = sheet_cache.select(sheet_id, query=request.args.get('q') or None,
+                                  channel=request.args.get('channel') or None)
+    if selected is None:
+        return jsonify({"error": "Unknown sheet"}), 404
+    downloaded = download_registry.contains_many(video_id for _, video_id, _, _ in selected)
+    rows = [row_no for row_no, video_id, _, _ in selected if video_id not in downloaded]
+    return jsonify({"rows": rows, "count": len(rows), "downloaded": len(selected) - len(rows)})
+
+@app.route('/search')
+def search_page():
+    query = request.args.get('q', '').strip()
+    channel = request.args.get('channel') or None
+    page = max(request.args.get('page', 1, type=int), 1)
+    results, total = corpus.search(query, channel=channel, limit=SEARCH_PAGE_SIZE,
+                                   offset=(page - 1) * SEARCH_PAGE_SIZE) if query else ([], 0)
+    return render_template('search.html', query=query, channel=channel, page=page, results=results, total=total,
+                           pages=(total + SEARCH_PAGE_SIZE - 1) // SEARCH_PAGE_SIZE, channels=corpus.channels(),
+                           stats=corpus.stats())
+
+@app.template_filter('highlight')
+def highlight(text, query):
+    # Wraps the search terms in <mark>, escaping everything else. One pass
+    # over the raw text, so terms never match inside markup or entities.
+    _, terms = to_fts_query(query)
+    text = str(text or '')
+    if not terms:
+        return escape(text)
+    # Longest first, so a term wins over its own prefix
+    pattern = re.compile("|".join(map(re.escape, sorted(set(terms), key=len, reverse=True))), re.IGNORECASE)
+    parts, start = [], 0
+    for match in pattern.finditer(text):
+        parts.append(str(escape(text[start:match.start()])))
+        parts.append('<mark class="bg-teal-500/30 text-teal-100 rounded">' + str(escape(match.group())) + '</mark>')
+        start = match.end()
+    parts.append(str(escape(text[start:])))
+    return Markup(''.join(parts))
+
+@app.route('/api/search')
+def search_api():
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"error": "q is required"}), 400
+    limit = min(max(request.args.get('limit', SEARCH_PAGE_SIZE, type=int), 1), MAX_SEARCH_PAGE_SIZE)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    results, total = corpus.search(query, channel=request.args.get('channel') or None, limit=limit, offset=offset)
+    return jsonify({"query": query, "total": total, "offset": offset, "results": results})
+
+@app.route('/api/transcripts/<video_id>')
+def get_transcript(video_id):
+    transcript = corpus.get(video_id=video_id)
+    if transcript is None:
+        return jsonify({"error": "Transcript not in the corpus"}), 404
+    if request.args.get('format') == 'txt':
+        response = Response(transcript['text'], mimetype='text/plain; charset=utf-8')
+        response.headers['Content-Disposition'] = f'attachment; filename="{video_id}_transcript.txt"'
+        return response
+    return jsonify(transcript)
+
+@app.route('/api/corpus/export')
+def export_corpus():
+    """
+    Bulk export of the corpus (or of a search): ?format=jsonl streams one
+    transcript per line, ?format=zip gives one text file per video.
+    """
+    query = request.args.get('q', '').strip() or None
+    channel = request.args.get('channel') or None
+    export_format = request.args.get('format', 'jsonl')
+
+    if export_format == 'jsonl':
+        def generate():
+            for batch in corpus.iter_export(query, channel):
+                for transcript in batch:
+                    yield json.dumps(transcript, ensure_ascii=False) + "\n"
+        response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        response.headers['Content-Disposition'] = 'attachment; filename="transcripts.jsonl"'
+        return response
+
+    if export_format == 'zip':
+        # Spooled to a temporary file: zip needs to seek back to write its index
+        archive = tempfile.TemporaryFile()
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for batch in corpus.iter_export(query, channel):
+                for transcript in batch:
+                    name = f"{transcript['video_id'] or transcript['id']}_" + transcript_file_name(transcript['title'])
+                    zf.writestr(name, transcript['text'])
+        archive.seek(0)
+        return send_file(archive, mimetype='application/zip', as_attachment=True, download_name='transcripts.zip')
+
+    return jsonify({"error": "format must be jsonl or zip"}), 400
+
+@app.route('/api/corpus', methods=['GET'])
+def corpus_status():
+    return jsonify(dict(corpus.stats(), folders=corpus.folders() + corpus_ingester.extra_folders,
+                        ingester=corpus_ingester.stats))
+
+@app.route('/api/corpus/folders', methods=['POST'])
+def add_corpus_folder():
+    # Another download folder for the ingester to watch
+    path = (request.json or {}).get('path')
+    if not path or not os.path.isdir(path):
+        return jsonify({"error": "path is not a folder"}), 400
+    added = corpus.add_folder(path)
+    corpus_ingester.wake()
+    return jsonify({"path": os.path.abspath(path), "added": added})
+
+@app.route('/api/corpus/ingest', methods=['POST'])
+def ingest_now():
+    # Scans the watched folders right away instead of waiting for the next round
+    stored = corpus_ingester.scan_once()
+    return jsonify({"stored": stored, "waiting": corpus_ingester.stats['waiting']})
 
 @app.route('/tutorial')
 def tutorial():
@@ -194,10 +682,44 @@ def browse_file():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def run_server(host, port, threads, server):
+    """Serves the app with a pooled production server; streams don't block other requests."""
+    if server == "waitress":
+        try:
+            from waitress import serve
+        except ImportError:
+            print("Warning: waitress is not installed (pip install waitress); using the threaded Flask server")
+            server = "flask"
+    start_background_work()
+    print(f"Serving on http://{host}:{port} ({server}, {threads} threads)")
+    if server == "waitress":
+        # Every open progress stream holds a thread, so the pool is sized for
+        # many watchers; connections beyond the pool wait in waitress's queue
+        serve(app, host=host, port=port, threads=threads, connection_limit=threads * 4,
+              channel_timeout=STREAM_CHANNEL_TIMEOUT, ident="youtube-subtitles")
+    else:
+        from werkzeug.serving import run_simple
+        run_simple(host, port, app, threaded=True)
+
 if __name__ == '__main__':
+    import argparse
     # Open browser automatically
     import webbrowser
-    from threading import Timer
+    from threading import Timer, Thread
+
+    parser = argparse.ArgumentParser(description="YouTube subtitles web app.")
+    parser.add_argument("--debug", action="store_true",
+                        help="Flask's development server with the reloader and debugger (one process per change)")
+    parser.add_argument("--server", choices=("waitress", "flask"), default="waitress",
+                        help="production server; waitress if installed, else the threaded Flask server")
+    # Host='127.0.0.1' ensures it only listens locally, avoiding some Firewall prompts
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=SERVER_THREADS,
+                        help="worker threads, i.e. requests and progress streams served at once")
+    parser.add_argument("--no-browser", action="store_true", help="don't open the app in a browser")
+    args = parser.parse_args()
+    url = f"http://{args.host}:{args.port}"
 
     def open_browser():
         # Try to open in Edge explicitly if possible, else default
@@ -207,12 +729,21 @@ if __name__ == '__main__':
             edge_path = r"C:\Program Files (x86)\Microsoft\Edge\Application\msedge.exe"
             if os.path.exists(edge_path):
                 webbrowser.register('edge', None, webbrowser.BackgroundBrowser(edge_path))
-                webbrowser.get('edge').open("http://127.0.0.1:5000")
+                webbrowser.get('edge').open(url)
             else:
-                webbrowser.open("http://127.0.0.1:5000")
+                webbrowser.open(url)
         except:
-            webbrowser.open("http://127.0.0.1:5000")
+            webbrowser.open(url)
 
-    Timer(1.5, open_browser).start()
-    # Host='127.0.0.1' ensures it only listens locally, avoiding some Firewall prompts
-    app.run(debug=True, port=5000, host='127.0.0.1')
+    # The debug reloader runs this file twice: the watcher opens the browser once; its
+    # serving child (WERKZEUG_RUN_MAIN) restarts on every change and must not open more tabs
+    if not args.no_browser and not (args.debug and os.environ.get('WERKZEUG_RUN_MAIN')):
+        Timer(1.5, open_browser).start()
+
+    # Load the API client and pandas in the background so the first fetch is fast
+    from services.youtube_client import warm_up
+    Thread(target=warm_up, daemon=True).start()
+    if args.debug:
+        app.run(debug=True, port=args.port, host=args.host)
+    else:
+        run_server(args.host, args.port, args.threads, args.server)
@@ -0,0 +1,155 @@
+"""
+Benchmark: transcript corpus ingest throughput and search latency.
+
+    python benchmarks/bench_corpus.py --transcripts 100000 --words 800
+
+Builds a corpus of synthetic transcripts (Zipf-distributed vocabulary, so
+common words are very common and rare ones rare, like speech) in a temporary
+folder, then measures:
+
+  * ingest_many() throughput from memory, in batches of INGEST_BATCH_SIZE
+  * the file ingester (TranscriptIngester.scan_once) on --files files
+  * search latency percentiles for common, rare, multi-word, phrase,
+    prefix and channel-filtered queries, and get() by videoId
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.corpus_store import CorpusStore, TranscriptIngester, INGEST_BATCH_SIZE
+from services import corpus_store
+
+VOCABULARY_SIZE = 30000
+CHANNELS = 200
+
+def make_vocabulary(rng):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = set()
+    while len(words) < VOCABULARY_SIZE:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(2, 10))))
+    words = sorted(words, key=lambda w: (len(w), w))  # short words get the high Zipf weights
+    weights, total = [], 0.0
+    for rank in range(1, len(words) + 1):
+        total += 1.0 / rank
+        weights.append(total)
+    return words, weights
+
+def make_records(count, words_per_transcript, seed=0, start=0):
+    """Yields batches of ingest records."""
+    rng = random.Random(seed)
+    words, cum_weights = make_vocabulary(rng)
+    batch = []
+    for n in range(start, start + count):
+        length = max(50, int(rng.gauss(words_per_transcript, words_per_transcript / 3)))
+        text = " ".join(rng.choices(words, cum_weights=cum_weights, k=length))
+        channel = f"Channel {n % CHANNELS:03d}"
+        batch.append({
+            "video_id": f"bench{n:07d}",
+            "title": " ".join(rng.choices(words, cum_weights=cum_weights, k=6)).title(),
+            "channel_id": f"UC{n % CHANNELS:022d}",
+            "channel": channel,
+            "published_at": f"20{10 + n % 14:02d}-0{1 + n % 9}-1{n % 10}T12:00:00Z",
+            "file_name": f"bench{n:07d}_transcript.txt",
+            "text": text,
+        })
+        if len(batch) == INGEST_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, len(samples) * p // 100)]
+
+def time_queries(store, label, queries, channel=None, repeat=5):
+    latencies, totals = [], []
+    for _ in range(repeat):
+        for query in queries:
+            started = time.perf_counter()
+            results, total = store.search(query, channel=channel)
+            latencies.append((time.perf_counter() - started) * 1000)
+            totals.append(total)
+    print(f"  {label:<22} p50 {percentile(latencies, 50):7.1f} ms   p95 {percentile(latencies, 95):7.1f} ms"
+          f"   max {max(latencies):7.1f} ms   ~{sum(totals) // len(totals)} hits")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Transcript corpus ingest and search benchmark.")
+    parser.add_argument("--transcripts", type=int, default=100000)
+    parser.add_argument("--words", type=int, default=800, help="average words per transcript")
+    parser.add_argument("--files", type=int, default=5000, help="transcripts ingested from files")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary corpus folder")
+    args = parser.parse_args(argv)
+
+    folder = tempfile.mkdtemp(prefix="corpus_bench_")
+    store = CorpusStore(os.path.join(folder, "transcripts.db"))
+    try:
+        print(f"Ingesting {args.transcripts} transcripts of ~{args.words} words from memory...")
+        generate_seconds = ingest_seconds = 0.0
+        text_bytes = 0
+        records = make_records(args.transcripts, args.words)
+        while True:
+            started = time.perf_counter()
+            batch = next(records, None)
+            generate_seconds += time.perf_counter() - started
+            if batch is None:
+                break
+            text_bytes += sum(len(r["text"]) for r in batch)
+            started = time.perf_counter()
+            store.ingest_many(batch)
+            ingest_seconds += time.perf_counter() - started
+        stats = store.stats()
+        print(f"  {args.transcripts / ingest_seconds:,.0f} transcripts/s, {text_bytes / ingest_seconds / 1e6:.1f} MB/s of text "
+              f"({ingest_seconds:.1f}s; generating the text took {generate_seconds:.1f}s)")
+        print(f"  text {stats['text_chars'] / 1e6:.0f} MB, bodies {stats['stored_bytes'] / 1e6:.0f} MB "
+              f"({stats['compression_ratio']}x), database incl. index {stats['file_bytes'] / 1e6:.0f} MB")
+
+        print(f"Ingesting {args.files} transcript files with TranscriptIngester...")
+        downloads = os.path.join(folder, "downloads")
+        os.makedirs(downloads)
+        for batch in make_records(args.files, args.words, seed=1, start=args.transcripts):
+            for record in batch:
+                with open(os.path.join(downloads, record["file_name"]), "w", encoding="utf-8") as f:
+                    f.write(record["text"])
+        corpus_store.FILE_SETTLE_SECONDS = 0
+        ingester = TranscriptIngester(store, lambda name: {"video_id": name[:-len("_transcript.txt")]},
+                                      folders=[downloads], keep_files=False)
+        started = time.perf_counter()
+        stored = ingester.scan_once()
+        seconds = time.perf_counter() - started
+        print(f"  {stored / seconds:,.0f} files/s ({stored} files in {seconds:.1f}s, {len(os.listdir(downloads))} left)")
+
+        print("Search latency (page of 20 with snippets, plus total count):")
+        # Ranks in the Zipf vocabulary: low = common, high = rare
+        rng = random.Random(2)
+        words, _ = make_vocabulary(random.Random(0))
+        common = [words[i] for i in range(0, 5)]
+        medium = [words[i] for i in range(200, 205)]
+        rare = [words[i] for i in rng.sample(range(20000, VOCABULARY_SIZE), 5)]
+        time_queries(store, "common word", common)
+        time_queries(store, "medium word", medium)
+        time_queries(store, "rare word", rare)
+        time_queries(store, "two words (AND)", [f"{a} {b}" for a, b in zip(medium, rare)])
+        time_queries(store, "phrase", [f'"{a} {b}"' for a, b in zip(common, common[1:])])
+        time_queries(store, "prefix", [w[:3] + "*" for w in medium])
+        time_queries(store, "rare word, 1 channel", rare, channel="Channel 007")
+
+        latencies = []
+        for _ in range(200):
+            started = time.perf_counter()
+            store.get(video_id=f"bench{rng.randrange(args.transcripts):07d}")
+            latencies.append((time.perf_counter() - started) * 1000)
+        print(f"  {'get(video_id)':<22} p50 {percentile(latencies, 50):7.1f} ms   p95 {percentile(latencies, 95):7.1f} ms")
+    finally:
+        if args.keep:
+            print(f"Corpus kept in {folder}")
+        else:
+            shutil.rmtree(folder, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
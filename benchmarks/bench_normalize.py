@@ -0,0 +1,102 @@
+"""
+Microbenchmark: per-row video metadata parsing vs metadata_service.normalize_page.
+
+    python benchmarks/bench_normalize.py --videos 20000
+
+The per-row path is the loop youtube_service used before the batch stage:
+pd.to_datetime(...).date() and isodate.parse_duration(...) for every video.
+Both paths are checked to produce the same rows before timing.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+
+import isodate
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.metadata_service import normalize_page
+
+PAGE_SIZE = 50
+
+def make_pages(video_count, seed=0):
+    """Builds fake playlistItems pages and details maps shaped like the API's."""
+    rng = random.Random(seed)
+    base = datetime(2010, 1, 1)
+    pages = []
+    for start in range(0, video_count, PAGE_SIZE):
+        items, details = [], {}
+        for n in range(start, min(start + PAGE_SIZE, video_count)):
+            vid_id = f"vid{n:08d}"
+            published = base + timedelta(seconds=rng.randrange(0, 15 * 365 * 86400))
+            items.append({"snippet": {
+                "title": f"Video {n}",
+                "channelTitle": "Bench Channel",
+                "publishedAt": published.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "description": "x" * rng.randrange(100, 4000),
+                "resourceId": {"videoId": vid_id},
+            }})
+            hours, minutes, seconds = rng.randrange(0, 3), rng.randrange(0, 60), rng.randrange(0, 60)
+            duration = "PT" + (f"{hours}H" if hours else "") + (f"{minutes}M" if minutes else "") + f"{seconds}S"
+            if rng.random() < 0.01:
+                duration = "P0D"  # live streams
+            details[vid_id] = {"DurationISO": duration, "Tags": "a,b", "CategoryId": "22"}
+        pages.append((items, details))
+    return pages
+
+def per_row(items, details_map):
+    """The original row-at-a-time conversion."""
+    rows = []
+    for item in items:
+        snippet = item["snippet"]
+        vid_id = snippet["resourceId"]["videoId"]
+        details = details_map.get(vid_id, {})
+        rows.append({
+            "Video Title": snippet["title"],
+            "Channel": snippet["channelTitle"],
+            "Published Date": pd.to_datetime(snippet["publishedAt"]).date(),
+            "Video URL": f"https://www.youtube.com/watch?v={vid_id}",
+            "Description": snippet["description"],
+            "Video ID": vid_id,
+            "Duration": str(isodate.parse_duration(details["DurationISO"])) if details else "N/A",
+            "Tags": details.get("Tags", ""),
+            "Type": "Video",
+        })
+    return rows
+
+def run(label, convert, pages):
+    started = time.perf_counter()
+    rows = []
+    for items, details in pages:
+        rows.extend(convert(items, details))
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {elapsed:8.3f}s  {len(rows) / elapsed:12,.0f} videos/s")
+    return rows, elapsed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare per-row and batch metadata parsing.")
+    parser.add_argument("--videos", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    pages = make_pages(args.videos)
+    whole = [(
+        [item for items, _ in pages for item in items],
+        {vid: d for _, details in pages for vid, d in details.items()},
+    )]
+
+    legacy, legacy_time = run("per-row (50/page)", per_row, pages)
+    batched, batched_time = run("normalize_page (50/page)", normalize_page, pages)
+    combined, combined_time = run("normalize_page (one batch)", normalize_page, whole)
+
+    for old, new in zip(legacy, batched):
+        new = {k: v for k, v in new.items() if k != "Duration Seconds"}
+        assert old == new, (old, new)
+    assert batched == combined
+
+    print(f"speed-up: {legacy_time / batched_time:.1f}x per page, {legacy_time / combined_time:.1f}x one batch")
+
+if __name__ == "__main__":
+    main()
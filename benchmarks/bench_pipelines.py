@@ -0,0 +1,324 @@
+"""
+Offline benchmark of the fetch, browser and HTTP transcript pipelines.
+
+    python benchmarks/bench_pipelines.py
+    python benchmarks/bench_pipelines.py --pipelines fetch --sizes 100,1000 --latency 0.02 --error-rate 0.01
+    python benchmarks/bench_pipelines.py --compare benchmarks/results/pipelines-20260101-120000.json
+
+Every scenario runs in a fresh interpreter inside a temporary working
+directory, so peak RSS is per scenario and nothing touches ./uploads:
+
+  * fetch: fetch_channel_videos_generator on one channel of SIZE videos,
+    served by benchmarks/fake_youtube_api.py, exported as --format
+  * browser: open_videos_generator on SIZE videos, driving the
+    FakeWebDrivers of benchmarks/fake_webdriver.py
+  * http: fetch_transcripts_generator on SIZE videos, served by
+    benchmarks/fake_caption_server.py
+
+The fake servers run in this (parent) process. Each scenario reports
+videos/s, latency percentiles (fetch: per Data API request and endpoint;
+browser and http: per video), peak RSS, export time (fetch) and outcome
+counts. Results are saved as JSON in --output (benchmarks/results/ by
+default); --compare prints the change against an earlier results file.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+PIPELINES = ("fetch", "browser", "http")
+
+# Videos per scenario when --sizes is not given. Browser runs are bound by
+# the simulated page time, so they stop earlier.
+DEFAULT_SIZES = {
+    "fetch": (100, 1000, 10000, 100000),
+    "browser": (100, 1000),
+    "http": (100, 1000, 10000),
+}
+
+PERCENTILES = (50, 90, 99)
+
+# Data API requests per second allowed by the quota scheduler during fetch
+# runs; the real API's default (10/s) would make the rate limiter the benchmark
+FAKE_API_REQUESTS_PER_SECOND = 1000
+
+def percentiles(samples_ms):
+    """count, p50/p90/p99, max and mean of latencies in milliseconds."""
+    if not samples_ms:
+        return {"count": 0}
+    samples = sorted(samples_ms)
+    result = {"count": len(samples)}
+    for p in PERCENTILES:
+        result[f"p{p}"] = round(samples[min(len(samples) - 1, len(samples) * p // 100)], 2)
+    result["max"] = round(samples[-1], 2)
+    result["mean"] = round(sum(samples) / len(samples), 2)
+    return result
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB, or None where it cannot be read."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        try:
+            import psutil
+            return round(psutil.Process().memory_info().peak_wset / 1e6, 1)
+        except Exception:
+            return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / 1e6 if sys.platform == "darwin" else peak / 1e3, 1)
+
+# --- Scenario children (run in a fresh interpreter) ---
+
+def _child_fetch(scenario):
+    from googleapiclient.http import HttpRequest
+    from services.youtube_service import fetch_channel_videos_generator
+
+    # Time every Data API request as the client sees it (retries are separate calls)
+    latencies = {}
+    original_execute = HttpRequest.execute
+
+    def timed_execute(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return original_execute(self, *args, **kwargs)
+        finally:
+            endpoint = self.methodId.split(".")[1] if self.methodId else "unknown"
+            latencies.setdefault(endpoint, []).append((time.perf_counter() - started) * 1000)
+    HttpRequest.execute = timed_execute
+
+    videos = export_seconds = 0
+    errors = []
+    started = time.perf_counter()
+    for line in fetch_channel_videos_generator("bench-key", f"UCbench{scenario['size']:09d}", use_cache=False,
+                                               quota_budget=10 ** 9, export_format=scenario["format"]):
+        if line.startswith("--- Total:"):
+            videos = int(line.split()[2])
+        elif line.startswith("Export: wrote"):
+            export_seconds = float(line.rsplit(" in ", 1)[1].rstrip("s"))
+        elif "Error" in line:
+            errors.append(line.strip())
+    seconds = time.perf_counter() - started
+    latency_ms = {endpoint: percentiles(samples) for endpoint, samples in sorted(latencies.items())}
+    latency_ms["all"] = percentiles([ms for samples in latencies.values() for ms in samples])
+    return {
+        "videos": videos,
+        "seconds": round(seconds, 3),
+        "export_seconds": export_seconds,
+        "latency_ms": latency_ms,
+        "errors": errors[:10],
+    }
+
+def _run_videos(generator_factory, urls):
+    """Runs a browser/http generator, timing each video from in_progress to its result."""
+    started_at, latencies, outcomes = {}, [], {}
+
+    def on_video(position, url, state, outcome, entry):
+        now = time.perf_counter()
+        if state == "in_progress":
+            started_at[position] = now
+        elif state in ("success", "failed"):
+            outcomes[outcome or state] = outcomes.get(outcome or state, 0) + 1
+            if position in started_at:
+                latencies.append((now - started_at.pop(position)) * 1000)
+
+    started = time.perf_counter()
+    for _ in generator_factory(urls, on_video):
+        pass
+    seconds = time.perf_counter() - started
+    return {
+        "videos": len(urls),
+        "seconds": round(seconds, 3),
+        "latency_ms": {"video": percentiles(latencies)},
+        "outcomes": outcomes,
+    }
+
+def _child_browser(scenario):
+    from fake_webdriver import fake_pool
+    from services.browser_service import open_videos_generator
+
+    pool = fake_pool(min_delay=scenario["min_delay"], max_delay=scenario["max_delay"],
+                     failure_rate=scenario["error_rate"], silent_rate=scenario["silent_rate"],
+                     launch_delay=0.0, seed=scenario["seed"])
+    urls = [f"https://www.youtube.com/watch?v=bench{n:07d}" for n in range(scenario["size"])]
+    try:
+        return _run_videos(lambda urls, on_video: open_videos_generator(
+            urls, download_dir=os.path.abspath("transcripts"), wait_seconds=scenario["timeout"],
+            workers=scenario["workers"], pool=pool, on_video=on_video), urls)
+    finally:
+        pool.close()
+
+def _child_http(scenario):
+    from services.transcript_service import fetch_transcripts_generator
+
+    urls = [f"https://www.youtube.com/watch?v=bench{n:07d}" for n in range(scenario["size"])]
+    return _run_videos(lambda urls, on_video: fetch_transcripts_generator(
+        urls, download_dir=os.path.abspath("transcripts"), workers=scenario["workers"],
+        endpoint=scenario["endpoint"], on_video=on_video), urls)
+
+CHILDREN = {"fetch": _child_fetch, "browser": _child_browser, "http": _child_http}
+
+def run_child(scenario_json):
+    scenario = json.loads(scenario_json)
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, BENCH_DIR)
+    result = CHILDREN[scenario["pipeline"]](scenario)
+    result["peak_rss_mb"] = peak_rss_mb()
+    print(json.dumps(result))
+
+# --- Parent ---
+
+def run_scenario(scenario, env):
+    """Runs one scenario in a new interpreter in a temporary folder; returns its result dict."""
+    workdir = tempfile.mkdtemp(prefix=f"bench_{scenario['pipeline']}_")
+    try:
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", json.dumps(scenario)],
+            cwd=workdir, env=env, capture_output=True, text=True
+        )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    if completed.returncode != 0:
+        return {"error": completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "child failed"}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def start_fake_server(pipeline, args):
+    """The fake site a pipeline talks to, in this process; (server, url) or (None, None)."""
+    sys.path.insert(0, BENCH_DIR)
+    if pipeline == "fetch":
+        from fake_youtube_api import start_server, FakeYouTubeConfig
+        return start_server(0, FakeYouTubeConfig(args.size_for_server, args.latency, args.error_rate, seed=args.seed))
+    if pipeline == "http":
+        from fake_caption_server import start_server, FakeCaptionConfig
+        return start_server(0, FakeCaptionConfig(latency=args.latency, error_rate=args.error_rate, seed=args.seed))
+    return None, None
+
+def headline_latency(result):
+    """The latency summary shown in tables: per video, or over all Data API requests."""
+    latency = result.get("latency_ms") or {}
+    return latency.get("video") or latency.get("all") or {}
+
+def format_result(result):
+    if "error" in result:
+        return f"{result['pipeline']:<8} {result['size']:>7}  FAILED: {result['error']}"
+    latency = headline_latency(result)
+    line = (f"{result['pipeline']:<8} {result['size']:>7}  {result['videos_per_second']:>9.1f} videos/s"
+            f"  {result['seconds']:>8.2f}s  p50 {latency.get('p50', 0):>8.1f} ms  p99 {latency.get('p99', 0):>8.1f} ms"
+            f"  RSS {result.get('peak_rss_mb') or 0:>6.0f} MB")
+    if result.get("export_seconds") is not None:
+        line += f"  export {result['export_seconds']:.2f}s"
+    if result.get("outcomes"):
+        line += "  " + ", ".join(f"{k} {v}" for k, v in sorted(result["outcomes"].items()))
+    return line
+
+def compare(previous_path, results):
+    """Prints the change in throughput, p99 latency and peak RSS against an earlier results file."""
+    with open(previous_path, encoding="utf-8") as f:
+        previous = {(r["pipeline"], r["size"]): r for r in json.load(f)["results"] if "error" not in r}
+
+    def change(new, old):
+        return f"{(new - old) / old * 100:+6.1f}%" if old else "    n/a"
+
+    print(f"\nCompared with {previous_path}:")
+    for result in results:
+        old = previous.get((result["pipeline"], result["size"]))
+        if not old or "error" in result:
+            continue
+        new_p99, old_p99 = headline_latency(result).get("p99", 0), headline_latency(old).get("p99", 0)
+        print(f"{result['pipeline']:<8} {result['size']:>7}  videos/s {old['videos_per_second']:>9.1f} -> "
+              f"{result['videos_per_second']:>9.1f} ({change(result['videos_per_second'], old['videos_per_second'])})"
+              f"  p99 {old_p99:>8.1f} -> {new_p99:>8.1f} ms ({change(new_p99, old_p99)})"
+              f"  RSS {old.get('peak_rss_mb') or 0:.0f} -> {result.get('peak_rss_mb') or 0:.0f} MB")
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark of the fetch, browser and HTTP transcript pipelines.")
+    parser.add_argument("--pipelines", default=",".join(PIPELINES), help="comma-separated subset of: " + ", ".join(PIPELINES))
+    parser.add_argument("--sizes", default=None, help="videos per scenario, e.g. 100,1000 (default depends on the pipeline)")
+    parser.add_argument("--latency", type=float, default=0.01, help="seconds the fake servers add to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="fraction of fake server calls answered with 5xx/429 (browser: failed reports)")
+    parser.add_argument("--format", default="xlsx", help="export format of fetch runs")
+    parser.add_argument("--workers", type=int, default=8, help="browser/http workers")
+    parser.add_argument("--min-delay", type=float, default=0.05, help="fake browser seconds per video, at least")
+    parser.add_argument("--max-delay", type=float, default=0.2, help="fake browser seconds per video, at most")
+    parser.add_argument("--silent-rate", type=float, default=0.0, help="fake browser videos that never report")
+    parser.add_argument("--timeout", type=float, default=5.0, help="browser per-video timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=RESULTS_DIR, help="folder for the JSON results")
+    parser.add_argument("--compare", default=None, metavar="RESULTS_JSON", help="earlier results to compare with")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        return run_child(args.child)
+
+    pipelines = [p.strip() for p in args.pipelines.split(",") if p.strip()]
+    unknown = set(pipelines) - set(PIPELINES)
+    if unknown:
+        parser.error(f"unknown pipelines: {', '.join(sorted(unknown))}")
+    sizes = [int(s) for s in args.sizes.split(",")] if args.sizes else None
+
+    results = []
+    for pipeline in pipelines:
+        for size in sizes or DEFAULT_SIZES[pipeline]:
+            args.size_for_server = size
+            server, url = start_fake_server(pipeline, args)
+            env = dict(os.environ, PYTHONPATH=ROOT)
+            if pipeline == "fetch":
+                env["YOUTUBE_API_ENDPOINT"] = url
+                env["YOUTUBE_API_REQUESTS_PER_SECOND"] = str(FAKE_API_REQUESTS_PER_SECOND)
+            scenario = {
+                "pipeline": pipeline, "size": size, "format": args.format, "workers": args.workers,
+                "endpoint": url, "error_rate": args.error_rate, "min_delay": args.min_delay,
+                "max_delay": args.max_delay, "silent_rate": args.silent_rate, "timeout": args.timeout,
+                "seed": args.seed,
+            }
+            try:
+                result = dict(pipeline=pipeline, size=size, **run_scenario(scenario, env))
+            finally:
+                if server:
+                    result_calls = dict(server.config.calls)
+                    server.shutdown()
+                    server.server_close()
+            if server:
+                result["server_calls"] = result_calls
+            if "error" not in result:
+                result["videos_per_second"] = round(result["videos"] / result["seconds"], 2) if result["seconds"] else 0.0
+            results.append(result)
+            print(format_result(result), flush=True)
+
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(args.output, f"pipelines-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "options": {k: v for k, v in vars(args).items() if k not in ("child", "size_for_server")},
+            "results": results,
+        }, f, indent=2)
+    print(f"Results saved to {path}")
+
+    if args.compare:
+        compare(args.compare, results)
+
+if __name__ == "__main__":
+    main()
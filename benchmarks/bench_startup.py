@@ -0,0 +1,104 @@
+"""
+Measures app cold start and first-request latency of /fetch-stream.
+
+    python benchmarks/bench_startup.py --repeat 5
+
+Cold start is the time for a fresh interpreter to `import app`. Request
+latency runs against benchmarks/fake_youtube_api.py in a fresh process:
+the first request pays for new connections (and, without the start-up
+warm-up that `python app.py` runs, for the lazy imports); the second shows
+the warm path with pooled clients.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def cold_start(repeat):
+    """Median seconds for `python -c "import app"` in a new process."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import app"], cwd=ROOT, check=True)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+def _request_latency_child(channels, videos, warm):
+    """Runs in a fresh interpreter; prints JSON timings."""
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+    import tempfile
+    from fake_youtube_api import start_server, FakeYouTubeConfig
+
+    server, url = start_server(0, FakeYouTubeConfig(videos_per_channel=videos, latency=0.02))
+    os.environ["YOUTUBE_API_ENDPOINT"] = url
+    os.chdir(tempfile.mkdtemp(prefix="ytsubs_bench_"))
+
+    results = {}
+    started = time.perf_counter()
+    import app
+    results["import_app"] = time.perf_counter() - started
+
+    from services.youtube_client import pool_stats, warm_up
+    if warm:
+        started = time.perf_counter()
+        warm_up()
+        results["warm_up"] = time.perf_counter() - started
+    client = app.app.test_client()
+    query = f"/fetch-stream?api_key=bench&channel_id={channels}&cache=0"
+
+    for label in ("first_request", "second_request"):
+        started = time.perf_counter()
+        response = client.get(query)
+        first_byte = found_channel = None
+        for chunk in response.response:
+            now = time.perf_counter() - started
+            first_byte = first_byte if first_byte is not None else now
+            if found_channel is None and b"Found Channel" in chunk:
+                found_channel = now
+        results[label] = {
+            "first_byte": first_byte,
+            "first_api_response": found_channel,
+            "total": time.perf_counter() - started,
+        }
+    results["clients"] = pool_stats()
+    server.shutdown()
+    print(json.dumps(results))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold start and first-request latency.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--channels", default="UCbench0001,UCbench0002")
+    parser.add_argument("--videos", type=int, default=100)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--warm", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        return _request_latency_child(args.channels, args.videos, args.warm)
+
+    print(f"cold start (import app, median of {args.repeat}): {cold_start(args.repeat) * 1000:.0f} ms")
+
+    for warm in (False, True):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child",
+             "--channels", args.channels, "--videos", str(args.videos)] + (["--warm"] if warm else []),
+            cwd=ROOT, check=True, capture_output=True, text=True
+        ).stdout
+        results = json.loads(output.strip().splitlines()[-1])
+        print(f"\n{'with' if warm else 'without'} start-up warm-up "
+              f"(import app {results['import_app'] * 1000:.0f} ms"
+              + (f", warm-up {results['warm_up'] * 1000:.0f} ms" if warm else "") + ")")
+        for label in ("first_request", "second_request"):
+            r = results[label]
+            print(f"  {label:<15} first byte {r['first_byte'] * 1000:7.1f} ms, "
+                  f"first API response {r['first_api_response'] * 1000:7.1f} ms, total {r['total']:.2f} s")
+        print(f"  API clients: {results['clients']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Local stand-in for the YouTube pages services/transcript_service.py reads.
+
+Serves /watch?v=<id> pages with an embedded ytInitialPlayerResponse and
+/api/timedtext caption tracks built from the recorded payloads in
+benchmarks/caption_samples (json3, srv1, srv3 and WebVTT), so the HTTP
+transcript engine can be run without touching YouTube:
+
+    python benchmarks/fake_caption_server.py --port 8766 --latency 0.05
+    set YOUTUBE_WATCH_ENDPOINT=http://127.0.0.1:8766
+    python app.py
+
+    python benchmarks/fake_caption_server.py --run 500 --workers 16
+
+Any video ID is accepted and always gets the same sample. A sample file
+named <videoId>.<format> is served for that video only. Some videos have
+no captions (--no-captions-rate) or are unplayable (--unplayable-rate);
+--error-rate injects 500/503/429 responses. GET /_stats returns the call
+count per endpoint.
+"""
+import os
+import sys
+import json
+import time
+import random
+import zlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "caption_samples")
+
+CONTENT_TYPES = {
+    "json3": "application/json; charset=UTF-8",
+    "srv1": "text/xml; charset=UTF-8",
+    "srv3": "text/xml; charset=UTF-8",
+    "vtt": "text/vtt; charset=UTF-8",
+}
+
+class FakeCaptionConfig:
+    """Behaviour of the fake server; may be changed while it runs."""
+
+    def __init__(self, samples_dir=SAMPLES_DIR, latency=0.0, error_rate=0.0,
+                 no_captions_rate=0.05, unplayable_rate=0.02, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.no_captions_rate = no_captions_rate
+        self.unplayable_rate = unplayable_rate
+        self.random = random.Random(seed)
+        self.calls = {}
+        self.lock = threading.Lock()
+        self.samples = {}  # name -> (format, payload)
+        for file_name in sorted(os.listdir(samples_dir)):
+            name, _, fmt = file_name.rpartition(".")
+            if fmt in CONTENT_TYPES:
+                with open(os.path.join(samples_dir, file_name), encoding="utf-8") as f:
+                    self.samples[name] = (fmt, f.read())
+        self.shared = sorted(self.samples)
+
+    def count(self, endpoint):
+        with self.lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+
+    def injected_error(self):
+        with self.lock:
+            if self.random.random() < self.error_rate:
+                return self.random.choice([500, 503, 429])
+        return None
+
+    def video(self, video_id):
+        """Returns (kind, sample_name) for a video; the same ID always gets the same answer."""
+        roll = zlib.crc32(video_id.encode("utf-8"))
+        if video_id in self.samples:
+            return "captions", video_id
+        if (roll % 1000) / 1000 < self.unplayable_rate:
+            return "unplayable", None
+        if ((roll // 1000) % 1000) / 1000 < self.no_captions_rate:
+            return "no_captions", None
+        return "captions", self.shared[roll % len(self.shared)]
+
+def watch_page(config, video_id):
+    kind, sample = config.video(video_id)
+    player_response = {
+        "playabilityStatus": {"status": "OK"},
+        "videoDetails": {"videoId": video_id, "title": f"Sample {sample or kind}: {video_id}"},
+    }
+    if kind == "unplayable":
+        player_response["playabilityStatus"] = {"status": "ERROR", "reason": "Video unavailable"}
+    elif kind == "captions":
+        player_response["captions"] = {"playerCaptionsTracklistRenderer": {"captionTracks": [
+            {"baseUrl": f"/api/timedtext?v={video_id}&lang=de&kind=asr", "name": {"simpleText": "German (auto-generated)"},
+             "languageCode": "de", "kind": "asr"},
+            {"baseUrl": f"/api/timedtext?v={video_id}&lang=en", "name": {"simpleText": "English"},
+             "languageCode": "en"},
+        ]}}
+    # Roughly the shape of the real page: a large document with the JSON in a script tag
+    return ("<!DOCTYPE html><html><head><title>" + video_id + " - YouTube</title></head><body>"
+            + "<div>" + "x" * 20000 + "</div>"
+            + "<script>var ytInitialPlayerResponse = " + json.dumps(player_response)
+            + ";var meta = document.createElement('meta');</script></body></html>")
+
+def make_handler(config):
+    class FakeCaptionHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real site
+        disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body, content_type="text/html; charset=UTF-8"):
+            data = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {name: values[0] for name, values in parse_qs(url.query).items()}
+            endpoint = url.path.rstrip("/").rsplit("/", 1)[-1]
+
+            if endpoint == "_stats":
+                return self._send(200, json.dumps(config.calls), "application/json")
+            if endpoint not in ("watch", "timedtext"):
+                return self._send(404, "Not found", "text/plain")
+
+            config.count(endpoint)
+            if config.latency:
+                time.sleep(config.latency)
+            error = config.injected_error()
+            if error:
+                return self._send(error, "Injected error", "text/plain")
+
+            video_id = params.get("v", "")
+            if endpoint == "watch":
+                return self._send(200, watch_page(config, video_id))
+
+            kind, sample = config.video(video_id)
+            if kind != "captions":
+                return self._send(404, "", "text/plain")
+            fmt, payload = config.samples[sample]
+            self._send(200, payload, CONTENT_TYPES[fmt])
+
+    return FakeCaptionHandler
+
+def start_server(port=0, config=None):
+    """
+    Starts the fake site in a background thread.
+    Returns (server, endpoint_url); call server.shutdown() when done.
+    """
+    config = config or FakeCaptionConfig()
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(config))
+    server.daemon_threads = True
+    server.config = config
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def run_engine(endpoint, videos, workers, download_dir):
+    """Downloads `videos` transcripts from the fake site with the HTTP engine and prints the timing."""
+    sys.path.insert(0, ROOT)
+    from services.transcript_service import fetch_transcripts_generator
+
+    urls = [f"https://www.youtube.com/watch?v=fake{n:07d}" for n in range(videos)]
+    started = time.perf_counter()
+    for line in fetch_transcripts_generator(urls, download_dir=download_dir, workers=workers, endpoint=endpoint):
+        if not line.startswith("["):
+            print(f"{time.perf_counter() - started:7.2f}  {line}")
+    elapsed = time.perf_counter() - started
+    print(f"{videos} videos with {workers} workers in {elapsed:.2f}s ({videos / elapsed:.1f} videos/s)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered with 5xx/429")
+    parser.add_argument("--no-captions-rate", type=float, default=0.05)
+    parser.add_argument("--unplayable-rate", type=float, default=0.02)
+    parser.add_argument("--samples", default=SAMPLES_DIR, help="folder of recorded caption payloads")
+    parser.add_argument("--run", type=int, default=0, metavar="VIDEOS",
+                        help="download this many transcripts with the HTTP engine, then exit")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--download-dir", default=os.path.join(ROOT, "uploads", "fake_transcripts"))
+    args = parser.parse_args(argv)
+
+    config = FakeCaptionConfig(args.samples, args.latency, args.error_rate,
+                               args.no_captions_rate, args.unplayable_rate)
+    server, url = start_server(0 if args.run else args.port, config)
+    if args.run:
+        run_engine(url, args.run, args.workers, args.download_dir)
+        print(f"Server calls: {config.calls}")
+        server.shutdown()
+        return
+    print(f"Fake caption site listening on {url} (set YOUTUBE_WATCH_ENDPOINT={url})")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    sys.exit(main())
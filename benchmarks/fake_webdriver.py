@@ -0,0 +1,176 @@
+"""
+Stand-in for the Selenium Chrome driver used by services/browser_service.py.
+
+A FakeWebDriver plays both the browser and the userscript. On get() it
+"runs" the userscript: after a random delay it writes a transcript file
+into its download directory and reports SUCCESS/FAILED, the way the real
+script POSTs to /api/log. Some videos never report, which exercises the
+timeout fallback. Runs the worker pool without Chrome:
+
+    python benchmarks/fake_webdriver.py --videos 40 --workers 4
+
+By default reports go straight to completion_service.notify (in-process);
+--server http://127.0.0.1:5000 posts them to a running app instead.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class FakeWebDriver:
+    """
+    Implements the part of the WebDriver API that browser_service uses:
+    get, refresh, execute_script, execute_cdp_cmd, window_handles and quit.
+    `crash_rate` makes get() fail and the browser stop responding.
+    """
+
+    def __init__(self, report, download_dir=None, min_delay=0.5, max_delay=2.0,
+                 failure_rate=0.05, silent_rate=0.02, crash_rate=0.0, seed=None):
+        self.report = report
+        self.download_dir = download_dir
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.failure_rate = failure_rate
+        self.silent_rate = silent_rate
+        self.crash_rate = crash_rate
+        self.random = random.Random(seed)
+        self.current_url = None
+        self.pages_opened = 0
+        self._timer = None
+        self._closed = False
+
+    @property
+    def window_handles(self):
+        if self._closed:
+            raise RuntimeError("browser is not running")
+        return ["fake-window"]
+
+    def get(self, url):
+        if self._closed:
+            raise RuntimeError("browser is not running")
+        if self.random.random() < self.crash_rate:
+            self._closed = True
+            raise RuntimeError("chrome not reachable (simulated crash)")
+        self.current_url = url
+        self.pages_opened += 1
+        if self._timer:
+            self._timer.cancel()  # navigating away stops the script on the old page
+
+        from services.completion_service import video_id_from_url
+        video_id = video_id_from_url(url)
+        if not video_id or self.random.random() < self.silent_rate:
+            return
+        delay = self.random.uniform(self.min_delay, self.max_delay)
+        failed = self.random.random() < self.failure_rate
+        self._timer = threading.Timer(delay, self._run_userscript, args=(video_id, failed))
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _run_userscript(self, video_id, failed):
+        title = f"Fake video {video_id}"
+        if failed:
+            self.report({"videoId": video_id, "title": title, "status": "FAILED",
+                         "message": "Transcript not found or empty after timeout"})
+            return
+        file_name = f"{title}_transcript.txt"
+        if self.download_dir:
+            os.makedirs(self.download_dir, exist_ok=True)
+            with open(os.path.join(self.download_dir, file_name), "w", encoding="utf-8") as f:
+                f.write(f"transcript of {video_id}")
+        self.report({"videoId": video_id, "title": title, "status": "SUCCESS",
+                     "message": "Downloaded " + file_name})
+
+    def refresh(self):
+        if self.current_url:
+            self.get(self.current_url)
+
+    def execute_script(self, script, *args):
+        return None
+
+    def execute_cdp_cmd(self, cmd, params):
+        return {}
+
+    def quit(self):
+        self._closed = True
+        if self._timer:
+            self._timer.cancel()
+
+def http_reporter(server_url):
+    """Returns a report function that POSTs to <server_url>/api/log like the userscript."""
+    def report(entry):
+        request = urllib.request.Request(
+            server_url.rstrip("/") + "/api/log", data=json.dumps(entry).encode("utf-8"),
+            headers={"Content-Type": "application/json"}, method="POST"
+        )
+        urllib.request.urlopen(request, timeout=10).read()
+    return report
+
+def fake_driver_factory(report=None, **options):
+    """
+    Returns a DriverPool factory that builds FakeWebDrivers instead of
+    launching Chrome. Each driver gets its own random seed; `launch_delay`
+    stands in for Chrome's start-up time.
+    """
+    if report is None:
+        from services.completion_service import notify as report
+    counter = iter(range(1, 1_000_000))
+    seed = options.pop("seed", None)
+    launch_delay = options.pop("launch_delay", 0.0)
+
+    def factory(download_dir=None, chromedriver_path=None, user_data_dir=None, refresh_profile=False):
+        time.sleep(launch_delay)  # Chrome start-up and profile sync
+        driver_seed = None if seed is None else seed + next(counter)
+        return FakeWebDriver(report, download_dir=download_dir, seed=driver_seed, **options)
+    return factory
+
+def fake_pool(report=None, **options):
+    """A browser_service-style DriverPool of FakeWebDrivers."""
+    from services.driver_pool import DriverPool
+    return DriverPool(fake_driver_factory(report, **options), "FakeChromeProfile")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the browser worker pool against fake WebDrivers.")
+    parser.add_argument("--videos", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=5.0, help="per-video timeout in seconds")
+    parser.add_argument("--min-delay", type=float, default=0.5)
+    parser.add_argument("--max-delay", type=float, default=2.0)
+    parser.add_argument("--failure-rate", type=float, default=0.05)
+    parser.add_argument("--silent-rate", type=float, default=0.02)
+    parser.add_argument("--crash-rate", type=float, default=0.0)
+    parser.add_argument("--launch-delay", type=float, default=2.0, help="simulated browser start-up seconds")
+    parser.add_argument("--batches", type=int, default=1, help="back-to-back batches sharing the browser pool")
+    parser.add_argument("--download-dir", default=None)
+    parser.add_argument("--server", default=None, help="post reports to this app instead of in-process")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, ROOT)
+    from services.browser_service import open_videos_generator
+
+    report = http_reporter(args.server) if args.server else None
+    pool = fake_pool(report, min_delay=args.min_delay, max_delay=args.max_delay, failure_rate=args.failure_rate,
+                     silent_rate=args.silent_rate, crash_rate=args.crash_rate,
+                     launch_delay=args.launch_delay, seed=args.seed)
+
+    for batch in range(args.batches):
+        urls = [f"https://www.youtube.com/watch?v=fake{batch:02d}{n:07d}" for n in range(args.videos)]
+        started = time.perf_counter()
+        for line in open_videos_generator(urls, download_dir=args.download_dir, wait_seconds=args.timeout,
+                                          workers=args.workers, pool=pool):
+            if not args.quiet or not line.startswith(("[", "    ")):
+                print(f"{time.perf_counter() - started:7.2f}  {line}")
+        elapsed = time.perf_counter() - started
+        print(f"batch {batch + 1}: {args.videos} videos with {args.workers} workers in {elapsed:.1f}s "
+              f"({args.videos / elapsed * 60:.0f} videos/min)")
+    pool.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Local stand-in for the YouTube Data API endpoints used by services/youtube_service.py.
+
+Serves channels, playlistItems and videos with deterministic fake data, so
+fetch runs can be exercised without an API key or quota:
+
+    python benchmarks/fake_youtube_api.py --port 8765 --videos 500 --latency 0.05
+    set YOUTUBE_API_ENDPOINT=http://127.0.0.1:8765
+    python app.py
+
+Any channel ID is accepted. Responses carry an "etag" and honour If-None-Match
+with 304, like the real API. Errors can be injected with --error-rate (random
+500/503/429 responses) and --quota-limit (403 quotaExceeded after that many
+calls). GET /_stats returns the call count per endpoint.
+"""
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+PAGE_SIZE = 50
+
+class FakeYouTubeConfig:
+    """Behaviour of the fake server; may be changed while it runs."""
+
+    def __init__(self, videos_per_channel=230, latency=0.0, error_rate=0.0, quota_limit=None, seed=0):
+        self.videos_per_channel = videos_per_channel
+        self.latency = latency
+        self.error_rate = error_rate
+        self.quota_limit = quota_limit
+        self.random = random.Random(seed)
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def count(self, endpoint):
+        """Counts the call and returns the total number of calls so far."""
+        with self.lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+            return sum(self.calls.values())
+
+    def injected_error(self, total_calls):
+        """Returns (status, reason) for an error to send instead of data, or None."""
+        if self.quota_limit is not None and total_calls > self.quota_limit:
+            return 403, "quotaExceeded"
+        with self.lock:
+            roll = self.random.random()
+            if roll < self.error_rate:
+                return self.random.choice([(500, "backendError"), (503, "backendError"), (429, "rateLimitExceeded")])
+        return None
+
+def fake_video_id(channel_id, number):
+    return f"{channel_id[-6:]}_{number:05d}"
+
+def _channels(config, params):
+    channel_id = params["id"]
+    return {"items": [{
+        "id": channel_id,
+        "contentDetails": {"relatedPlaylists": {"uploads": "UU" + channel_id[2:]}},
+        "snippet": {"title": f"Fake Channel {channel_id}"},
+    }]}
+
+def _playlist_items(config, params):
+    channel_id = "UC" + params["playlistId"][2:]
+    total = config.videos_per_channel
+    start = int(params.get("pageToken") or 0)
+    base = datetime(2015, 1, 1)
+
+    items = []
+    # Newest first, like the real uploads playlist
+    for position in range(start, min(start + PAGE_SIZE, total)):
+        number = total - position
+        items.append({"snippet": {
+            "title": f"Fake video {number} of {channel_id}",
+            "channelTitle": f"Fake Channel {channel_id}",
+            "publishedAt": (base + timedelta(hours=12 * number)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "description": f"Description of video {number}. " * 20,
+            "resourceId": {"kind": "youtube#video", "videoId": fake_video_id(channel_id, number)},
+        }})
+
+    body = {"items": items, "pageInfo": {"totalResults": total}}
+    if start + PAGE_SIZE < total:
+        body["nextPageToken"] = str(start + PAGE_SIZE)
+    return body
+
+def _videos(config, params):
+    items = []
+    for video_id in params["id"].split(","):
+        number = int(video_id.rsplit("_", 1)[-1])
+        items.append({
+            "id": video_id,
+            "contentDetails": {"duration": f"PT{number % 50}M{number % 60}S"},
+            "snippet": {"tags": ["fake", f"tag{number % 7}"], "categoryId": "22"},
+        })
+    return {"items": items}
+
+ENDPOINTS = {
+    "channels": _channels,
+    "playlistItems": _playlist_items,
+    "videos": _videos,
+}
+
+def make_handler(config):
+    class FakeYouTubeHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, body, headers=None):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=UTF-8")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {name: values[0] for name, values in parse_qs(url.query).items()}
+            endpoint = url.path.rstrip("/").rsplit("/", 1)[-1]
+
+            if endpoint == "_stats":
+                return self._send_json(200, config.calls)
+            if endpoint not in ENDPOINTS:
+                return self._send_json(404, {"error": {"code": 404, "message": "Not found"}})
+
+            total_calls = config.count(endpoint)
+            if config.latency:
+                time.sleep(config.latency)
+
+            error = config.injected_error(total_calls)
+            if error:
+                status, reason = error
+                return self._send_json(status, {"error": {
+                    "code": status, "message": reason, "errors": [{"reason": reason, "message": reason}],
+                }})
+
+            body = ENDPOINTS[endpoint](config, params)
+            etag = '"' + hashlib.md5(json.dumps(body, sort_keys=True).encode("utf-8")).hexdigest() + '"'
+            body["etag"] = etag
+
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self._send_json(200, body, {"ETag": etag})
+
+    return FakeYouTubeHandler
+
+def start_server(port=0, config=None):
+    """
+    Starts the fake API in a background thread.
+    Returns (server, endpoint_url); call server.shutdown() when done.
+    """
+    config = config or FakeYouTubeConfig()
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(config))
+    server.daemon_threads = True
+    server.config = config
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--videos", type=int, default=230, help="uploads per channel")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered with 5xx/429")
+    parser.add_argument("--quota-limit", type=int, default=None, help="calls before 403 quotaExceeded")
+    args = parser.parse_args(argv)
+
+    config = FakeYouTubeConfig(args.videos, args.latency, args.error_rate, args.quota_limit)
+    server, url = start_server(args.port, config)
+    print(f"Fake YouTube Data API listening on {url} (set YOUTUBE_API_ENDPOINT={url})")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,290 @@
+"""
+Load test of the web app's progress streams against many simultaneous clients.
+
+    python benchmarks/load_test.py
+    python benchmarks/load_test.py --clients 100 --videos 5000 --jobs 10 --watchers 3
+    python benchmarks/load_test.py --server flask     # the threaded development server, for comparison
+
+Starts the app (python app.py --no-browser) in a temporary working folder
+and home directory, pointed at benchmarks/fake_youtube_api.py and
+benchmarks/fake_caption_server.py running in this process. Then, at once:
+
+  * --clients channel fetches, each reading /fetch-stream?stream=ndjson
+  * --jobs HTTP-engine transcript jobs of --job-videos videos, each watched
+    by --watchers clients on /jobs/<id>/stream?stream=sse
+  * --loggers threads posting to /api/log (the userscript's report) in a
+    loop, to show whether short requests still get through while every
+    stream is open
+
+Reports per stream kind the time to the first event, total time, events,
+lines and heartbeats received and failures, plus /api/log latency
+percentiles. Results are saved as JSON in --output (benchmarks/results/).
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import http.client
+from datetime import datetime
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+sys.path.insert(0, BENCH_DIR)
+from bench_pipelines import percentiles, git_commit
+
+# Data API requests per second allowed by the app's quota scheduler; shared
+# by all fetches, so it is set high enough not to be what is measured
+FAKE_API_REQUESTS_PER_SECOND = 5000
+
+# Seconds to wait for the app to accept connections
+STARTUP_TIMEOUT = 60
+
+# Seconds a client waits on a silent stream; longer than HEARTBEAT_SECONDS
+CLIENT_TIMEOUT = 60
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_for_app(port, process):
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"the app exited with code {process.returncode}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            conn.request("GET", "/metrics")
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("the app did not start in time")
+
+class StreamClient(threading.Thread):
+    """Reads one NDJSON or SSE progress stream and records what arrived when."""
+
+    def __init__(self, port, method, path, body=None, kind="fetch"):
+        super().__init__(daemon=True)
+        self.port, self.method, self.path, self.body, self.kind = port, method, path, body, kind
+        self.result = {"kind": kind, "events": 0, "lines": 0, "heartbeats": 0, "ended": False}
+
+    def events(self, response, sse):
+        data = None
+        for raw in response:
+            line = raw.decode("utf-8").rstrip("\n")
+            if not sse:
+                if line:
+                    yield json.loads(line)
+            elif line.startswith("data: "):
+                data = line[len("data: "):]
+            elif not line and data is not None:
+                yield json.loads(data)
+                data = None
+
+    def run(self):
+        started = time.perf_counter()
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=CLIENT_TIMEOUT)
+            headers = {"Content-Type": "application/x-www-form-urlencoded"} if self.body else {}
+            conn.request(self.method, self.path, body=self.body, headers=headers)
+            response = conn.getresponse()
+            if response.status != 200:
+                raise RuntimeError(f"HTTP {response.status}: {response.read()[:200]!r}")
+            self.result["job_id"] = response.getheader("X-Job-Id")
+            sse = response.getheader("Content-Type", "").startswith("text/event-stream")
+            for event in self.events(response, sse):
+                if "first_event_ms" not in self.result:
+                    self.result["first_event_ms"] = (time.perf_counter() - started) * 1000
+                self.result["events"] += 1
+                if event["type"] == "start":
+                    self.result["job_id"] = event.get("job_id")
+                elif event["type"] == "progress":
+                    self.result["lines"] += len(event["lines"])
+                elif event["type"] == "heartbeat":
+                    self.result["heartbeats"] += 1
+                elif event["type"] == "error":
+                    self.result["error"] = event["message"]
+                elif event["type"] == "end":
+                    self.result["ended"] = True
+                    break
+            conn.close()
+        except Exception as e:
+            self.result["error"] = f"{type(e).__name__}: {e}"
+        self.result["seconds"] = time.perf_counter() - started
+
+def log_poster(port, stop, latencies, failures):
+    """Posts userscript reports until `stop` is set."""
+    conn = None
+    n = 0
+    while not stop.is_set():
+        n += 1
+        body = json.dumps({"videoId": f"load{n:07d}", "title": f"Load test {n}", "status": "info",
+                           "message": "load test"})
+        started = time.perf_counter()
+        try:
+            conn = conn or http.client.HTTPConnection("127.0.0.1", port, timeout=CLIENT_TIMEOUT)
+            conn.request("POST", "/api/log", body=body, headers={"Content-Type": "application/json"})
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                failures.append(response.status)
+        except Exception as e:
+            failures.append(f"{type(e).__name__}: {e}")
+            conn = None
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+        time.sleep(0.05)
+
+def summarize(clients):
+    done = [c.result for c in clients]
+    return {
+        "clients": len(done),
+        "completed": sum(1 for r in done if r["ended"] and "error" not in r),
+        "failed": sum(1 for r in done if "error" in r or not r["ended"]),
+        "first_event_ms": percentiles([r["first_event_ms"] for r in done if "first_event_ms" in r]),
+        "seconds": percentiles([r["seconds"] * 1000 for r in done]),
+        "events": sum(r["events"] for r in done),
+        "lines": sum(r["lines"] for r in done),
+        "heartbeats": sum(r["heartbeats"] for r in done),
+        "errors": sorted({r["error"] for r in done if "error" in r})[:10],
+    }
+
+def format_summary(label, summary):
+    first, seconds = summary["first_event_ms"], summary["seconds"]
+    return (f"{label:<8} {summary['completed']:>4}/{summary['clients']:<4} completed"
+            f"  first event p50 {first.get('p50', 0):>8.1f} ms  p99 {first.get('p99', 0):>8.1f} ms"
+            f"  total p50 {seconds.get('p50', 0) / 1000:>6.2f}s  max {seconds.get('max', 0) / 1000:>6.2f}s"
+            f"  {summary['events']} events, {summary['lines']} lines, {summary['heartbeats']} heartbeats")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test of the web app's progress streams.")
+    parser.add_argument("--clients", type=int, default=50, help="simultaneous /fetch-stream clients")
+    parser.add_argument("--videos", type=int, default=1000, help="videos per fetched channel")
+    parser.add_argument("--jobs", type=int, default=5, help="HTTP-engine transcript jobs")
+    parser.add_argument("--job-videos", type=int, default=200, help="videos per job")
+    parser.add_argument("--watchers", type=int, default=2, help="SSE clients per job")
+    parser.add_argument("--loggers", type=int, default=4, help="threads posting to /api/log meanwhile")
+    parser.add_argument("--latency", type=float, default=0.01, help="seconds the fake servers add to every response")
+    parser.add_argument("--server", choices=("waitress", "flask"), default="waitress")
+    parser.add_argument("--threads", type=int, default=None, help="app server threads (default: the app's)")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary working folder")
+    parser.add_argument("--output", default=RESULTS_DIR, help="folder for the JSON results")
+    args = parser.parse_args(argv)
+
+    from fake_youtube_api import start_server as start_api, FakeYouTubeConfig
+    from fake_caption_server import start_server as start_captions, FakeCaptionConfig
+    api, api_url = start_api(0, FakeYouTubeConfig(args.videos, args.latency))
+    captions, captions_url = start_captions(0, FakeCaptionConfig(latency=args.latency))
+
+    workdir = tempfile.mkdtemp(prefix="load_test_")
+    port = free_port()
+    env = dict(os.environ, PYTHONPATH=ROOT, HOME=workdir, USERPROFILE=workdir,
+               YOUTUBE_API_ENDPOINT=api_url, YOUTUBE_WATCH_ENDPOINT=captions_url,
+               YOUTUBE_API_REQUESTS_PER_SECOND=str(FAKE_API_REQUESTS_PER_SECOND))
+    command = [sys.executable, os.path.join(ROOT, "app.py"), "--no-browser", "--port", str(port),
+               "--server", args.server]
+    if args.threads:
+        command += ["--threads", str(args.threads)]
+    with open(os.path.join(workdir, "app.log"), "w", encoding="utf-8") as app_log:
+        process = subprocess.Popen(command, cwd=workdir, env=env, stdout=app_log, stderr=subprocess.STDOUT)
+    try:
+        wait_for_app(port, process)
+        print(f"App ({args.server}) on port {port}; {args.clients} fetch streams, {args.jobs} jobs x "
+              f"{args.watchers} SSE watchers, {args.loggers} /api/log posters", flush=True)
+
+        stop = threading.Event()
+        log_latencies, log_failures = [], []
+        loggers = [threading.Thread(target=log_poster, args=(port, stop, log_latencies, log_failures), daemon=True)
+                   for _ in range(args.loggers)]
+        for thread in loggers:
+            thread.start()
+
+        started = time.perf_counter()
+        fetches = []
+        for n in range(args.clients):
+            query = urlencode({"api_key": "load-key", "channel_id": f"UCload{n:09d}", "cache": "0",
+                               "format": "csv", "stream": "ndjson"})
+            fetches.append(StreamClient(port, "GET", f"/fetch-stream?{query}", kind="fetch"))
+        # Each job is started by an NDJSON /open-videos-stream client; more clients attach over SSE
+        job_starters = []
+        for n in range(args.jobs):
+            body = urlencode([("video_urls", f"https://www.youtube.com/watch?v=load{n:03d}_{v:05d}")
+                              for v in range(args.job_videos)]
+                             + [("engine", "http"), ("workers", "8"), ("stream", "ndjson"),
+                                ("download_dir", os.path.join(workdir, "transcripts"))])
+            job_starters.append(StreamClient(port, "POST", "/open-videos-stream", body=body, kind="job"))
+        for client in fetches + job_starters:
+            client.start()
+
+        watchers = []
+        for starter in job_starters:
+            deadline = time.monotonic() + CLIENT_TIMEOUT
+            while not starter.result.get("job_id") and starter.is_alive() and time.monotonic() < deadline:
+                time.sleep(0.05)
+            if starter.result.get("job_id"):
+                for _ in range(args.watchers):
+                    watcher = StreamClient(port, "GET", f"/jobs/{starter.result['job_id']}/stream?stream=sse",
+                                           kind="watcher")
+                    watcher.start()
+                    watchers.append(watcher)
+
+        for client in fetches + job_starters + watchers:
+            client.join()
+        seconds = time.perf_counter() - started
+        stop.set()
+        for thread in loggers:
+            thread.join()
+
+        summaries = {"fetch": summarize(fetches), "job": summarize(job_starters), "watcher": summarize(watchers)}
+        for label, summary in summaries.items():
+            if summary["clients"]:
+                print(format_summary(label, summary))
+                for error in summary["errors"]:
+                    print(f"         error: {error}")
+        api_log = {"latency_ms": percentiles(log_latencies), "failures": len(log_failures)}
+        latency = api_log["latency_ms"]
+        print(f"/api/log  {latency.get('count', 0)} posts  p50 {latency.get('p50', 0):.1f} ms"
+              f"  p99 {latency.get('p99', 0):.1f} ms  max {latency.get('max', 0):.1f} ms"
+              f"  {len(log_failures)} failed")
+        print(f"Wall time {seconds:.2f}s; fake API calls {sum(api.config.calls.values())}")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        api.shutdown()
+        captions.shutdown()
+        if args.keep:
+            print(f"Working folder (app.log, exports, transcripts) kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(args.output, f"load-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "options": vars(args),
+            "seconds": round(seconds, 3),
+            "streams": summaries,
+            "api_log": api_log,
+        }, f, indent=2)
+    print(f"Results saved to {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from urllib.parse import urlparse, parse_qsl
+from googleapiclient.errors import HttpError
+
+# On-disk cache for YouTube Data API responses, next to the exported spreadsheets
+CACHE_PATH = os.path.join('uploads', 'api_cache.db')
+
+# Seconds a cached response is served without asking the API again.
+# Uploads lists change most often, channel metadata hardly ever.
+CACHE_TTLS = {
+    "channels": 24 * 3600,
+    "playlistItems": 5 * 60,
+    "videos": 3600,
+}
+
+# Least recently used entries are evicted once the cache grows past this
+CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# Query parameters that do not change the response
+_IGNORED_PARAMS = {"key", "alt"}
+
+def cache_key(request, endpoint):
+    """
+    Builds a stable key from the endpoint and request parameters.
+    The API key is left out so it is never written to disk.
+    """
+    params = sorted(
+        (name, value) for name, value in parse_qsl(urlparse(request.uri).query)
+        if name not in _IGNORED_PARAMS
+    )
+    raw = endpoint + "?" + "&".join(f"{name}={value}" for name, value in params)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """
+    Size-bounded LRU cache of API responses stored in SQLite.
+    Fresh entries are returned directly; stale entries with an ETag are
+    revalidated with If-None-Match. Hit/miss counters are kept per instance,
+    so create one per run to report that run's numbers.
+    """
+
+    def __init__(self, path=None, ttls=None, max_bytes=CACHE_MAX_BYTES):
+        self.path = path or CACHE_PATH
+        self.ttls = dict(CACHE_TTLS, **(ttls or {}))
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "revalidated": 0, "evicted": 0}
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    endpoint TEXT NOT NULL,
+                    etag TEXT,
+                    body TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    stored_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_responses_access ON responses (last_access);
+            """)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def summary(self):
+        """Returns a one-line description of the counters for the progress stream."""
+        s = self.stats
+        return (f"Cache: {s['hits']} hits, {s['misses']} misses, "
+                f"{s['revalidated']} revalidated, {s['evicted']} evicted")
+
+    def execute(self, request, endpoint, execute=None):
+        """
+        Returns the response for `request`, from disk when possible.
+        `execute(request, endpoint)` performs the real call (defaults to request.execute()).
+        """
+        execute = execute or (lambda req, _endpoint: req.execute())
+        ttl = self.ttls.get(endpoint, 0)
+        key = cache_key(request, endpoint)
+        now = time.time()
+
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT etag, body, stored_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row and now - row[2] < ttl:
+                conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+                conn.commit()
+                self._count("hits")
+                return json.loads(row[1])
+
+            if row and row[0]:
+                request.headers["If-None-Match"] = row[0]
+
+            try:
+                response = execute(request, endpoint)
+            except HttpError as e:
+                if row and e.resp.status == 304:
+                    # Not modified: the stored body is still current
+                    conn.execute(
+                        "UPDATE responses SET stored_at = ?, last_access = ? WHERE key = ?",
+                        (now, now, key)
+                    )
+                    conn.commit()
+                    self._count("revalidated")
+                    return json.loads(row[1])
+                raise
+
+            self._count("misses")
+            if ttl > 0 or response.get("etag"):
+                self._store(conn, key, endpoint, response, now)
+            return response
+        finally:
+            conn.close()
+
+    def _store(self, conn, key, endpoint, response, now):
+        body = json.dumps(response)
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, endpoint, etag, body, size, stored_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, endpoint, response.get("etag"), body, len(body), now, now)
+            )
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+
+            # Evict least recently used entries until back under the limit
+            for old_key, size in conn.execute(
+                "SELECT key, size FROM responses ORDER BY last_access"
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM responses WHERE key = ?", (old_key,))
+                total -= size
+                self._count("evicted")
@@ -1,11 +1,33 @@
 import os
-import shutil
+import queue
+import atexit
+import threading
 import time
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
+from services import completion_service, metrics, profile_service
+from services.driver_pool import DriverPool, is_healthy
 
 # --- CONFIGURATION ---
+# Longest wait, counted from opening the page, for the userscript's
+# /api/log report before moving on.
+# The first video gets longer: the extension is still starting up.
 WAIT_TIME_SECONDS = 15
+FIRST_VIDEO_WAIT_SECONDS = 30
+
+# Wait after a page load before nudging the userscript with yt-navigate-finish
+PAGE_SETTLE_SECONDS = 3
+
+# How often the stream shows it is still waiting
+PROGRESS_EVERY_SECONDS = 5
+
+# How quickly a stop request interrupts a wait
+STOP_CHECK_SECONDS = 0.5
+
+# Upper limit for parallel browsers; each one is a full Chrome instance
+MAX_BROWSER_WORKERS = 8
+
+_WORKER_DONE = object()
 
 # ORIGINAL PROFILE PATHS (Adjust these based on User's system if needed)
 # The user's script had: C:\Users\tiwar\AppData\Local\Google\Chrome\User Data
@@ -17,11 +39,16 @@ CHROME_BINARY_LOCATION = r"C:\Program Files\Google\Chrome\Application\chrome.exe
 TEMP_USER_DATA_DIR = os.path.join(os.getcwd(), "TempChromeProfile")
 TEMP_PROFILE_DIR = "Profile 2"
 
-def setup_temp_profile():
-    """Creates a temporary copy of the Chrome profile."""
+def setup_temp_profile(user_data_dir=TEMP_USER_DATA_DIR, force_refresh=False):
+    """
+    Keeps a copy of the Chrome profile in `user_data_dir` up to date.
+    The copy is kept between runs and only changed files are synced;
+    `force_refresh` deletes it and copies everything again.
+    Returns the sync stats (see profile_service.sync_profile), or False.
+    """
     # Ensure source exists
     source_profile = os.path.join(USER_DATA_DIR, PROFILE_DIR)
-    dest_profile = os.path.join(TEMP_USER_DATA_DIR, TEMP_PROFILE_DIR)
+    dest_profile = os.path.join(user_data_dir, TEMP_PROFILE_DIR)
     
     print(f"DEBUG: Looking for source profile at: {source_profile}")
 
@@ -36,20 +63,15 @@ def setup_temp_profile():
             pass
         return False
     
-    # Remove old temp profile
-    if os.path.exists(TEMP_USER_DATA_DIR):
-        try:
-            shutil.rmtree(TEMP_USER_DATA_DIR)
-        except Exception as e:
-            print(f"Warning: Could not remove old temp profile: {e}")
-    
-    # Copy
+    # Sync the snapshot (full copy on first use or when forced)
     try:
-        os.makedirs(TEMP_USER_DATA_DIR, exist_ok=True)
-        print(f"DEBUG: Copying profile from {source_profile} to {dest_profile}...")
-        shutil.copytree(source_profile, dest_profile, dirs_exist_ok=True)
-        print("DEBUG: Profile copied successfully.")
-        return True
+        os.makedirs(user_data_dir, exist_ok=True)
+        print(f"DEBUG: Syncing profile from {source_profile} to {dest_profile}...")
+        stats = profile_service.sync_profile(source_profile, dest_profile, force=force_refresh)
+        print(f"DEBUG: {profile_service.describe_sync(stats)}")
+        metrics.PROFILE_SYNC_SECONDS.observe(stats["seconds"])
+        metrics.PROFILE_SYNC_BYTES.inc(stats["copied_bytes"])
+        return stats
     except Exception as e:
         print(f"ERROR: Failed to copy profile: {e}")
         return False
@@ -57,16 +79,20 @@ def setup_temp_profile():
 from selenium.webdriver.chrome.service import Service
 import subprocess
 
-def init_driver(download_dir=None, chromedriver_path=None):
+def init_driver(download_dir=None, chromedriver_path=None, user_data_dir=TEMP_USER_DATA_DIR, refresh_profile=False):
     """
     Initialize Chrome driver with optional specific download directory.
-    Uses 'TempChromeProfile' (copied from `PROFILE_DIR`) to ensure Extensions work.
+    Uses 'TempChromeProfile' (synced from `PROFILE_DIR`) to ensure Extensions work;
+    parallel browsers each pass their own `user_data_dir`.
     """
     
     # 1. SETUP PROFILE
     print("Setting up temporary profile for automation...")
-    if not setup_temp_profile():
+    setup_started = time.perf_counter()
+    profile_sync = setup_temp_profile(user_data_dir, force_refresh=refresh_profile)
+    if not profile_sync:
         print("Profile setup failed or skipped. Proceeding without user data...")
+    print(f"DEBUG: Profile setup took {time.perf_counter() - setup_started:.2f}s")
     
     chrome_options = Options()
     
@@ -85,7 +111,7 @@ def init_driver(download_dir=None, chromedriver_path=None):
     chrome_options.add_argument("--disable-infobars")
     
     # 2. USE THE TEMP PROFILE
-    chrome_options.add_argument(f"user-data-dir={TEMP_USER_DATA_DIR}")
+    chrome_options.add_argument(f"user-data-dir={user_data_dir}")
     chrome_options.add_argument(f"profile-directory={TEMP_PROFILE_DIR}")
     
     # Performance and stability preferences
@@ -142,80 +168,290 @@ def init_driver(download_dir=None, chromedriver_path=None):
         print("DEBUG: Anti-detection scripts injected successfully.")
     except Exception as e:
         print(f"Warning: Could not inject anti-detection script: {e}")
-        
+
+    # Read by open_videos_generator for the run summary
+    driver.profile_sync = profile_sync or None
     return driver
 
-def open_videos_generator(video_urls, download_dir=None, chromedriver_path=None):
+# Browsers stay open between /open-videos-stream requests (see DriverPool)
+browser_pool = DriverPool(init_driver, TEMP_USER_DATA_DIR)
+atexit.register(browser_pool.close)
+
+def _wait_for_report(pending, deadline, stop):
     """
-    Generator that opens videos one by one and yields status messages.
+    Waits until the userscript reports `pending`, `deadline` passes or
+    `stop` is set, yielding a progress line every PROGRESS_EVERY_SECONDS.
+    Returns the log entry through StopIteration (use `yield from`), or None.
     """
-    driver = None
+    next_progress = time.monotonic() + PROGRESS_EVERY_SECONDS
+    while not stop.is_set():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return pending.entry
+        entry = pending.wait(min(remaining, STOP_CHECK_SECONDS))
+        if entry is not None:
+            return entry
+        now = time.monotonic()
+        if now >= next_progress and deadline - now > 0.5:
+            next_progress = now + PROGRESS_EVERY_SECONDS
+            yield f"    ...waiting up to {deadline - now:.0f}s for the userscript..."
+    return pending.entry
+
+def _dispatch_navigate_finish(driver):
+    # Mimics YouTube's SPA navigation event that Tampermonkey listens for
     try:
-        yield f"Initializing Chrome... (Download Dir: {download_dir or 'Default'})"
-        if chromedriver_path:
-             yield f"Using Custom Driver: {chromedriver_path}"
-             
-        driver = init_driver(download_dir, chromedriver_path)
-        yield "Chrome Browser Launched."
-        
-        # Initial sleep to ensure browser is ready
-        time.sleep(3) 
-
-        total = len(video_urls)
-        for i, url in enumerate(video_urls):
-            yield f"[{i+1}/{total}] Opening: {url}"
-            try:
-                driver.get(url)
-                
-                # --- FAILSAFE 1: Wait for page to stabilize ---
-                time.sleep(3)
-                
+        driver.execute_script("""
+            window.dispatchEvent(new CustomEvent('yt-navigate-finish'));
+            console.log('[Selenium] Dispatched yt-navigate-finish event');
+        """)
+    except Exception as js_err:
+        print(f"Warning: Could not inject JS event: {js_err}")
+
+def _describe_timing(entry):
+    # Timing fields reported by the userscript, measured in the page
+    if entry.get("timeToSegmentsMs") is None:
+        return ""
+    parts = [f"button {entry['timeToButtonMs']} ms" if entry.get("timeToButtonMs") is not None else None,
+             f"transcript {entry['timeToSegmentsMs']} ms",
+             f"{entry['segmentCount']} segments" if entry.get("segmentCount") is not None else None]
+    return " (" + ", ".join(p for p in parts if p) + ")"
+
+def _open_video(driver, url, position, total, wait_seconds, first, stop, timings):
+    """
+    Opens one video and waits for the userscript's report. Yields progress
+    lines; returns ("reported", entry), ("timed out", None), ("error", None)
+    or ("stopped", None) if `stop` was set first (use `yield from`).
+    Fills `timings` with the seconds of "page_load" (driver.get) and
+    "waiting" (from then until the outcome).
+    """
+    yield f"[{position}/{total}] Opening: {url}"
+    video_id = completion_service.video_id_from_url(url)
+    timeout = max(wait_seconds, FIRST_VIDEO_WAIT_SECONDS) if first else wait_seconds
+    started = time.monotonic()
+    deadline = started + timeout
+    try:
+        # Register before loading: the userscript may report while get() is still running
+        with completion_service.expect(video_id) as pending:
+            driver.get(url)
+            timings["page_load"] = time.monotonic() - started
+
+            # --- FAILSAFE 1: Give the page a moment, unless the script already reported ---
+            entry = pending.wait(PAGE_SETTLE_SECONDS)
+
+            if entry is None:
                 # --- FAILSAFE 2: Trigger yt-navigate-finish event via JS ---
-                # This mimics YouTube's SPA navigation event that Tampermonkey listens for
-                try:
-                    driver.execute_script("""
-                        window.dispatchEvent(new CustomEvent('yt-navigate-finish'));
-                        console.log('[Selenium] Dispatched yt-navigate-finish event');
-                    """)
-                except Exception as js_err:
-                    print(f"Warning: Could not inject JS event: {js_err}")
-                
-                # --- FAILSAFE 3: Refresh page if first video (forces full reload trigger) ---
-                if i == 0:
-                    time.sleep(2)
+                _dispatch_navigate_finish(driver)
+
+            # --- FAILSAFE 3: Refresh page if first video (forces full reload trigger) ---
+            if entry is None and first:
+                entry = pending.wait(2)
+                if entry is None:
                     driver.refresh()
-                    time.sleep(3)
-                    # Re-dispatch event after refresh
-                    try:
-                        driver.execute_script("window.dispatchEvent(new CustomEvent('yt-navigate-finish'));")
-                    except:
-                        pass
-                
-                # Dynamic Wait Time: 25s for first video, 15s for subsequent
-                wait_seconds = 25 if i == 0 else 15
-                
-                # Wait for the script
-                for s in range(wait_seconds, 0, -1):
-                    if s % 5 == 0: # Update every 5 seconds to show life
-                        yield f"    ...waiting {s}s for script execution..."
-                    time.sleep(1)
-            except Exception as e:
-                yield f"Error opening {url}: {str(e)}"
-        
-        yield "All videos processed."
-        
+                    entry = pending.wait(PAGE_SETTLE_SECONDS)
+                    if entry is None:
+                        _dispatch_navigate_finish(driver)
+
+            if entry is None:
+                entry = yield from _wait_for_report(pending, deadline, stop)
+    except Exception as e:
+        timings["waiting"] = time.monotonic() - started - timings.get("page_load", 0.0)
+        yield f"Error opening {url}: {str(e)}"
+        return "error", None
+
+    elapsed = time.monotonic() - started
+    timings["waiting"] = elapsed - timings.get("page_load", 0.0)
+    if entry is not None:
+        yield f"    {entry.get('status', 'DONE')} in {elapsed:.1f}s: {entry.get('message') or ''}{_describe_timing(entry)}"
+        return "reported", entry
+    if stop.is_set():
+        yield f"    Stopped after {elapsed:.1f}s, before the userscript reported"
+        return "stopped", None
+    reason = "no video ID in URL" if not video_id else "no report from the userscript"
+    yield f"    Moving on after {elapsed:.1f}s ({reason})"
+    return "timed out", None
+
+def open_videos_generator(video_urls, download_dir=None, chromedriver_path=None, wait_seconds=WAIT_TIME_SECONDS,
+                          workers=1, pool=None, refresh_profile=False, positions=None, total=None,
+                          on_video=None, stop=None, registry=None):
+    """
+    Generator that opens videos and yields status messages.
+    Moves on as soon as the userscript reports the video to /api/log,
+    or after `wait_seconds` without a report.
+
+    With `workers` > 1, that many browsers (each with its own profile copy
+    and its own worker-N download subfolder) take videos from a shared
+    queue; their progress is merged into this one stream, each line tagged
+    with its worker.
+
+    Browsers come from `pool` (browser_pool by default, see
+    benchmarks/fake_webdriver.py for a stand-in) and go back to it
+    afterwards, so the next batch starts on a warm browser.
+    `refresh_profile` launches fresh browsers with a re-copied profile.
+
+    Resumed runs pass the original `positions` (1-based) and `total` for
+    the [i/total] labels. `on_video(position, url, state, outcome, entry)`
+    is called from the worker threads as each video moves to "in_progress"
+    and then to "success", "failed", or back to "pending" if the run stopped
+    mid-video. Setting the `stop` event ends the run after the current videos.
+
+    Videos already in `registry` (a DownloadRegistry) are skipped without
+    being opened; they count as "success" with the outcome "skipped".
+    """
+    pool = pool or browser_pool
+    positions = positions or range(1, len(video_urls) + 1)
+    total = total or len(video_urls)
+    on_video = on_video or (lambda *args: None)
+
+    def already_downloaded(url):
+        return registry is not None and completion_service.video_id_from_url(url) in registry
+
+    todo = queue.Queue()
+    skipped = 0
+    for position, url in zip(positions, video_urls):
+        if already_downloaded(url):
+            skipped += 1
+            on_video(position, url, "success", "skipped", None)
+        else:
+            todo.put((position, url))
+    workers = max(1, min(workers, MAX_BROWSER_WORKERS, todo.qsize()))
+    events = queue.Queue()
+    stop = stop or threading.Event()
+    finished = False
+    outcomes = {"reported": 0, "timed out": 0, "error": 0, "skipped": skipped}
+    outcomes_lock = threading.Lock()
+    run_stats = metrics.RunStats("browser")
+
+    def acquire_browser(prefix, worker_dir, refresh):
+        events.put(f"{prefix}Initializing Chrome... (Download Dir: {worker_dir or 'Default'})")
+        pooled = pool.acquire(worker_dir, chromedriver_path, refresh_profile=refresh)
+        if pooled.videos:
+            events.put(f"{prefix}Reusing warm browser ({pooled.videos} videos so far, "
+                       f"~{pooled.launch_seconds:.0f}s start-up avoided).")
+            run_stats.count("browsers reused", 1, metrics.DRIVER_REUSES)
+        else:
+            events.put(f"{prefix}Chrome Browser Launched in {pooled.launch_seconds:.1f}s.")
+            run_stats.observe("browser launch", pooled.launch_seconds, metrics.DRIVER_LAUNCH_SECONDS)
+            profile_sync = getattr(pooled.driver, "profile_sync", None)
+            if profile_sync:
+                run_stats.observe("profile sync", profile_sync["seconds"])
+                run_stats.count("profile MB copied", profile_sync["copied_bytes"] / 1e6)
+        return pooled
+
+    def record_video(outcome, entry, timings):
+        if outcome == "reported":
+            outcome = {"SUCCESS": "success", "SKIPPED": "skipped"}.get(entry.get("status"), "failed")
+        if "page_load" in timings:
+            run_stats.observe("page load", timings["page_load"], metrics.PAGE_LOAD_SECONDS)
+        if "waiting" in timings:
+            run_stats.observe("userscript wait", timings["waiting"], metrics.USERSCRIPT_WAIT_SECONDS,
+                              outcome=outcome)
+        run_stats.observe(f"video {outcome}", sum(timings.values()), metrics.VIDEO_SECONDS,
+                          engine="browser", outcome=outcome)
+
+    def work(number):
+        prefix = f"[W{number}] " if workers > 1 else ""
+        worker_dir = os.path.join(download_dir, f"worker-{number}") if download_dir and workers > 1 else download_dir
+        pooled = None
+        try:
+            pooled = acquire_browser(prefix, worker_dir, refresh_profile)
+            while not stop.is_set():
+                try:
+                    position, url = todo.get_nowait()
+                except queue.Empty:
+                    break
+                if already_downloaded(url):
+                    # e.g. listed twice, or reported while this run was going
+                    events.put(f"{prefix}[{position}/{total}] Skipping (already downloaded): {url}")
+                    with outcomes_lock:
+                        outcomes["skipped"] += 1
+                    on_video(position, url, "success", "skipped", None)
+                    continue
+                # A fresh browser's extension needs the longer first-video wait
+                on_video(position, url, "in_progress", None, None)
+                timings = {}
+                steps = _open_video(pooled.driver, url, position, total, wait_seconds, pooled.videos == 0, stop,
+                                    timings)
+                try:
+                    while True:
+                        events.put(prefix + next(steps))
+                except StopIteration as done:
+                    outcome, entry = done.value
+                pooled.videos += 1
+
+                if outcome == "stopped":
+                    # Not attempted as far as a resumed run is concerned
+                    on_video(position, url, "pending", None, None)
+                    break
+                with outcomes_lock:
+                    outcomes[outcome] += 1
+                record_video(outcome, entry, timings)
+                succeeded = entry is not None and entry.get("status") in ("SUCCESS", "SKIPPED")
+                on_video(position, url, "success" if succeeded else "failed", outcome, entry)
+
+                if outcome == "error" and not is_healthy(pooled.driver):
+                    events.put(f"{prefix}Browser stopped responding; replacing it...")
+                elif pooled.videos >= pool.max_videos:
+                    events.put(f"{prefix}Recycling browser after {pooled.videos} videos...")
+                else:
+                    continue
+                pool.release(pooled)
+                pooled = None
+                if not stop.is_set() and not todo.empty():
+                    pooled = acquire_browser(prefix, worker_dir, False)
+        except Exception as e:
+            events.put(f"{prefix}Critical Error: {str(e)}")
+        finally:
+            if pooled:
+                # Back to the pool for the next batch (print only: the stream may be closed)
+                pool.release(pooled)
+                print(f"{prefix}Browser returned to the pool.")
+            events.put(_WORKER_DONE)
+
+    try:
+        if skipped:
+            yield f"Skipping {skipped} of {len(video_urls)} videos: already downloaded."
+        if todo.empty():
+            finished = True
+            yield f"Nothing to open. {skipped} skipped."
+            return
+        if chromedriver_path:
+             yield f"Using Custom Driver: {chromedriver_path}"
+        if workers > 1:
+            yield f"Starting {workers} browser workers for {todo.qsize()} videos..."
+
+        run_started = time.monotonic()
+        for number in range(1, workers + 1):
+            threading.Thread(target=work, args=(number,), name=f"browser-worker-{number}", daemon=True).start()
+
+        running = workers
+        while running:
+            event = events.get()
+            if event is _WORKER_DONE:
+                running -= 1
+                continue
+            yield event
+        finished = True
+
+        not_opened = todo.qsize()
+        if not_opened and not stop.is_set():
+            yield f"{not_opened} videos were not opened (no browser left running)."
+
+        run_time = time.monotonic() - run_started
+        opened = outcomes["reported"] + outcomes["timed out"] + outcomes["error"]
+        per_video = run_time / opened if opened else 0
+        headline = "Stopped." if stop.is_set() else "All videos processed."
+        yield (f"{headline} {outcomes['reported']} reported, {outcomes['timed out']} timed out, "
+               f"{outcomes['error']} errors, {outcomes['skipped']} skipped; "
+               f"{run_time:.1f}s total, {per_video:.1f}s per opened video.")
+        yield pool.summary()
+        yield run_stats.summary(videos=opened)
+
     except GeneratorExit:
         # Client disconnected, clean exit without yielding
         pass
     except Exception as e:
         yield f"Critical Error: {str(e)}"
     finally:
-        if driver:
-            # Do NOT yield here to avoid 'generator ignored GeneratorExit' if client disconnected
-            # Just print to console for server logs
-            print("Closing Browser due to generator exit/completion...")
-            try:
-                driver.quit()
-            except:
-                pass
-            print("Browser Session Ended.")
+        if not finished:
+            # Workers finish the video they are on, then return their browsers
+            stop.set()
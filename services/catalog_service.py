@@ -0,0 +1,164 @@
+import os
+import json
+import sqlite3
+from datetime import datetime, date
+
+# Persistent catalog of every video fetched so far, per channel.
+# Lives next to the exported spreadsheets.
+CATALOG_PATH = os.path.join('uploads', 'video_catalog.db')
+
+def get_connection(path=None):
+    """
+    Opens the catalog database, creating the tables on first use.
+    Each caller gets its own connection so channel workers can write concurrently.
+    """
+    path = path or CATALOG_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS channels (
+            channel_id TEXT PRIMARY KEY,
+            channel_name TEXT,
+            uploads_playlist_id TEXT,
+            last_synced TEXT,
+            complete INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS videos (
+            video_id TEXT PRIMARY KEY,
+            channel_id TEXT NOT NULL,
+            published_at TEXT,
+            data TEXT NOT NULL,
+            first_seen TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_videos_channel
+            ON videos (channel_id, published_at);
+    """)
+    # Catalogs created before the `complete` flag existed
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(channels)")]
+    if "complete" not in columns:
+        conn.execute("ALTER TABLE channels ADD COLUMN complete INTEGER NOT NULL DEFAULT 1")
+    return conn
+
+def _encode_row(video):
+    row = dict(video)
+    if isinstance(row.get("Published Date"), date):
+        row["Published Date"] = row["Published Date"].isoformat()
+    return json.dumps(row)
+
+def _decode_row(data):
+    row = json.loads(data)
+    if row.get("Published Date"):
+        row["Published Date"] = date.fromisoformat(row["Published Date"])
+    return row
+
+def get_known_video_ids(channel_id):
+    """
+    Returns the set of video IDs already stored for a channel.
+    """
+    conn = get_connection()
+    try:
+        rows = conn.execute("SELECT video_id FROM videos WHERE channel_id = ?", (channel_id,))
+        return {row[0] for row in rows}
+    finally:
+        conn.close()
+
+def is_channel_complete(channel_id):
+    """
+    True if the channel's last sync reached the end of its uploads (or the
+    first already-known video). Only then may an incremental sync stop early.
+    """
+    conn = get_connection()
+    try:
+        row = conn.execute("SELECT complete FROM channels WHERE channel_id = ?", (channel_id,)).fetchone()
+        return bool(row and row[0])
+    finally:
+        conn.close()
+
+def iter_channel_videos(channel_id, exclude_ids=(), batch_size=1000):
+    """
+    Yields batches of stored video rows for a channel, newest first,
+    skipping `exclude_ids`.
+    """
+    conn = get_connection()
+    try:
+        cursor = conn.execute(
+            "SELECT video_id, data FROM videos WHERE channel_id = ? ORDER BY published_at DESC, video_id",
+            (channel_id,)
+        )
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            batch = [_decode_row(data) for video_id, data in rows if video_id not in exclude_ids]
+            if batch:
+                yield batch
+    finally:
+        conn.close()
+
+def get_videos(video_ids, batch_size=500):
+    """
+    Returns {video_id: row} for the stored videos among `video_ids`; each row
+    also carries its "channel_id".
+    """
+    video_ids = list(video_ids)
+    found = {}
+    conn = get_connection()
+    try:
+        for start in range(0, len(video_ids), batch_size):
+            batch = video_ids[start:start + batch_size]
+            rows = conn.execute(
+                f"SELECT video_id, channel_id, data FROM videos WHERE video_id IN ({','.join('?' * len(batch))})",
+                batch
+            )
+            for video_id, channel_id, data in rows:
+                row = _decode_row(data)
+                row["channel_id"] = channel_id
+                found[video_id] = row
+    finally:
+        conn.close()
+    return found
+
+def save_videos(channel_id, videos, published_at):
+    """
+    Upserts video rows as they are fetched.
+    `published_at` maps video ID to the raw API timestamp used for ordering.
+    """
+    if not videos:
+        return
+    now = datetime.now().isoformat()
+    conn = get_connection()
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT INTO videos (video_id, channel_id, published_at, data, first_seen) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(video_id) DO UPDATE SET channel_id = excluded.channel_id, "
+                "published_at = excluded.published_at, data = excluded.data",
+                [
+                    (v["Video ID"], channel_id, published_at.get(v["Video ID"], ""), _encode_row(v), now)
+                    for v in videos
+                ]
+            )
+    finally:
+        conn.close()
+
+def save_channel(channel_id, channel_name, uploads_playlist_id, complete):
+    """
+    Records a channel sync. `complete` is False when the run stopped early
+    (e.g. quota ran out), so the next incremental sync pages through everything.
+    """
+    conn = get_connection()
+    try:
+        with conn:
+            conn.execute(
+                "INSERT INTO channels (channel_id, channel_name, uploads_playlist_id, last_synced, complete) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(channel_id) DO UPDATE SET channel_name = excluded.channel_name, "
+                "uploads_playlist_id = excluded.uploads_playlist_id, last_synced = excluded.last_synced, "
+                "complete = excluded.complete",
+                (channel_id, channel_name, uploads_playlist_id, datetime.now().isoformat(), int(complete))
+            )
+    finally:
+        conn.close()
@@ -0,0 +1,82 @@
+import threading
+from urllib.parse import urlparse, parse_qs
+
+# Videos the browser is currently waiting on: video_id -> [PendingVideo]
+_pending = {}
+_lock = threading.Lock()
+
+class PendingVideo:
+    """
+    One video the browser automation is waiting on. Register it *before*
+    opening the page (the userscript can report within a second or two),
+    then wait() until notify() delivers the userscript's /api/log report.
+
+        with expect(video_id) as pending:
+            driver.get(url)
+            entry = pending.wait(15)  # None on timeout
+    """
+
+    def __init__(self, video_id):
+        self.video_id = video_id
+        self.entry = None
+        self._event = threading.Event()
+
+    def __enter__(self):
+        with _lock:
+            _pending.setdefault(self.video_id, []).append(self)
+        return self
+
+    def __exit__(self, *exc):
+        with _lock:
+            waiters = _pending.get(self.video_id, [])
+            if self in waiters:
+                waiters.remove(self)
+            if not waiters:
+                _pending.pop(self.video_id, None)
+        return False
+
+    @property
+    def done(self):
+        return self._event.is_set()
+
+    def wait(self, timeout):
+        """Returns the reported log entry, or None if `timeout` seconds pass first."""
+        if self._event.wait(timeout):
+            return self.entry
+        return None
+
+    def _deliver(self, entry):
+        self.entry = entry
+        self._event.set()
+
+def expect(video_id):
+    """Returns a PendingVideo for `video_id`; use it as a context manager."""
+    return PendingVideo(video_id)
+
+def notify(entry):
+    """
+    Wakes everything waiting on entry["videoId"]. Called for every /api/log
+    report; reports for videos nobody waits on are ignored.
+    Returns the number of waiters woken.
+    """
+    video_id = (entry or {}).get("videoId")
+    if not video_id:
+        return 0
+    with _lock:
+        waiters = _pending.pop(video_id, [])
+    for pending in waiters:
+        pending._deliver(entry)
+    return len(waiters)
+
+def video_id_from_url(url):
+    """
+    Extracts the video ID from watch, youtu.be and shorts URLs.
+    Returns None if there is none.
+    """
+    parsed = urlparse(url.strip())
+    host = (parsed.hostname or "").lower()
+    if host.endswith("youtu.be"):
+        return parsed.path.lstrip("/").split("/")[0] or None
+    if parsed.path.startswith(("/shorts/", "/embed/", "/live/")):
+        return parsed.path.split("/")[2] or None
+    return parse_qs(parsed.query).get("v", [None])[0]
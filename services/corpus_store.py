@@ -0,0 +1,456 @@
+import os
+import re
+import time
+import zlib
+import sqlite3
+import threading
+from datetime import datetime
+from services.download_registry import transcript_folders
+
+# All downloaded transcripts, compressed and full-text indexed
+CORPUS_PATH = os.path.join("uploads", "transcripts.db")
+
+# zlib level for transcript bodies; plain text shrinks to roughly a third
+COMPRESSION_LEVEL = 6
+
+SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 100
+
+# Characters of context shown around the first match
+SNIPPET_CHARS = 240
+
+# Transcripts stored per transaction while ingesting
+INGEST_BATCH_SIZE = 500
+
+# How often the ingester looks for new transcript files
+INGEST_EVERY_SECONDS = 10
+
+# Files this recent may still be being written
+FILE_SETTLE_SECONDS = 2
+
+# Set CORPUS_DELETE_INGESTED_FILES=1 to delete transcript files from the
+# download folders once they are stored; by default they are left in place
+DELETE_INGESTED_FILES = os.environ.get("CORPUS_DELETE_INGESTED_FILES") == "1"
+
+TRANSCRIPT_SUFFIX = "_transcript.txt"
+
+_TERM = re.compile(r'"([^"]+)"|(\S+)')
+
+class CorpusStore:
+    """
+    Transcript texts keyed by videoId, with the channel metadata from the
+    fetch step, in one SQLite file (WAL).
+
+    Bodies are stored zlib-compressed. The FTS5 index over title, channel
+    and text is contentless (content=''), so the text is not kept a second
+    time in the index; search results are joined back to the rows by rowid
+    and snippets are cut from the decompressed body of the hits only.
+    """
+
+    def __init__(self, path=CORPUS_PATH):
+        self.path = path
+        self._write_lock = threading.Lock()
+        conn = self._connect()
+        try:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS transcripts (
+                    id INTEGER PRIMARY KEY,
+                    video_id TEXT UNIQUE,
+                    title TEXT,
+                    channel_id TEXT,
+                    channel TEXT,
+                    published_at TEXT,
+                    file_name TEXT,
+                    chars INTEGER NOT NULL,
+                    stored_bytes INTEGER NOT NULL,
+                    ingested_at TEXT NOT NULL,
+                    body BLOB NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_transcripts_channel ON transcripts (channel, published_at);
+                CREATE INDEX IF NOT EXISTS idx_transcripts_file ON transcripts (file_name) WHERE video_id IS NULL;
+                CREATE VIRTUAL TABLE IF NOT EXISTS transcripts_fts USING fts5(
+                    title, channel, body, content='', tokenize='unicode61 remove_diacritics 2'
+                );
+                -- Title hits weigh more than channel hits, channel more than body hits
+                INSERT INTO transcripts_fts (transcripts_fts, rank) VALUES ('rank', 'bm25(5.0, 2.0, 1.0)');
+                CREATE TABLE IF NOT EXISTS watched_folders (
+                    path TEXT PRIMARY KEY,
+                    added_at TEXT NOT NULL
+                );
+            """)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # --- Writing ---
+
+    def ingest_many(self, records):
+        """
+        Stores transcripts in one transaction. Each record is a dict with
+        "text" and optionally video_id, title, channel_id, channel,
+        published_at and file_name. A transcript for a videoId that is
+        already stored replaces it (records without a videoId are matched
+        by file name). Returns (added, replaced).
+        """
+        added = replaced = 0
+        now = datetime.now().isoformat()
+        with self._write_lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    for record in records:
+                        text = record["text"]
+                        body = zlib.compress(text.encode("utf-8"), COMPRESSION_LEVEL)
+                        row = (record.get("video_id"), record.get("title"), record.get("channel_id"),
+                               record.get("channel"), record.get("published_at"), record.get("file_name"),
+                               len(text), len(body), now, body)
+
+                        existing = self._find(conn, record)
+                        if existing:
+                            rowid, old_title, old_channel, old_body = existing
+                            # Contentless FTS5 rows are removed by repeating their indexed values
+                            conn.execute(
+                                "INSERT INTO transcripts_fts (transcripts_fts, rowid, title, channel, body) "
+                                "VALUES ('delete', ?, ?, ?, ?)",
+                                (rowid, old_title, old_channel, zlib.decompress(old_body).decode("utf-8"))
+                            )
+                            conn.execute(
+                                "UPDATE transcripts SET video_id = ?, title = ?, channel_id = ?, channel = ?, "
+                                "published_at = ?, file_name = ?, chars = ?, stored_bytes = ?, ingested_at = ?, "
+                                "body = ? WHERE id = ?", row + (rowid,)
+                            )
+                            replaced += 1
+                        else:
+                            rowid = conn.execute(
+                                "INSERT INTO transcripts (video_id, title, channel_id, channel, published_at, "
+                                "file_name, chars, stored_bytes, ingested_at, body) "
+                                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row
+                            ).lastrowid
+                            added += 1
+                        conn.execute(
+                            "INSERT INTO transcripts_fts (rowid, title, channel, body) VALUES (?, ?, ?, ?)",
+                            (rowid, record.get("title"), record.get("channel"), text)
+                        )
+            finally:
+                conn.close()
+        return added, replaced
+
+    @staticmethod
+    def _find(conn, record):
+        if record.get("video_id"):
+            return conn.execute(
+                "SELECT id, title, channel, body FROM transcripts WHERE video_id = ?", (record["video_id"],)
+            ).fetchone()
+        if record.get("file_name"):
+            return conn.execute(
+                "SELECT id, title, channel, body FROM transcripts WHERE video_id IS NULL AND file_name = ?",
+                (record["file_name"],)
+            ).fetchone()
+        return None
+
+    def add_folder(self, path):
+        """Adds a download folder for the ingester to watch. Returns True if it was new."""
+        path = os.path.abspath(path)
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.execute("INSERT OR IGNORE INTO watched_folders (path, added_at) VALUES (?, ?)",
+                                      (path, datetime.now().isoformat()))
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+    def folders(self):
+        conn = self._connect()
+        try:
+            return [row[0] for row in conn.execute("SELECT path FROM watched_folders ORDER BY path")]
+        finally:
+            conn.close()
+
+    # --- Reading ---
+
+    def get(self, video_id=None, transcript_id=None):
+        """Returns one transcript with its text, by videoId or row id, or None."""
+        conn = self._connect()
+        try:
+            key, value = ("video_id", video_id) if video_id else ("id", transcript_id)
+            row = conn.execute(f"SELECT {_LIST_COLUMNS}, body FROM transcripts WHERE {key} = ?",
+                               (value,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        transcript = _from_row(row[:-1])
+        transcript["text"] = zlib.decompress(row[-1]).decode("utf-8")
+        return transcript
+
+    def search(self, query, channel=None, limit=SEARCH_PAGE_SIZE, offset=0):
+        """
+        Full-text search, best matches first (bm25, title hits weigh more).
+        `query` is plain words (all must match), "quoted phrases" and
+        prefix* terms. Returns (results, total) where each result has the
+        metadata and a snippet around the first match.
+        """
+        fts_query, terms = to_fts_query(query)
+        if not fts_query:
+            return [], 0
+
+        conn = self._connect()
+        try:
+            # Rank row ids only, then load the page: sorting whole rows
+            # (bodies included) for a common word would copy every hit
+            if channel:
+                ranked = (" FROM transcripts_fts JOIN transcripts t ON t.id = transcripts_fts.rowid "
+                          "WHERE transcripts_fts MATCH ? AND t.channel = ?")
+                params = [fts_query, channel]
+            else:
+                ranked = " FROM transcripts_fts WHERE transcripts_fts MATCH ?"
+                params = [fts_query]
+            total = conn.execute("SELECT COUNT(*)" + ranked, params).fetchone()[0]
+            page = conn.execute(
+                "SELECT transcripts_fts.rowid, rank" + ranked + " ORDER BY rank LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+            rows = {}
+            if page:
+                ids = [rowid for rowid, _ in page]
+                for row in conn.execute(
+                    f"SELECT {_LIST_COLUMNS}, body FROM transcripts WHERE id IN ({','.join('?' * len(ids))})", ids
+                ):
+                    rows[row[0]] = row
+        finally:
+            conn.close()
+
+        results = []
+        for rowid, rank in page:
+            row = rows.get(rowid)
+            if row is None:
+                continue
+            result = _from_row(row[:-1])
+            result["snippet"] = make_snippet(zlib.decompress(row[-1]).decode("utf-8"), terms)
+            result["score"] = round(-rank, 3)
+            results.append(result)
+        return results, total
+
+    def iter_export(self, query=None, channel=None, batch_size=INGEST_BATCH_SIZE):
+        """Yields every transcript (metadata plus text) matching `query`/`channel`, in batches."""
+        where, params, joined = [], [], " FROM transcripts t"
+        if query:
+            fts_query, _ = to_fts_query(query)
+            joined += " JOIN transcripts_fts ON transcripts_fts.rowid = t.id"
+            where.append("transcripts_fts MATCH ?")
+            params.append(fts_query)
+        if channel:
+            where.append("t.channel = ?")
+            params.append(channel)
+        sql = (f"SELECT {_prefixed(_LIST_COLUMNS)}, t.body" + joined
+               + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY t.id")
+
+        conn = self._connect()
+        try:
+            cursor = conn.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                batch = []
+                for row in rows:
+                    transcript = _from_row(row[:-1])
+                    transcript["text"] = zlib.decompress(row[-1]).decode("utf-8")
+                    batch.append(transcript)
+                yield batch
+        finally:
+            conn.close()
+
+    def channels(self):
+        """Channel names with their transcript counts."""
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "SELECT channel, COUNT(*) FROM transcripts WHERE channel IS NOT NULL GROUP BY channel ORDER BY channel"
+            ).fetchall()
+        finally:
+            conn.close()
+
+    def stats(self):
+        conn = self._connect()
+        try:
+            count, chars, stored = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(chars), 0), COALESCE(SUM(stored_bytes), 0) FROM transcripts"
+            ).fetchone()
+            without_id = conn.execute("SELECT COUNT(*) FROM transcripts WHERE video_id IS NULL").fetchone()[0]
+        finally:
+            conn.close()
+        return {
+            "transcripts": count,
+            "without_video_id": without_id,
+            "text_chars": chars,
+            "stored_bytes": stored,
+            "compression_ratio": round(chars / stored, 2) if stored else None,
+            "file_bytes": sum(os.path.getsize(self.path + suffix) for suffix in ("", "-wal")
+                              if os.path.exists(self.path + suffix)),
+        }
+
+_LIST_COLUMNS = "id, video_id, title, channel_id, channel, published_at, file_name, chars, ingested_at"
+_LIST_KEYS = ("id", "video_id", "title", "channel_id", "channel", "published_at", "file_name", "chars",
+              "ingested_at")
+
+def _prefixed(columns):
+    return ", ".join("t." + c.strip() for c in columns.split(","))
+
+def _from_row(row):
+    return dict(zip(_LIST_KEYS, row))
+
+def to_fts_query(query):
+    """
+    Turns a search box query into an FTS5 expression that cannot be a
+    syntax error: every word or "phrase" is quoted, a trailing * keeps
+    prefix matching. Returns (fts_query, terms) with the terms for
+    highlighting.
+    """
+    parts, terms = [], []
+    for phrase, word in _TERM.findall(query or ""):
+        text = phrase or word
+        prefix = not phrase and text.endswith("*")
+        text = text.rstrip("*").replace('"', "")
+        if not text.strip():
+            continue
+        parts.append('"' + text + '"' + ("*" if prefix else ""))
+        terms.append(text)
+    return " ".join(parts), terms
+
+def make_snippet(text, terms, length=SNIPPET_CHARS):
+    """About `length` characters of `text` around the first occurrence of any term."""
+    lowered = text.lower()
+    positions = [p for p in (lowered.find(term.lower()) for term in terms) if p >= 0]
+    if not positions:
+        return text[:length] + ("..." if len(text) > length else "")
+    start = max(0, min(positions) - length // 3)
+    if start:
+        space = text.find(" ", start)
+        start = space + 1 if 0 <= space < start + 20 else start
+    end = start + length
+    return ("..." if start else "") + text[start:end] + ("..." if end < len(text) else "")
+
+class TranscriptIngester:
+    """
+    Copies new *_transcript.txt files from the watched download folders
+    (and their worker-N subfolders) into a CorpusStore.
+
+    `resolve(file_name)` returns the metadata for a file (video_id, title,
+    channel_id, channel, published_at) or None while its videoId is not
+    known; such files stay on disk and are retried on every scan. Files
+    are left in place unless `keep_files` is False, in which case they are
+    deleted once committed. `on_ingested(records)` is called after each batch.
+    """
+
+    def __init__(self, store, resolve, folders=None, interval=INGEST_EVERY_SECONDS, keep_files=True,
+                 on_ingested=None):
+        self.store = store
+        self.resolve = resolve
+        self.extra_folders = list(folders or [])
+        self.interval = interval
+        self.keep_files = keep_files
+        self.on_ingested = on_ingested or (lambda records: None)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._scan_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._seen = {}  # path -> (size, mtime) of files kept because of keep_files
+        self.stats = {"ingested": 0, "replaced": 0, "waiting": 0, "errors": 0, "scans": 0, "last_scan": None}
+
+    def start(self):
+        """Starts the background thread; only the first call does anything."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, name="transcript-ingest", daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        """Scans now instead of at the next interval (e.g. after a download job)."""
+        self._wake.set()
+
+    def _loop(self):
+        while True:
+            try:
+                self.scan_once()
+            except Exception as e:
+                print(f"Warning: Transcript ingest failed: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def scan_once(self):
+        """Ingests every settled transcript file found now. Returns the number stored."""
+        with self._scan_lock:
+            return self._scan()
+
+    def _scan(self):
+        now = time.time()
+        pending, waiting = [], 0
+        for folder in self.store.folders() + self.extra_folders:
+            for folder_path in transcript_folders(folder):
+                try:
+                    with os.scandir(folder_path) as entries:
+                        files = [e for e in entries if e.name.endswith(TRANSCRIPT_SUFFIX) and e.is_file()]
+                except OSError:
+                    continue
+                for entry in files:
+                    try:
+                        info = entry.stat()
+                    except OSError:
+                        continue
+                    if now - info.st_mtime < FILE_SETTLE_SECONDS:
+                        continue
+                    if self._seen.get(entry.path) == (info.st_size, info.st_mtime):
+                        continue
+                    meta = self.resolve(entry.name)
+                    if meta is None:
+                        waiting += 1  # no /api/log report for it yet
+                        continue
+                    pending.append((entry.path, entry.name, info, meta))
+
+        stored = 0
+        for start in range(0, len(pending), INGEST_BATCH_SIZE):
+            stored += self._ingest_batch(pending[start:start + INGEST_BATCH_SIZE])
+        self.stats["waiting"] = waiting
+        self.stats["scans"] += 1
+        self.stats["last_scan"] = datetime.now().isoformat()
+        return stored
+
+    def _ingest_batch(self, batch):
+        records, paths = [], []
+        for path, name, info, meta in batch:
+            try:
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    text = f.read()
+            except OSError as e:
+                print(f"Warning: Could not read {path}: {e}")
+                self.stats["errors"] += 1
+                continue
+            record = dict(meta, text=text, file_name=name)
+            record.setdefault("title", name[:-len(TRANSCRIPT_SUFFIX)])
+            records.append(record)
+            paths.append((path, info))
+        if not records:
+            return 0
+
+        added, replaced = self.store.ingest_many(records)
+        self.stats["ingested"] += added
+        self.stats["replaced"] += replaced
+        for path, info in paths:
+            if self.keep_files:
+                self._seen[path] = (info.st_size, info.st_mtime)
+                continue
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"Warning: Stored {path} but could not remove it: {e}")
+        self.on_ingested(records)
+        return len(records)
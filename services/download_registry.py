@@ -0,0 +1,171 @@
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+REGISTRY_PATH = os.path.join("uploads", "downloaded_videos.db")
+
+# Characters the userscript replaces in transcript file names (sanitizeFileName)
+_UNSAFE_FILE_CHARS = re.compile(r'[\\/:*?"<>|]')
+
+def transcript_file_name(title):
+    """The file name the userscript saves a video's transcript under."""
+    return _UNSAFE_FILE_CHARS.sub("_", title or "transcript")[:200] + "_transcript.txt"
+
+# Reports of a download ("Downloaded <file name>") name the file actually written
+_DOWNLOADED_PREFIX = "Downloaded "
+
+def _reported_file_name(detail):
+    if detail and detail.startswith(_DOWNLOADED_PREFIX) and detail.endswith("_transcript.txt"):
+        return detail[len(_DOWNLOADED_PREFIX):]
+    return None
+
+class DownloadRegistry:
+    """
+    Every videoId whose transcript is known to be downloaded, so browser
+    automation can skip it before loading the page.
+
+    Persisted in SQLite and mirrored in an in-memory set: membership checks
+    never touch the disk. Fed by SUCCESS and SKIPPED reports to /api/log,
+    the log history, and transcript files found in download folders.
+    """
+
+    def __init__(self, path=REGISTRY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        conn = self._connect()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS downloaded (
+                    video_id TEXT PRIMARY KEY,
+                    title TEXT,
+                    source TEXT NOT NULL,
+                    detail TEXT,
+                    recorded_at TEXT NOT NULL
+                )
+            """)
+            conn.commit()
+            self._ids = set()
+            self._by_file = {}  # casefolded transcript file name -> videoId
+            for video_id, title, detail in conn.execute("SELECT video_id, title, detail FROM downloaded"):
+                self._ids.add(video_id)
+                self._map_file(video_id, title, detail)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def __contains__(self, video_id):
+        return video_id in self._ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _map_file(self, video_id, title, detail):
+        # The reported file name wins; the name derived from the title stays
+        # with the first video that had it (same-titled videos are saved
+        # under another name, see transcript_service.save_transcript)
+        reported = _reported_file_name(detail)
+        if reported:
+            self._by_file[reported.casefold()] = video_id
+        if title:
+            self._by_file.setdefault(transcript_file_name(title).casefold(), video_id)
+
+    def assign_file(self, file_name, video_id):
+        """Notes that `file_name` is being written for `video_id` (before its report arrives)."""
+        with self._lock:
+            self._by_file[file_name.casefold()] = video_id
+
+    def video_for_file(self, file_name):
+        """The videoId whose transcript is saved as `file_name`, if its title is known."""
+        return self._by_file.get(file_name.casefold())
+
+    def contains_many(self, video_ids):
+        """Returns the subset of `video_ids` that is already downloaded."""
+        return {video_id for video_id in video_ids if video_id in self._ids}
+
+    def add(self, video_id, title=None, source="log", detail=None):
+        """Records one downloaded video. Returns True if it was not known yet."""
+        return self.add_many([(video_id, title, detail)], source) == 1
+
+    def add_many(self, records, source):
+        """
+        Records (video_id, title, detail) tuples from `source` ("log" or
+        "file"). Already known IDs are left as they are. Returns how many
+        were new.
+        """
+        with self._lock:
+            new = []
+            for video_id, title, detail in records:
+                if video_id:
+                    self._map_file(video_id, title, detail)
+                if video_id and video_id not in self._ids:
+                    self._ids.add(video_id)
+                    new.append((video_id, title, detail))
+            if not new:
+                return 0
+            now = datetime.now().isoformat()
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO downloaded (video_id, title, source, detail, recorded_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        [(video_id, title, source, detail, now) for video_id, title, detail in new]
+                    )
+            finally:
+                conn.close()
+            return len(new)
+
+    def scan_directory(self, download_dir, videos):
+        """
+        Looks for the transcripts of `videos` ([(video_id, title)]) in
+        `download_dir` and its worker-N subfolders, by the file name the
+        userscript would have used. Found videos are recorded.
+        Returns the IDs of all `videos` that are downloaded (found now or known before).
+        """
+        file_names = {}
+        for folder in transcript_folders(download_dir):
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        if entry.name.endswith("_transcript.txt") and entry.is_file():
+                            file_names.setdefault(entry.name.casefold(), entry.path)
+            except OSError:
+                continue
+
+        # A title's file belongs to the video it was reported for, else to the
+        # first of `videos` with that title; same-titled videos are saved as
+        # "<title> (<videoId>)" (see transcript_service.save_transcript)
+        first_with_title = {}
+        for video_id, title in videos:
+            first_with_title.setdefault(transcript_file_name(title).casefold(), video_id)
+
+        found = []
+        for video_id, title in videos:
+            if video_id in self._ids:
+                continue
+            path = file_names.get(transcript_file_name(f"{title} ({video_id})").casefold())
+            if not path:
+                name = transcript_file_name(title).casefold()
+                owner = self._by_file.get(name) or first_with_title[name]
+                path = file_names.get(name) if owner == video_id else None
+            if path:
+                found.append((video_id, title, path))
+        self.add_many(found, "file")
+        return self.contains_many(video_id for video_id, _ in videos)
+
+def transcript_folders(download_dir):
+    """`download_dir` and its worker-N subfolders (one per parallel browser)."""
+    if not download_dir or not os.path.isdir(download_dir):
+        return []
+    folders = [download_dir]
+    with os.scandir(download_dir) as entries:
+        folders.extend(e.path for e in entries if e.is_dir() and e.name.startswith("worker-"))
+    return folders
@@ -0,0 +1,219 @@
+import time
+import threading
+
+# A browser is replaced after this many videos (Chrome grows over long sessions)
+MAX_VIDEOS_PER_DRIVER = 250
+
+# Idle browsers are closed after this long without work
+IDLE_TIMEOUT_SECONDS = 600
+
+# Idle browsers kept at most; each one is a full Chrome instance
+MAX_IDLE_DRIVERS = 8
+
+# How often idle browsers are checked for the timeout
+REAP_EVERY_SECONDS = 30
+
+class PooledDriver:
+    """A WebDriver plus the bookkeeping the pool needs."""
+
+    def __init__(self, driver, key, user_data_dir, launch_seconds):
+        self.driver = driver
+        self.key = key
+        self.user_data_dir = user_data_dir
+        self.launch_seconds = launch_seconds
+        self.videos = 0
+        self.last_used = time.monotonic()
+
+def is_healthy(driver):
+    """Cheap liveness probe: a crashed or closed browser fails to list its windows."""
+    try:
+        return bool(driver.window_handles)
+    except Exception:
+        return False
+
+class DriverPool:
+    """
+    Long-lived browsers shared by /open-videos-stream requests, so a batch
+    can start on a browser that is already running instead of launching one.
+
+    Browsers are keyed by (download_dir, chromedriver_path), because the
+    download folder is fixed when Chrome starts. Each running browser owns
+    a profile slot (`user_data_dir`, then `user_data_dir`-2, -3, ...) since
+    Chrome instances cannot share one. A browser is checked with
+    is_healthy() before reuse, replaced after `max_videos` videos or a
+    crash, and closed after `idle_timeout` seconds unused.
+
+    `factory(download_dir, chromedriver_path, user_data_dir, refresh_profile)`
+    launches a browser (browser_service.init_driver).
+    """
+
+    def __init__(self, factory, user_data_dir, max_videos=MAX_VIDEOS_PER_DRIVER,
+                 idle_timeout=IDLE_TIMEOUT_SECONDS, max_idle=MAX_IDLE_DRIVERS):
+        self.factory = factory
+        self.user_data_dir = user_data_dir
+        self.max_videos = max_videos
+        self.idle_timeout = idle_timeout
+        self.max_idle = max_idle
+
+        self._idle = []
+        self._slots = set()
+        self._lock = threading.Lock()
+        self._reaper = None
+        self.stats = {
+            "launched": 0,
+            "reused": 0,
+            "recycled": 0,
+            "crashed": 0,
+            "expired": 0,
+            "launch_seconds": 0.0,
+            "startup_seconds_saved": 0.0,
+        }
+
+    # --- Leasing ---
+
+    def acquire(self, download_dir=None, chromedriver_path=None, refresh_profile=False):
+        """
+        Returns a PooledDriver, reusing a healthy idle browser with the same
+        settings if there is one. `refresh_profile` closes those instead and
+        launches a new browser with a freshly copied profile.
+        """
+        key = (download_dir, chromedriver_path)
+        while True:
+            with self._lock:
+                if refresh_profile:
+                    stale = [p for p in self._idle if p.key == key]
+                    self._idle = [p for p in self._idle if p.key != key]
+                    candidate = None
+                else:
+                    stale = []
+                    matching = [p for p in self._idle if p.key == key]
+                    candidate = max(matching, key=lambda p: p.last_used) if matching else None
+                    if candidate:
+                        self._idle.remove(candidate)
+            for pooled in stale:
+                self._discard(pooled)
+
+            if candidate is None:
+                return self._launch(key, refresh_profile)
+            if is_healthy(candidate.driver):
+                with self._lock:
+                    self.stats["reused"] += 1
+                    self.stats["startup_seconds_saved"] += candidate.launch_seconds
+                return candidate
+
+            print("Warning: Idle browser stopped responding; closing it.")
+            with self._lock:
+                self.stats["crashed"] += 1
+            self._discard(candidate)
+
+    def release(self, pooled, healthy=True):
+        """
+        Takes a browser back. Crashed browsers and those past `max_videos`
+        are closed; the rest wait for the next batch.
+        """
+        pooled.last_used = time.monotonic()
+        if not healthy or not is_healthy(pooled.driver):
+            with self._lock:
+                self.stats["crashed"] += 1
+            self._discard(pooled)
+            return
+        if pooled.videos >= self.max_videos:
+            with self._lock:
+                self.stats["recycled"] += 1
+            self._discard(pooled)
+            return
+
+        with self._lock:
+            self._idle.append(pooled)
+            self._idle.sort(key=lambda p: p.last_used)
+            overflow = self._idle[:-self.max_idle] if len(self._idle) > self.max_idle else []
+            self._idle = self._idle[len(overflow):]
+            self.stats["expired"] += len(overflow)
+        for old in overflow:
+            self._discard(old)
+        self._ensure_reaper()
+
+    def _launch(self, key, refresh_profile):
+        download_dir, chromedriver_path = key
+        user_data_dir = self._claim_slot()
+        started = time.perf_counter()
+        try:
+            driver = self.factory(download_dir, chromedriver_path, user_data_dir, refresh_profile)
+        except Exception:
+            self._free_slot(user_data_dir)
+            raise
+        launch_seconds = time.perf_counter() - started
+        with self._lock:
+            self.stats["launched"] += 1
+            self.stats["launch_seconds"] += launch_seconds
+        return PooledDriver(driver, key, user_data_dir, launch_seconds)
+
+    def _discard(self, pooled):
+        try:
+            pooled.driver.quit()
+        except Exception:
+            pass
+        self._free_slot(pooled.user_data_dir)
+
+    # --- Profile slots ---
+
+    def _claim_slot(self):
+        with self._lock:
+            number = 1
+            while self._slot_dir(number) in self._slots:
+                number += 1
+            self._slots.add(self._slot_dir(number))
+            return self._slot_dir(number)
+
+    def _free_slot(self, user_data_dir):
+        with self._lock:
+            self._slots.discard(user_data_dir)
+
+    def _slot_dir(self, number):
+        return self.user_data_dir if number == 1 else f"{self.user_data_dir}-{number}"
+
+    # --- Idle timeout ---
+
+    def _ensure_reaper(self):
+        with self._lock:
+            if self._reaper is None or not self._reaper.is_alive():
+                self._reaper = threading.Thread(target=self._reap_loop, name="driver-pool-reaper", daemon=True)
+                self._reaper.start()
+
+    def _reap_loop(self):
+        while True:
+            time.sleep(min(REAP_EVERY_SECONDS, self.idle_timeout))
+            cutoff = time.monotonic() - self.idle_timeout
+            with self._lock:
+                expired = [p for p in self._idle if p.last_used < cutoff]
+                self._idle = [p for p in self._idle if p.last_used >= cutoff]
+                self.stats["expired"] += len(expired)
+                idle_left = len(self._idle)
+            for pooled in expired:
+                print(f"Closing browser idle for over {self.idle_timeout}s ({pooled.user_data_dir})")
+                self._discard(pooled)
+            if not idle_left:
+                with self._lock:
+                    if not self._idle:
+                        self._reaper = None
+                        return
+
+    def close(self):
+        """Closes every idle browser (at app exit)."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for pooled in idle:
+            self._discard(pooled)
+
+    # --- Reporting ---
+
+    def snapshot(self):
+        """Pool counters plus the browsers currently running and idle."""
+        with self._lock:
+            return dict(self.stats, running=len(self._slots), idle=len(self._idle))
+
+    def summary(self):
+        s = self.snapshot()
+        return (f"Browser pool since start-up: {s['launched']} launched, {s['reused']} reused "
+                f"(~{s['startup_seconds_saved']:.0f}s of start-up avoided), "
+                f"{s['recycled']} recycled, {s['crashed']} crashed, {s['idle']} idle")
@@ -0,0 +1,137 @@
+import os
+import csv
+import pickle
+import tempfile
+
+# Formats selectable on the index page
+EXPORT_FORMATS = ("xlsx", "csv", "parquet")
+
+# Rows buffered before a Parquet row group is written
+PARQUET_ROW_GROUP_SIZE = 5000
+
+# Parquet type (pyarrow type factory) of columns that are not strings
+PARQUET_COLUMN_TYPES = {
+    "Published Date": "date32",
+    "Duration Seconds": "int64",
+}
+
+class XlsxRowWriter:
+    """Writes rows with openpyxl's write-only mode, which streams to disk."""
+
+    def __init__(self, path, columns):
+        from openpyxl import Workbook
+        self.path = path
+        self.columns = columns
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet("Sheet1")
+        self.sheet.append(columns)
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.sheet.append([row.get(column) for column in self.columns])
+
+    def close(self):
+        self.workbook.save(self.path)
+
+class CsvRowWriter:
+    """Writes rows to a UTF-8 CSV that Excel opens with the right encoding."""
+
+    def __init__(self, path, columns):
+        self.path = path
+        self.file = open(path, "w", newline="", encoding="utf-8-sig")
+        self.writer = csv.DictWriter(self.file, fieldnames=columns, extrasaction="ignore")
+        self.writer.writeheader()
+
+    def write_rows(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+class ParquetRowWriter:
+    """
+    Writes rows as Parquet row groups of PARQUET_ROW_GROUP_SIZE rows. Needs pyarrow.
+    The schema is fixed up front (see PARQUET_COLUMN_TYPES), so a column that
+    is empty in the first row group still takes values in later ones.
+    """
+
+    def __init__(self, path, columns):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+        self.pa = pyarrow
+        self.path = path
+        self.schema = pyarrow.schema([(column, getattr(pyarrow, PARQUET_COLUMN_TYPES.get(column, "string"))())
+                                      for column in columns])
+        self.writer = None
+        self.buffer = []
+
+    def write_rows(self, rows):
+        self.buffer.extend(rows)
+        if len(self.buffer) >= PARQUET_ROW_GROUP_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if not self.buffer:
+            return
+        if self.writer is None:
+            self.writer = self.pa.parquet.ParquetWriter(self.path, self.schema)
+        table = self.pa.Table.from_pylist(self.buffer, schema=self.schema)
+        self.writer.write_table(table)
+        self.buffer = []
+
+    def close(self):
+        self._flush()
+        if self.writer:
+            self.writer.close()
+
+_WRITERS = {
+    "xlsx": XlsxRowWriter,
+    "csv": CsvRowWriter,
+    "parquet": ParquetRowWriter,
+}
+
+def open_writer(path, export_format, columns):
+    """
+    Returns a row writer for `export_format` (one of EXPORT_FORMATS) with the
+    given column order. Writers accept batches of row dicts through
+    write_rows() and must be closed; missing keys are left empty.
+    """
+    return _WRITERS[export_format](path, columns)
+
+class RowSpool:
+    """
+    Temporary on-disk buffer of row batches.
+    Lets a channel worker hand its rows to the exporter without holding
+    them in memory while earlier channels are still being written.
+    """
+
+    def __init__(self):
+        handle, self.path = tempfile.mkstemp(prefix="ytsubs_rows_", suffix=".spool")
+        self.file = os.fdopen(handle, "wb")
+        self.count = 0
+
+    def write(self, rows):
+        if rows:
+            pickle.dump(rows, self.file, protocol=pickle.HIGHEST_PROTOCOL)
+            self.count += len(rows)
+
+    def batches(self):
+        """Yields the stored batches in write order."""
+        self.file.flush()
+        with open(self.path, "rb") as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
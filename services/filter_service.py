@@ -0,0 +1,131 @@
+from datetime import date
+
+# Videos this short are treated as Shorts. The API has no Shorts flag, so
+# anything up to SHORTS_MAX_SECONDS counts if it is tagged #shorts, and
+# anything up to SHORTS_ALWAYS_SECONDS counts regardless.
+SHORTS_ALWAYS_SECONDS = 60
+SHORTS_MAX_SECONDS = 180
+
+class VideoFilters:
+    """
+    Filters applied while fetching, so unwanted videos cost as little as possible:
+    the date range and title are checked on playlist items before any
+    videos().list lookup, duration, tags and Shorts on the detailed rows.
+    Dates are inclusive ISO strings (YYYY-MM-DD, UTC), durations in seconds.
+    """
+
+    def __init__(self, published_after=None, published_before=None, min_duration=None,
+                 max_duration=None, title=None, tag=None, exclude_shorts=False):
+        self.published_after = published_after or None
+        self.published_before = published_before or None
+        self.min_duration = min_duration
+        self.max_duration = max_duration
+        self.title = (title or "").strip().lower() or None
+        self.tags = {t.strip().lower() for t in (tag or "").split(",") if t.strip()}
+        self.exclude_shorts = bool(exclude_shorts)
+
+        for value in (self.published_after, self.published_before):
+            if value:
+                date.fromisoformat(value)  # raises ValueError on bad input
+
+    @classmethod
+    def from_args(cls, args):
+        """
+        Builds filters from request arguments (published_after, published_before,
+        min_duration, max_duration, title, tag, exclude_shorts).
+        """
+        return cls(
+            published_after=args.get("published_after"),
+            published_before=args.get("published_before"),
+            min_duration=args.get("min_duration", type=int),
+            max_duration=args.get("max_duration", type=int),
+            title=args.get("title"),
+            tag=args.get("tag"),
+            exclude_shorts=args.get("exclude_shorts") in ("1", "true", "on"),
+        )
+
+    @property
+    def is_active(self):
+        return any([
+            self.published_after, self.published_before, self.min_duration is not None,
+            self.max_duration is not None, self.title, self.tags, self.exclude_shorts,
+        ])
+
+    def describe(self):
+        """Returns a short human readable summary for the progress stream."""
+        parts = []
+        if self.published_after:
+            parts.append(f"published on/after {self.published_after}")
+        if self.published_before:
+            parts.append(f"published on/before {self.published_before}")
+        if self.min_duration is not None:
+            parts.append(f"at least {self.min_duration}s long")
+        if self.max_duration is not None:
+            parts.append(f"at most {self.max_duration}s long")
+        if self.title:
+            parts.append(f"title contains '{self.title}'")
+        if self.tags:
+            parts.append(f"tagged {', '.join(sorted(self.tags))}")
+        if self.exclude_shorts:
+            parts.append("no Shorts")
+        return "; ".join(parts)
+
+    def is_before_range(self, published_at):
+        """
+        True once a playlist item is older than published_after. The uploads
+        playlist is newest-first, so nothing after it can match.
+        """
+        return bool(self.published_after) and published_at[:10] < self.published_after
+
+    def accepts_snippet(self, snippet):
+        """Checks what a playlist item already tells us: publish date and title."""
+        day = snippet["publishedAt"][:10]
+        if self.published_after and day < self.published_after:
+            return False
+        if self.published_before and day > self.published_before:
+            return False
+        if self.title and self.title not in snippet["title"].lower():
+            return False
+        return True
+
+    def accepts_row(self, row):
+        """Checks a full export row (see metadata_service.VIDEO_COLUMNS)."""
+        published = row.get("Published Date")
+        if published:
+            day = published.isoformat()
+            if self.published_after and day < self.published_after:
+                return False
+            if self.published_before and day > self.published_before:
+                return False
+        if self.title and self.title not in (row.get("Video Title") or "").lower():
+            return False
+
+        tags = {t.strip().lower() for t in (row.get("Tags") or "").split(",") if t.strip()}
+        if self.tags and not self.tags & tags:
+            return False
+
+        seconds = row.get("Duration Seconds")
+        if self.min_duration is not None and (seconds is None or seconds < self.min_duration):
+            return False
+        if self.max_duration is not None and (seconds is None or seconds > self.max_duration):
+            return False
+        if self.exclude_shorts and is_short(row, tags):
+            return False
+        return True
+
+def is_short(row, tags=None):
+    """
+    Best-effort Shorts detection from duration and the #shorts hashtag.
+    """
+    seconds = row.get("Duration Seconds")
+    if seconds is None or seconds <= 0:
+        # Missing or live (P0D) durations are not Shorts
+        return False
+    if seconds <= SHORTS_ALWAYS_SECONDS:
+        return True
+    if seconds > SHORTS_MAX_SECONDS:
+        return False
+    if tags is None:
+        tags = {t.strip().lower() for t in (row.get("Tags") or "").split(",")}
+    text = f"{row.get('Video Title') or ''} {row.get('Description') or ''}".lower()
+    return "shorts" in tags or "#shorts" in text
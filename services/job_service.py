@@ -0,0 +1,453 @@
+import os
+import json
+import uuid
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+JOBS_PATH = os.path.join("uploads", "download_jobs.db")
+
+# Per-video states
+PENDING, IN_PROGRESS, SUCCESS, FAILED = "pending", "in_progress", "success", "failed"
+
+# Job states. A job that stops with videos still pending (e.g. no browser
+# could be started) ends as FAILED instead of DONE; see JobManager.resume().
+QUEUED, RUNNING, DONE, CANCELLED = "queued", "running", "done", "cancelled"
+
+# Default retry policy: a video is opened at most this many times, with a
+# pause between passes. Only timeouts and browser errors are retried unless
+# retry_reported_failures is set (a FAILED report usually means there is
+# no transcript, so opening the video again rarely helps).
+DEFAULT_MAX_ATTEMPTS = 2
+DEFAULT_RETRY_DELAY_SECONDS = 30
+
+# Progress lines kept in memory per job for re-attaching clients
+MAX_LOG_LINES = 10000
+
+# Jobs run at the same time; later ones wait in the queue. Each browser job
+# takes its own pooled browsers (profile slots), up to its `workers`.
+MAX_CONCURRENT_JOBS = 4
+
+# Jobs listed by GET /jobs
+JOB_PAGE_SIZE = 50
+MAX_JOB_PAGE_SIZE = 500
+
+# Finished jobs whose progress lines stay in memory: the most recent
+# MAX_FINISHED_RUNS, for up to FINISHED_RUN_TTL_SECONDS. Clients attaching
+# to older jobs get a status line from the store instead.
+MAX_FINISHED_RUNS = 20
+FINISHED_RUN_TTL_SECONDS = 3600
+
+class JobStore:
+    """
+    Jobs and the state of every video in them, in SQLite, so a run survives
+    closed browser tabs and server restarts.
+    """
+
+    def __init__(self, path=JOBS_PATH):
+        self.path = path
+        conn = self._connect()
+        try:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    options TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS job_videos (
+                    job_id TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    url TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    outcome TEXT,
+                    message TEXT,
+                    updated_at TEXT,
+                    PRIMARY KEY (job_id, position)
+                );
+                CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at);
+            """)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def create_job(self, video_urls, options):
+        """Stores a new queued job and returns its ID."""
+        job_id = uuid.uuid4().hex[:12]
+        now = datetime.now().isoformat()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("INSERT INTO jobs VALUES (?, ?, ?, ?, ?)",
+                             (job_id, QUEUED, json.dumps(options), now, now))
+                conn.executemany(
+                    "INSERT INTO job_videos (job_id, position, url, state) VALUES (?, ?, ?, ?)",
+                    [(job_id, position, url, PENDING) for position, url in enumerate(video_urls, 1)]
+                )
+        finally:
+            conn.close()
+        return job_id
+
+    def set_status(self, job_id, status):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE job_id = ?",
+                             (status, datetime.now().isoformat(), job_id))
+        finally:
+            conn.close()
+
+    def mark_video(self, job_id, position, state, outcome=None, message=None):
+        """Records a video's new state; moving to in_progress counts an attempt."""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "UPDATE job_videos SET state = ?, outcome = COALESCE(?, outcome), "
+                    "message = COALESCE(?, message), attempts = attempts + ?, updated_at = ? "
+                    "WHERE job_id = ? AND position = ?",
+                    (state, outcome, message, 1 if state == IN_PROGRESS else 0,
+                     datetime.now().isoformat(), job_id, position)
+                )
+        finally:
+            conn.close()
+
+    def pending_videos(self, job_id):
+        """Returns [(position, url)] still to be opened, in order."""
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "SELECT position, url FROM job_videos WHERE job_id = ? AND state = ? ORDER BY position",
+                (job_id, PENDING)
+            ).fetchall()
+        finally:
+            conn.close()
+
+    def requeue_interrupted(self, job_id):
+        """Videos left in_progress by a crash or restart go back to pending."""
+        conn = self._connect()
+        try:
+            with conn:
+                return conn.execute(
+                    "UPDATE job_videos SET state = ? WHERE job_id = ? AND state = ?",
+                    (PENDING, job_id, IN_PROGRESS)
+                ).rowcount
+        finally:
+            conn.close()
+
+    def requeue_failed(self, job_id, max_attempts, retry_reported_failures=False):
+        """Puts failed videos that the retry policy allows back to pending; returns how many."""
+        sql = ("UPDATE job_videos SET state = ? WHERE job_id = ? AND state = ? AND attempts < ?")
+        if not retry_reported_failures:
+            sql += " AND (outcome IS NULL OR outcome != 'reported')"
+        conn = self._connect()
+        try:
+            with conn:
+                return conn.execute(sql, (PENDING, job_id, FAILED, max_attempts)).rowcount
+        finally:
+            conn.close()
+
+    def get_job(self, job_id):
+        """Returns the job with its options and video counts per state, or None."""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT job_id, status, options, created_at, updated_at FROM jobs WHERE job_id = ?",
+                               (job_id,)).fetchone()
+            if row is None:
+                return None
+            counts = dict(conn.execute(
+                "SELECT state, COUNT(*) FROM job_videos WHERE job_id = ? GROUP BY state", (job_id,)
+            ).fetchall())
+        finally:
+            conn.close()
+        return _job_dict(row, counts)
+
+    def get_videos(self, job_id, state=None):
+        conn = self._connect()
+        try:
+            sql = ("SELECT position, url, state, attempts, outcome, message, updated_at "
+                   "FROM job_videos WHERE job_id = ?")
+            params = [job_id]
+            if state:
+                sql += " AND state = ?"
+                params.append(state)
+            rows = conn.execute(sql + " ORDER BY position", params).fetchall()
+        finally:
+            conn.close()
+        keys = ("position", "url", "state", "attempts", "outcome", "message", "updated_at")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def count_by_status(self):
+        """{status: number of jobs}, for /metrics."""
+        conn = self._connect()
+        try:
+            return dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        finally:
+            conn.close()
+
+    def list_jobs(self, statuses=None, limit=JOB_PAGE_SIZE):
+        """Newest first, optionally only jobs in `statuses`."""
+        conn = self._connect()
+        try:
+            sql = "SELECT job_id, status, options, created_at, updated_at FROM jobs"
+            params = []
+            if statuses:
+                sql += f" WHERE status IN ({', '.join('?' * len(statuses))})"
+                params.extend(statuses)
+            rows = conn.execute(sql + " ORDER BY created_at DESC LIMIT ?", params + [limit]).fetchall()
+            counts = {}
+            if rows:
+                count_rows = conn.execute(
+                    f"SELECT job_id, state, COUNT(*) FROM job_videos WHERE job_id IN ({', '.join('?' * len(rows))}) "
+                    "GROUP BY job_id, state", [row[0] for row in rows]
+                )
+                for job_id, state, n in count_rows:
+                    counts.setdefault(job_id, {})[state] = n
+        finally:
+            conn.close()
+        return [_job_dict(row, counts.get(row[0], {})) for row in rows]
+
+def _job_dict(row, counts):
+    job_id, status, options, created_at, updated_at = row
+    counts = {state: counts.get(state, 0) for state in (PENDING, IN_PROGRESS, SUCCESS, FAILED)}
+    return {
+        "job_id": job_id,
+        "status": status,
+        "options": json.loads(options),
+        "created_at": created_at,
+        "updated_at": updated_at,
+        "videos": counts,
+        "total": sum(counts.values()),
+    }
+
+class _JobRun:
+    """In-memory progress of a job in this process, for clients that attach."""
+
+    def __init__(self):
+        self.lines = []
+        self.dropped = 0  # lines discarded from the front when over MAX_LOG_LINES
+        self.finished = False
+        self.finished_at = None
+        self.cancel = threading.Event()
+        self.changed = threading.Condition()
+
+    def emit(self, line):
+        with self.changed:
+            self.lines.append(line)
+            if len(self.lines) > MAX_LOG_LINES:
+                overflow = len(self.lines) - MAX_LOG_LINES
+                del self.lines[:overflow]
+                self.dropped += overflow
+            self.changed.notify_all()
+
+    def finish(self):
+        with self.changed:
+            self.finished = True
+            self.finished_at = time.monotonic()
+            self.changed.notify_all()
+
+class JobManager:
+    """
+    Runs download jobs on background threads, up to MAX_CONCURRENT_JOBS at
+    once, so they keep going when the client that started them disconnects.
+
+    `run_videos` is app.run_videos, which picks the download backend
+    (browser_service.open_videos_generator or the HTTP transcript engine);
+    it is called with the job's options plus positions/total/on_video/stop
+    so per-video state is written to the store as the browsers go.
+    """
+
+    def __init__(self, store, run_videos):
+        self.store = store
+        self.run_videos = run_videos
+        self._runs = {}
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._runners = []
+        self._active = 0  # jobs running now
+        self._resumed = False
+
+    def submit(self, video_urls, options):
+        """Stores a job for `video_urls` and queues it. Returns the job ID."""
+        job_id = self.store.create_job(video_urls, options)
+        self._enqueue(job_id)
+        return job_id
+
+    def resume_unfinished(self):
+        """
+        Re-queues jobs that were queued or running when the server stopped.
+        Safe to call more than once; only the first call does anything.
+        """
+        with self._lock:
+            if self._resumed:
+                return []
+            self._resumed = True
+        jobs = self.store.list_jobs(statuses=(QUEUED, RUNNING), limit=1000)
+        for job in reversed(jobs):  # oldest first
+            print(f"Resuming download job {job['job_id']} ({job['videos'][SUCCESS]} of {job['total']} done)")
+            self._enqueue(job["job_id"])
+        return [job["job_id"] for job in jobs]
+
+    def resume(self, job_id):
+        """
+        Queues a failed or cancelled job again for the videos it has not
+        done. Returns False if the job is active or already done.
+        """
+        job = self.store.get_job(job_id)
+        with self._lock:
+            run = self._runs.get(job_id)
+            active = run is not None and not run.finished
+        if job is None or active or job["status"] not in (FAILED, CANCELLED):
+            return False
+        self.store.set_status(job_id, QUEUED)
+        self._enqueue(job_id)
+        return True
+
+    def cancel(self, job_id):
+        """Stops a job after the videos being opened right now. Returns False if it is not active."""
+        with self._lock:
+            run = self._runs.get(job_id)
+        if run is None or run.finished:
+            return False
+        run.cancel.set()
+        run.emit("Cancelling: finishing the videos in progress...")
+        return True
+
+    def follow(self, job_id, offset=0):
+        """
+        Yields the job's progress lines from `offset` on, waiting for new
+        ones until the job ends. Disconnecting does not affect the job.
+        Jobs that are not active in this process only get a status line.
+        """
+        with self._lock:
+            run = self._runs.get(job_id)
+        if run is None:
+            job = self.store.get_job(job_id)
+            if job:
+                yield _describe(job)
+            return
+
+        position = offset
+        while True:
+            with run.changed:
+                while position - run.dropped >= len(run.lines) and not run.finished:
+                    run.changed.wait()
+                start = max(position - run.dropped, 0)
+                lines = run.lines[start:]
+                position = run.dropped + len(run.lines)
+                finished = run.finished
+            for line in lines:
+                yield line
+            if finished and not lines:
+                return
+
+    def _enqueue(self, job_id):
+        with self._lock:
+            if job_id not in self._runs or self._runs[job_id].finished:
+                self._runs[job_id] = _JobRun()
+            run = self._runs[job_id]
+            self._runners = [runner for runner in self._runners if runner.is_alive()]
+            while len(self._runners) < MAX_CONCURRENT_JOBS:
+                runner = threading.Thread(target=self._run_loop, name=f"download-jobs-{len(self._runners) + 1}",
+                                          daemon=True)
+                runner.start()
+                self._runners.append(runner)
+            waiting = self._queue.qsize() if self._active >= MAX_CONCURRENT_JOBS else 0
+        run.emit(f"Job {job_id} queued" + (f" behind {waiting} other job(s)." if waiting else "."))
+        self._queue.put(job_id)
+
+    def _run_loop(self):
+        while True:
+            job_id = self._queue.get()
+            with self._lock:
+                run = self._runs[job_id]
+                self._active += 1
+            try:
+                self._run_job(job_id, run)
+            except Exception as e:
+                print(f"ERROR: Download job {job_id} failed: {e}")
+                run.emit(f"Critical Error: {str(e)}")
+            finally:
+                with self._lock:
+                    self._active -= 1
+                run.finish()
+                self._prune_runs()
+
+    def _prune_runs(self):
+        """Forgets the progress lines of finished jobs beyond MAX_FINISHED_RUNS or FINISHED_RUN_TTL_SECONDS."""
+        cutoff = time.monotonic() - FINISHED_RUN_TTL_SECONDS
+        with self._lock:
+            finished = sorted((run.finished_at, job_id) for job_id, run in self._runs.items() if run.finished)
+            expired = [job_id for finished_at, job_id in finished[:-MAX_FINISHED_RUNS]]
+            expired += [job_id for finished_at, job_id in finished[-MAX_FINISHED_RUNS:] if finished_at < cutoff]
+            for job_id in expired:
+                del self._runs[job_id]
+
+    def _run_job(self, job_id, run):
+        job = self.store.get_job(job_id)
+        if job is None or job["status"] in (DONE, CANCELLED):
+            return
+        options = job["options"]
+        max_attempts = options.get("max_attempts", DEFAULT_MAX_ATTEMPTS)
+        retry_delay = options.get("retry_delay", DEFAULT_RETRY_DELAY_SECONDS)
+        retry_reported = options.get("retry_reported_failures", False)
+
+        self.store.set_status(job_id, RUNNING)
+        interrupted = self.store.requeue_interrupted(job_id)
+        done = job["videos"][SUCCESS]
+        if done or interrupted:
+            run.emit(f"Resuming job {job_id}: {done} of {job['total']} videos already done.")
+
+        def on_video(position, url, state, outcome, entry):
+            self.store.mark_video(job_id, position, state, outcome, (entry or {}).get("message"))
+
+        run_options = {k: options[k] for k in ("engine", "download_dir", "chromedriver_path", "wait_seconds",
+                                               "workers", "refresh_profile") if k in options}
+        attempt = 1
+        while not run.cancel.is_set():
+            todo = self.store.pending_videos(job_id)
+            if not todo:
+                break
+            if attempt > 1:
+                run.emit(f"Retry pass {attempt - 1}: {len(todo)} videos.")
+            for line in self.run_videos(
+                [url for _, url in todo], positions=[position for position, _ in todo], total=job["total"],
+                on_video=on_video, stop=run.cancel, **run_options
+            ):
+                run.emit(line)
+            run_options["refresh_profile"] = False  # only the first pass starts from a fresh profile
+
+            retrying = self.store.requeue_failed(job_id, max_attempts, retry_reported)
+            if not retrying or run.cancel.is_set():
+                break
+            run.emit(f"Retrying {retrying} failed videos in {retry_delay}s "
+                     f"(up to {max_attempts} attempts each)...")
+            run.cancel.wait(retry_delay)
+            attempt += 1
+
+        videos = self.store.get_job(job_id)["videos"]
+        if run.cancel.is_set():
+            status = CANCELLED
+        elif videos[PENDING] + videos[IN_PROGRESS]:
+            # The last pass left videos unopened (no browser, driver failure)
+            status = FAILED
+            run.emit(f"Job {job_id} stopped with videos not done; POST /jobs/{job_id}/resume to run them.")
+        else:
+            status = DONE
+        self.store.set_status(job_id, status)
+        run.emit(_describe(self.store.get_job(job_id)))
+
+def _describe(job):
+    v = job["videos"]
+    return (f"Job {job['job_id']} {job['status']}: {v[SUCCESS]} succeeded, {v[FAILED]} failed, "
+            f"{v[PENDING] + v[IN_PROGRESS]} not done, of {job['total']} videos.")
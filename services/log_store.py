@@ -0,0 +1,351 @@
+import os
+import json
+import queue
+import sqlite3
+import threading
+from datetime import datetime
+
+# Entries written in one transaction (one fsync) at most
+MAX_BATCH_SIZE = 500
+
+# Entries per page on /logs
+LOG_PAGE_SIZE = 50
+MAX_LOG_PAGE_SIZE = 500
+
+# Failure reasons listed in the summary
+TOP_FAILURE_REASONS = 10
+
+# Fields stored in their own indexed columns; anything else goes to `extra`
+_COLUMNS = ("videoId", "title", "status", "message")
+
+# Timing fields the userscript adds to its reports (kept in the extra column)
+TIMING_FIELDS = ("timeToButtonMs", "timeToSegmentsMs", "totalMs", "segmentCount", "bytes")
+TIMING_PERCENTILES = (50, 90, 99)
+
+class LogStore:
+    """
+    Append-only store for userscript download reports, kept in SQLite (WAL).
+    All writes go through one writer thread that commits everything queued
+    so far in one transaction (group commit): entries arriving while a
+    commit is running share the next one, so concurrent /api/log posts
+    neither block each other nor lose entries. Entries are indexed by
+    videoId, status and timestamp.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._queue = queue.Queue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+
+        conn = self._connect()
+        try:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS logs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    video_id TEXT,
+                    title TEXT,
+                    status TEXT,
+                    message TEXT,
+                    extra TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_logs_video ON logs (video_id);
+                CREATE INDEX IF NOT EXISTS idx_logs_status ON logs (status, timestamp);
+                -- Covering indexes for summary(): hourly counts and failure reasons
+                DROP INDEX IF EXISTS idx_logs_timestamp;
+                CREATE INDEX IF NOT EXISTS idx_logs_time_status ON logs (timestamp, status);
+                CREATE INDEX IF NOT EXISTS idx_logs_failures ON logs (status, message, timestamp);
+            """)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # With WAL, NORMAL syncs once per checkpoint instead of on every commit
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # --- Writing ---
+
+    def append(self, entry, wait=True):
+        """
+        Stores one log entry, stamping it with the current time.
+        With `wait` the call returns once the batch holding it is committed.
+        Returns the stored entry.
+        """
+        entry = dict(entry)
+        entry["timestamp"] = datetime.now().isoformat()
+
+        done = threading.Event() if wait else None
+        self._ensure_writer()
+        self._queue.put((entry, done))
+        if done:
+            done.wait()
+        return entry
+
+    def _ensure_writer(self):
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._write_loop, name="log-store-writer", daemon=True)
+                self._writer.start()
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < MAX_BATCH_SIZE:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT INTO logs (timestamp, video_id, title, status, message, extra) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        [_to_row(entry) for entry, _ in batch]
+                    )
+            except Exception as e:
+                print(f"ERROR: Could not write {len(batch)} log entries: {e}")
+            finally:
+                for _, done in batch:
+                    if done:
+                        done.set()
+
+    def import_entries(self, entries):
+        """Bulk-inserts entries that already carry their timestamp (used by migration)."""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO logs (timestamp, video_id, title, status, message, extra) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [_to_row(entry) for entry in entries]
+                )
+        finally:
+            conn.close()
+
+    # --- Reading ---
+
+    def recent(self, limit=None):
+        """Returns entries newest first."""
+        conn = self._connect()
+        try:
+            sql = "SELECT timestamp, video_id, title, status, message, extra FROM logs ORDER BY id DESC"
+            params = ()
+            if limit:
+                sql += " LIMIT ?"
+                params = (limit,)
+            return [_from_row(row) for row in conn.execute(sql, params)]
+        finally:
+            conn.close()
+
+    def successful_video_ids(self):
+        """Distinct videoIds with a SUCCESS or SKIPPED report (seeds the download registry)."""
+        conn = self._connect()
+        try:
+            return [row[0] for row in conn.execute(
+                "SELECT DISTINCT video_id FROM logs WHERE status IN ('SUCCESS', 'SKIPPED') AND video_id IS NOT NULL"
+            )]
+        finally:
+            conn.close()
+
+    def query(self, status=None, video_id=None, title=None, since=None, until=None,
+              before_id=None, limit=LOG_PAGE_SIZE):
+        """
+        Returns one page of matching entries, newest first, and the cursor for
+        the next (older) page, or None on the last page. Pages are keyed on
+        the row id, so deep pages cost the same as the first one.
+        """
+        where, params = _where(status, video_id, title, since, until)
+        if before_id is not None:
+            where.append("id < ?")
+            params.append(before_id)
+
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT id, timestamp, video_id, title, status, message, extra FROM logs"
+                + _clause(where) + " ORDER BY id DESC LIMIT ?",
+                params + [limit + 1]
+            ).fetchall()
+        finally:
+            conn.close()
+
+        entries = [dict(_from_row(row[1:]), id=row[0]) for row in rows[:limit]]
+        next_before_id = entries[-1]["id"] if len(rows) > limit else None
+        return entries, next_before_id
+
+    def count(self, status=None, video_id=None, title=None, since=None, until=None):
+        """Number of entries matching the same filters as query()."""
+        where, params = _where(status, video_id, title, since, until)
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM logs" + _clause(where), params).fetchone()[0]
+        finally:
+            conn.close()
+
+    def summary(self, since=None, until=None):
+        """
+        Aggregate stats for a time range: counts per status, downloads per
+        hour and the most common failure reasons. Every query is answered
+        from a covering index; no entry is read or decoded.
+        """
+        where, params = _where(since=since, until=until)
+        failure_where = where + ["status NOT IN ('SUCCESS', 'SKIPPED')"]
+
+        conn = self._connect()
+        try:
+            by_status = dict(conn.execute(
+                "SELECT status, COUNT(*) FROM logs" + _clause(where) + " GROUP BY status", params
+            ).fetchall())
+            per_hour = conn.execute(
+                "SELECT substr(timestamp, 1, 13) AS hour, COUNT(*), SUM(status = 'SUCCESS'), SUM(status = 'SKIPPED')"
+                " FROM logs"
+                + _clause(where) + " GROUP BY hour ORDER BY hour", params
+            ).fetchall()
+            reasons = conn.execute(
+                "SELECT message, COUNT(*) AS n FROM logs" + _clause(failure_where)
+                + " GROUP BY message ORDER BY n DESC LIMIT ?", params + [TOP_FAILURE_REASONS]
+            ).fetchall()
+        finally:
+            conn.close()
+
+        total = sum(by_status.values())
+        succeeded = by_status.get("SUCCESS", 0)
+        # Skips (videos already downloaded) are neither; the rate is over attempts
+        skipped = by_status.get("SKIPPED", 0)
+        attempted = total - skipped
+        return {
+            "since": since,
+            "until": until,
+            "total": total,
+            "succeeded": succeeded,
+            "skipped": skipped,
+            "failed": attempted - succeeded,
+            "success_rate": round(succeeded / attempted, 4) if attempted else None,
+            "by_status": by_status,
+            "per_hour": [
+                {"hour": hour + ":00", "total": n, "succeeded": ok, "skipped": skip, "failed": n - ok - skip}
+                for hour, n, ok, skip in per_hour
+            ],
+            "failure_reasons": [{"message": message, "count": n} for message, n in reasons],
+        }
+
+    def timings(self, since=None, until=None, status="SUCCESS"):
+        """
+        Percentiles of the userscript's timing fields (TIMING_FIELDS) over
+        reports with `status` in a time range, e.g. how long videos take
+        from page load to a downloaded transcript.
+        """
+        where, params = _where(status=status, since=since, until=until)
+        where.append("extra IS NOT NULL")
+        columns = ", ".join(f"json_extract(extra, '$.{field}')" for field in TIMING_FIELDS)
+
+        values = {field: [] for field in TIMING_FIELDS}
+        conn = self._connect()
+        try:
+            for row in conn.execute(f"SELECT {columns} FROM logs" + _clause(where), params):
+                for field, value in zip(TIMING_FIELDS, row):
+                    if isinstance(value, (int, float)):
+                        values[field].append(value)
+        finally:
+            conn.close()
+
+        result = {"since": since, "until": until, "status": status}
+        for field, samples in values.items():
+            samples.sort()
+            stats = {"count": len(samples)}
+            if samples:
+                for p in TIMING_PERCENTILES:
+                    stats[f"p{p}"] = samples[min(len(samples) - 1, len(samples) * p // 100)]
+                stats["max"] = samples[-1]
+                stats["mean"] = round(sum(samples) / len(samples), 1)
+            result[field] = stats
+        return result
+
+def filters_from_args(args):
+    """
+    Reads log filters from request arguments (status, videoId, title, since,
+    until). since/until are ISO dates or date-times; raises ValueError on
+    anything else.
+    """
+    filters = {
+        "status": (args.get("status") or "").strip().upper() or None,
+        "video_id": (args.get("videoId") or "").strip() or None,
+        "title": (args.get("title") or "").strip() or None,
+        "since": (args.get("since") or "").strip() or None,
+        "until": (args.get("until") or "").strip() or None,
+    }
+    for key in ("since", "until"):
+        if filters[key]:
+            datetime.fromisoformat(filters[key])  # raises ValueError on bad input
+    return filters
+
+def _where(status=None, video_id=None, title=None, since=None, until=None):
+    where, params = [], []
+    if status:
+        where.append("status = ?")
+        params.append(status)
+    if video_id:
+        where.append("video_id = ?")
+        params.append(video_id)
+    if since:
+        where.append("timestamp >= ?")
+        params.append(since)
+    if until:
+        # Inclusive: '2024-05-01' matches everything stamped on that day.
+        # '~' sorts after every character used in an ISO timestamp.
+        where.append("timestamp < ?")
+        params.append(until + "~")
+    if title:
+        # A substring match cannot use an index; the other filters narrow it first
+        where.append("title LIKE ? ESCAPE '\\'")
+        params.append("%" + title.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+    return where, params
+
+def _clause(where):
+    return " WHERE " + " AND ".join(where) if where else ""
+
+def _to_row(entry):
+    extra = {k: v for k, v in entry.items() if k not in _COLUMNS and k != "timestamp"}
+    return (
+        entry.get("timestamp") or datetime.now().isoformat(),
+        entry.get("videoId"),
+        entry.get("title"),
+        entry.get("status"),
+        entry.get("message"),
+        json.dumps(extra) if extra else None,
+    )
+
+def _from_row(row):
+    timestamp, video_id, title, status, message, extra = row
+    entry = {"videoId": video_id, "title": title, "status": status, "message": message, "timestamp": timestamp}
+    if extra:
+        entry.update(json.loads(extra))
+    return entry
+
+def migrate_json_log(store, json_path):
+    """
+    One-shot import of the old download_logs.json into `store`.
+    The JSON file is renamed to *.migrated afterwards so it is not imported twice.
+    Returns the number of imported entries (0 if there was nothing to do).
+    """
+    if not os.path.exists(json_path):
+        return 0
+    try:
+        with open(json_path, 'r') as f:
+            entries = json.load(f)
+    except Exception as e:
+        print(f"Warning: Could not read old log file {json_path}: {e}")
+        return 0
+
+    entries = [e for e in entries if isinstance(e, dict)]
+    store.import_entries(entries)
+    os.replace(json_path, json_path + ".migrated")
+    print(f"Imported {len(entries)} log entries from {json_path}")
+    return len(entries)
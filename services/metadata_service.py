@@ -0,0 +1,96 @@
+import isodate
+import numpy as np
+import pandas as pd
+
+# Column order of every export
+VIDEO_COLUMNS = [
+    "Video Title",
+    "Channel",
+    "Published Date",
+    "Video URL",
+    "Description",
+    "Video ID",
+    "Duration",
+    "Duration Seconds",
+    "Tags",
+    "Type",
+]
+
+# The shapes YouTube uses for video durations, e.g. PT1H2M3S, P1DT2H, P0D
+_DURATION_PATTERN = (
+    r"^P(?:(?P<days>\d+)D)?"
+    r"(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+)S)?)?$"
+)
+_UNIT_SECONDS = np.array([86400, 3600, 60, 1], dtype=np.float64)
+
+def parse_durations(values):
+    """
+    Parses ISO-8601 durations in one pass.
+    Returns a float array of seconds (NaN where missing) and the matching
+    display strings, formatted like str(datetime.timedelta).
+    Anything the pattern does not cover falls back to isodate.
+    """
+    series = pd.Series(values, dtype="object")
+    parts = series.str.extract(_DURATION_PATTERN).astype(np.float64)
+    matched = parts.notna().any(axis=1).to_numpy()
+    seconds = np.where(matched, np.nan_to_num(parts.to_numpy()) @ _UNIT_SECONDS, np.nan)
+
+    total = np.nan_to_num(seconds).astype(np.int64)
+    days, rest = np.divmod(total, 86400)
+    clock = (
+        pd.Series(rest // 3600).astype(str) + ":"
+        + pd.Series(rest % 3600 // 60).astype(str).str.zfill(2) + ":"
+        + pd.Series(rest % 60).astype(str).str.zfill(2)
+    )
+    day_prefix = pd.Series(days).astype(str) + np.where(days == 1, " day, ", " days, ")
+    text = np.where(days > 0, day_prefix + clock, clock).astype(object)
+
+    for i in np.flatnonzero(~matched):
+        value = values[i]
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            text[i] = "N/A"
+            continue
+        try:
+            duration = isodate.parse_duration(value)
+            text[i] = str(duration)
+            seconds[i] = duration.total_seconds()
+        except Exception:
+            text[i] = "N/A"
+
+    return seconds, text
+
+def parse_published_dates(values):
+    """
+    Parses API publishedAt timestamps in one pass and returns their (UTC) dates.
+    """
+    return pd.to_datetime(pd.Series(values, dtype="object"), utc=True, format="ISO8601").dt.date.tolist()
+
+def normalize_page(items, details_map):
+    """
+    Turns one page of playlistItems plus their get_video_details() entries
+    into export rows (dicts keyed by VIDEO_COLUMNS).
+    Dates and durations are parsed column-wise instead of per video.
+    """
+    if not items:
+        return []
+
+    snippets = [item["snippet"] for item in items]
+    video_ids = [snippet["resourceId"]["videoId"] for snippet in snippets]
+    details = [details_map.get(vid_id, {}) for vid_id in video_ids]
+
+    seconds, duration_text = parse_durations([d.get("DurationISO") for d in details])
+    duration_seconds = [None if np.isnan(s) else int(s) for s in seconds.tolist()]
+
+    columns = [
+        [snippet["title"] for snippet in snippets],
+        [snippet["channelTitle"] for snippet in snippets],
+        parse_published_dates([snippet["publishedAt"] for snippet in snippets]),
+        [f"https://www.youtube.com/watch?v={vid_id}" for vid_id in video_ids],
+        [snippet["description"] for snippet in snippets],
+        video_ids,
+        duration_text.tolist(),
+        duration_seconds,
+        [d.get("Tags", "") for d in details],
+        ["Video"] * len(items),
+    ]
+    return [dict(zip(VIDEO_COLUMNS, values)) for values in zip(*columns)]
@@ -0,0 +1,239 @@
+import time
+import threading
+
+# Prefix of every metric name on /metrics
+METRIC_PREFIX = "ytsubs_"
+
+# Histogram buckets in seconds; browser waits run into tens of seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 15, 30, 60, 120)
+
+# Percentiles shown per stage in run summaries
+SUMMARY_PERCENTILES = (50, 99)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + list(extra or [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(round(value, 6)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = METRIC_PREFIX + name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} takes labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    """A value that only goes up (calls, bytes, seconds spent)."""
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def collect(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+                                for key, value in values]
+
+class Histogram(_Metric):
+    """Durations, counted into LATENCY_BUCKETS, with their sum and count."""
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, seconds, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            self._values[key] = (counts, total + seconds)
+
+    def collect(self):
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = self.header()
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, [('le', _format_value(bound))])}"
+                             f" {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {round(total, 6)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+class Callback(_Metric):
+    """
+    A value read from elsewhere when /metrics is scraped. `read()` returns a
+    number, or a dict of label value tuples to numbers.
+    """
+
+    def __init__(self, name, help, read, labels=(), kind="gauge"):
+        super().__init__(name, help, labels)
+        self.read = read
+        self.kind = kind
+
+    def collect(self):
+        try:
+            values = self.read()
+        except Exception as e:
+            print(f"Warning: Could not read metric {self.name}: {e}")
+            return []
+        if not isinstance(values, dict):
+            values = {(): values}
+        return self.header() + [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+                                for key, value in sorted(values.items())]
+
+class Registry:
+    """All metrics of the process, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self._add(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def callback(self, name, help, read, labels=(), kind="gauge"):
+        return self._add(Callback(name, help, read, labels, kind))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+# --- Channel fetches (youtube_service) ---
+API_CALLS = REGISTRY.counter("api_calls_total", "Data API requests sent, by endpoint and HTTP status.",
+                             ("endpoint", "status"))
+API_CALL_SECONDS = REGISTRY.histogram("api_call_seconds", "Data API request latency.", ("endpoint",))
+API_THROTTLE_SECONDS = REGISTRY.counter("api_throttle_seconds_total",
+                                        "Time Data API calls spent rate limited or backing off before a retry.",
+                                        ("endpoint",))
+API_CACHE_HITS = REGISTRY.counter("api_cache_hits_total", "Data API calls answered from the response cache.",
+                                  ("endpoint",))
+QUOTA_UNITS = REGISTRY.counter("quota_units_total", "Data API quota units spent.")
+VIDEOS_FETCHED = REGISTRY.counter("videos_fetched_total", "Video rows collected by channel fetches.")
+EXPORT_SECONDS = REGISTRY.histogram("export_seconds", "Time writing a fetch's export file.", ("format",))
+
+# --- Transcript downloads (browser_service, transcript_service) ---
+PROFILE_SYNC_SECONDS = REGISTRY.histogram("profile_sync_seconds", "Chrome profile snapshot sync time.")
+PROFILE_SYNC_BYTES = REGISTRY.counter("profile_sync_bytes_total", "Bytes copied into Chrome profile snapshots.")
+DRIVER_LAUNCH_SECONDS = REGISTRY.histogram("driver_launch_seconds",
+                                           "Chrome start-up time, profile sync included.")
+DRIVER_REUSES = REGISTRY.counter("driver_reuses_total", "Browsers taken from the pool warm instead of launched.")
+PAGE_LOAD_SECONDS = REGISTRY.histogram("page_load_seconds", "Time for driver.get() to load a video page.")
+USERSCRIPT_WAIT_SECONDS = REGISTRY.histogram("userscript_wait_seconds",
+                                             "Time from page load to the userscript's report (or giving up).",
+                                             ("outcome",))
+VIDEO_SECONDS = REGISTRY.histogram("video_seconds", "Time per video from start to outcome.",
+                                   ("engine", "outcome"))
+
+# --- Web app (app.py) ---
+HTTP_REQUESTS = REGISTRY.counter("http_requests_total", "Requests served, by route, method and status.",
+                                 ("route", "method", "status"))
+HTTP_REQUEST_SECONDS = REGISTRY.histogram("http_request_seconds",
+                                          "Time until a response starts; streamed bodies continue after.",
+                                          ("route",))
+
+# --- Runs ---
+RUN_SECONDS = REGISTRY.histogram("run_seconds", "Duration of fetch and download runs.", ("pipeline",),
+                                 buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600, 7200))
+
+def _percentile(samples, p):
+    return samples[min(len(samples) - 1, len(samples) * p // 100)]
+
+class RunStats:
+    """
+    Stage timings and counters of one fetch or download run, for the summary
+    line at the end of its stream. Each observation can also go to a
+    process-wide metric (`metric`), which /metrics exposes.
+    Safe to share between a run's worker threads.
+    """
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.started = time.perf_counter()
+        self.stages = {}    # stage -> [seconds, ...]
+        self.counters = {}  # name -> amount
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds, metric=None, **labels):
+        with self._lock:
+            self.stages.setdefault(stage, []).append(seconds)
+        if metric is not None:
+            metric.observe(seconds, **labels)
+
+    def count(self, name, amount=1, metric=None, **labels):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+        if metric is not None:
+            metric.inc(amount, **labels)
+
+    def summary(self, videos=None):
+        """
+        One line: wall time, throughput, and per stage its summed time, count
+        and percentiles. Stages run in parallel on several workers, so
+        their times can add up to more than the wall time.
+        """
+        seconds = time.perf_counter() - self.started
+        RUN_SECONDS.observe(seconds, pipeline=self.pipeline)
+        line = f"Run summary ({self.pipeline}): {seconds:.2f}s"
+        if videos is not None:
+            line += f", {videos} videos ({videos / seconds if seconds else 0:.1f}/s)"
+        with self._lock:
+            stages = {stage: sorted(samples) for stage, samples in self.stages.items()}
+            counters = dict(self.counters)
+        parts = []
+        for stage, samples in stages.items():
+            detail = ", ".join(f"p{p} {_percentile(samples, p) * 1000:.0f} ms" for p in SUMMARY_PERCENTILES)
+            parts.append(f"{stage} {sum(samples):.2f}s over {len(samples)} ({detail})")
+        parts.extend(f"{name} {round(amount, 2) if isinstance(amount, float) else amount}"
+                     for name, amount in counters.items())
+        if parts:
+            line += "; " + "; ".join(parts)
+        return line
@@ -0,0 +1,123 @@
+import os
+import time
+import shutil
+
+# Profile folders Chrome rebuilds on its own; copying them only costs time.
+# Paths are relative to the profile directory.
+SKIPPED_DIRS = {
+    "Cache",
+    "Code Cache",
+    "GPUCache",
+    "DawnCache",
+    "DawnGraphiteCache",
+    "DawnWebGPUCache",
+    "GrShaderCache",
+    "ShaderCache",
+    "Media Cache",
+    "Application Cache",
+    os.path.join("Service Worker", "CacheStorage"),
+    os.path.join("Service Worker", "ScriptCache"),
+}
+
+# Lock files of a running Chrome; they must never be copied
+SKIPPED_FILES = {"LOCK", "lockfile", "SingletonLock", "SingletonCookie", "SingletonSocket"}
+
+# Files whose mtime differs by less than this are treated as unchanged
+# (FAT/exFAT and some network drives store mtimes with 2s precision)
+MTIME_TOLERANCE_SECONDS = 2
+
+def _is_unchanged(source_stat, dest_path):
+    try:
+        dest_stat = os.stat(dest_path)
+    except OSError:
+        return False
+    return (dest_stat.st_size == source_stat.st_size
+            and abs(dest_stat.st_mtime - source_stat.st_mtime) < MTIME_TOLERANCE_SECONDS)
+
+def sync_profile(source_profile, dest_profile, force=False):
+    """
+    Brings the snapshot at `dest_profile` up to date with `source_profile`.
+    Only files whose size or mtime changed are copied, cache folders are
+    skipped, and files that disappeared from the source are removed.
+    `force` throws the snapshot away and copies everything again.
+
+    Returns a dict of counts and timings for the log.
+    """
+    started = time.perf_counter()
+    stats = {"copied": 0, "copied_bytes": 0, "unchanged": 0, "removed": 0, "errors": 0, "full_refresh": False}
+
+    if force or not os.path.isdir(dest_profile):
+        stats["full_refresh"] = True
+        if os.path.exists(dest_profile):
+            shutil.rmtree(dest_profile, ignore_errors=True)
+
+    seen = set()
+    for current, dirs, files in os.walk(source_profile):
+        relative_dir = os.path.relpath(current, source_profile)
+        relative_dir = "" if relative_dir == "." else relative_dir
+        # Prune cache folders so os.walk never descends into them
+        dirs[:] = [d for d in dirs if os.path.join(relative_dir, d) not in SKIPPED_DIRS]
+
+        dest_dir = os.path.join(dest_profile, relative_dir)
+        os.makedirs(dest_dir, exist_ok=True)
+        seen.add(os.path.normcase(dest_dir))
+
+        for name in files:
+            if name in SKIPPED_FILES:
+                continue
+            source_path = os.path.join(current, name)
+            dest_path = os.path.join(dest_dir, name)
+            seen.add(os.path.normcase(dest_path))
+            try:
+                source_stat = os.stat(source_path)
+                if _is_unchanged(source_stat, dest_path):
+                    stats["unchanged"] += 1
+                    continue
+                # copy2 keeps the mtime, which is what the next sync compares
+                shutil.copy2(source_path, dest_path)
+                stats["copied"] += 1
+                stats["copied_bytes"] += source_stat.st_size
+            except OSError as e:
+                # Files held open by a running Chrome cannot always be read
+                print(f"Warning: Could not copy {source_path}: {e}")
+                stats["errors"] += 1
+
+    if not stats["full_refresh"]:
+        stats["removed"] = _remove_stale(dest_profile, seen)
+
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+def _remove_stale(dest_profile, seen):
+    """Deletes snapshot files that no longer exist in the source (cache folders are left alone)."""
+    removed = 0
+    for current, dirs, files in os.walk(dest_profile, topdown=False):
+        relative_dir = os.path.relpath(current, dest_profile)
+        relative_dir = "" if relative_dir == "." else relative_dir
+        if any(relative_dir == d or relative_dir.startswith(d + os.sep) for d in SKIPPED_DIRS):
+            continue
+        for name in files:
+            path = os.path.join(current, name)
+            if name in SKIPPED_FILES or os.path.normcase(path) in seen:
+                continue
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        if relative_dir and os.path.normcase(current) not in seen:
+            try:
+                os.rmdir(current)
+            except OSError:
+                pass  # not empty: holds a cache folder Chrome made
+    return removed
+
+def describe_sync(stats):
+    """One-line summary of sync_profile() results."""
+    kind = "full copy" if stats["full_refresh"] else "incremental sync"
+    line = (f"Profile snapshot ({kind}): {stats['copied']} files copied "
+            f"({stats['copied_bytes'] / 1_048_576:.1f} MB), {stats['unchanged']} unchanged, "
+            f"{stats['removed']} removed in {stats['seconds']:.2f}s")
+    if stats["errors"]:
+        line += f", {stats['errors']} could not be read"
+    return line
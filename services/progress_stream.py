@@ -0,0 +1,175 @@
+import re
+import json
+import time
+import queue
+import threading
+
+# Progress stream formats: the original plain text lines, newline-delimited
+# JSON events, or Server-Sent Events (EventSource)
+PROGRESS_FORMATS = ("text", "ndjson", "sse")
+
+# Formats for streams that cannot be resumed. EventSource reconnects by itself
+# after the stream ends, which would start the fetch or job all over again,
+# so SSE is only offered where a reconnect resumes (Last-Event-ID).
+ONE_SHOT_FORMATS = ("text", "ndjson")
+
+MIMETYPES = {
+    "text": "text/plain",
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream",
+}
+
+# A heartbeat event is sent after this long without progress, so clients and
+# proxies can tell a quiet run (waiting for a browser, queued job) from a dead one
+HEARTBEAT_SECONDS = 10
+
+# Lines arriving within this window (or up to BATCH_MAX_LINES) go out as one event
+BATCH_SECONDS = 0.2
+BATCH_MAX_LINES = 200
+
+# Reconnect delay suggested to EventSource clients, in milliseconds
+SSE_RETRY_MS = 3000
+
+_POSITION = re.compile(r"\[(\d+)/(\d+)\]")
+_WORKER = re.compile(r"^\[W(\d+)\] ")
+_SAVED_TO = "Success! Saved to: "
+
+_END = object()
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+def describe_line(line):
+    """
+    A progress line as a structured record: its text, a `level` ("error",
+    "success", "heading" or "info") and, where the line has them, the
+    [position/total] of a video, the [W<n>] worker and a saved export `file`.
+    """
+    record = {"text": line}
+    worker = _WORKER.match(line)
+    if worker:
+        record["worker"] = int(worker.group(1))
+    position = _POSITION.search(line)
+    if position:
+        record["position"], record["total"] = int(position.group(1)), int(position.group(2))
+    if line.startswith(_SAVED_TO):
+        record["file"] = line[len(_SAVED_TO):]
+
+    if "Error" in line or "ERROR" in line:
+        record["level"] = "error"
+    elif "Success" in line or "SUCCESS" in line or "Complete" in line or line.startswith("All videos processed"):
+        record["level"] = "success"
+    elif line.startswith("---") or "Opening:" in line:
+        record["level"] = "heading"
+    else:
+        record["level"] = "info"
+    return record
+
+def choose_format(requested, accept="", formats=PROGRESS_FORMATS):
+    """
+    The format asked for by name (the `stream` parameter), else by the
+    Accept header, else "text". Returns None for a name, or an accepted
+    type, that is not in `formats`.
+    """
+    if requested:
+        chosen = requested
+    elif "text/event-stream" in accept:
+        chosen = "sse"
+    elif "application/x-ndjson" in accept:
+        chosen = "ndjson"
+    else:
+        chosen = "text"
+    return chosen if chosen in formats else None
+
+def _pump(lines, out, cancelled):
+    # Runs the source generator on its own thread so the response can send
+    # heartbeats while it blocks
+    try:
+        for line in lines:
+            out.put(line)
+            if cancelled.is_set():
+                break
+    except Exception as e:
+        out.put(_Failure(e))
+    finally:
+        close = getattr(lines, "close", None)
+        if close:
+            close()
+        out.put(_END)
+
+def _encode(fmt, event):
+    if fmt == "sse":
+        return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    return json.dumps(event) + "\n"
+
+def stream_progress(lines, fmt="text", start_id=0, start=None):
+    """
+    Serves an iterator of progress lines in `fmt`.
+
+    "text" passes the lines through unchanged. "ndjson" and "sse" send
+    events: an optional {"type": "start", ...start} first, then "progress"
+    events with a batch of described lines (see describe_line), a
+    "heartbeat" after HEARTBEAT_SECONDS of silence, and a final "end" (or
+    "error"). Each event's `id` is `start_id` plus the number of lines sent
+    so far, so a job stream resumes from it (SSE Last-Event-ID).
+
+    The source runs on a separate thread; if the client disconnects, it is
+    closed after its next line.
+    """
+    if fmt == "text":
+        for line in lines:
+            yield line + "\n"
+        return
+
+    out = queue.Queue()
+    cancelled = threading.Event()
+    threading.Thread(target=_pump, args=(lines, out, cancelled), name="progress-stream", daemon=True).start()
+
+    started = time.monotonic()
+    sent = start_id
+    try:
+        if fmt == "sse":
+            yield f"retry: {SSE_RETRY_MS}\n\n"
+        if start is not None:
+            yield _encode(fmt, dict(start, type="start", id=sent))
+
+        finished = False
+        while not finished:
+            try:
+                item = out.get(timeout=HEARTBEAT_SECONDS)
+            except queue.Empty:
+                yield _encode(fmt, {"type": "heartbeat", "id": sent, "elapsed": round(time.monotonic() - started, 1)})
+                continue
+
+            batch = []
+            deadline = time.monotonic() + BATCH_SECONDS
+            while True:
+                if item is _END:
+                    finished = True
+                    break
+                if isinstance(item, _Failure):
+                    if batch:
+                        sent += len(batch)
+                        yield _encode(fmt, {"type": "progress", "id": sent, "lines": batch})
+                        batch = []
+                    yield _encode(fmt, {"type": "error", "id": sent, "message": str(item.error)})
+                else:
+                    batch.append(describe_line(item))
+                    if len(batch) >= BATCH_MAX_LINES:
+                        break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = out.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if batch:
+                sent += len(batch)
+                yield _encode(fmt, {"type": "progress", "id": sent, "lines": batch})
+
+        yield _encode(fmt, {"type": "end", "id": sent, "line_count": sent - start_id,
+                            "elapsed": round(time.monotonic() - started, 1)})
+    finally:
+        cancelled.set()
@@ -0,0 +1,275 @@
+import os
+import json
+import time
+import random
+import threading
+from datetime import datetime, timedelta, timezone
+from googleapiclient.errors import HttpError
+
+# Quota units charged per call, see https://developers.google.com/youtube/v3/determine_quota_cost
+QUOTA_COSTS = {
+    "channels": 1,
+    "playlistItems": 1,
+    "videos": 1,
+}
+
+# Default daily quota of a Data API project; used as the per-run budget
+DAILY_QUOTA_UNITS = 10000
+
+# Token bucket: sustained requests per second and burst size, shared by all workers.
+# YOUTUBE_API_REQUESTS_PER_SECOND raises it for a local stand-in (benchmarks/bench_pipelines.py)
+REQUESTS_PER_SECOND = float(os.environ.get("YOUTUBE_API_REQUESTS_PER_SECOND") or 10)
+BURST_SIZE = 10
+
+# Retries for 429/5xx and rate-limit errors, with jittered exponential backoff
+MAX_RETRIES = 5
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+
+# On 403 quotaExceeded, wait and retry the same call this many times; this
+# rides out per-minute quota limits. After that (or when the run's budget is
+# spent) the run stops with a partial result, unless it waits for the reset.
+QUOTA_PAUSE_SECONDS = 60
+MAX_QUOTA_PAUSES = 3
+
+# The daily quota resets at midnight Pacific time. Without tz data (Windows
+# without the tzdata package) PDT is assumed, which in winter wakes up an
+# hour late rather than early.
+QUOTA_RESET_TIMEZONE = "America/Los_Angeles"
+QUOTA_RESET_FALLBACK_UTC_OFFSET = timedelta(hours=-7)
+
+# Margin after the reset before calls are retried, and how often a waiting
+# run reports the time left
+QUOTA_RESET_MARGIN_SECONDS = 60
+QUOTA_WAIT_REPORT_SECONDS = 600
+
+# Emit a quota status line every this many units
+QUOTA_REPORT_EVERY = 25
+
+_QUOTA_REASONS = {"quotaExceeded", "dailyLimitExceeded"}
+_RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+
+class QuotaExhausted(Exception):
+    """Raised when the quota budget is used up; results fetched so far are still valid."""
+
+def next_quota_reset(now=None):
+    """The next midnight Pacific time (the daily quota reset), as an aware datetime."""
+    try:
+        from zoneinfo import ZoneInfo
+        zone = ZoneInfo(QUOTA_RESET_TIMEZONE)
+    except Exception:
+        zone = timezone(QUOTA_RESET_FALLBACK_UTC_OFFSET)
+    local = (now or datetime.now(timezone.utc)).astimezone(zone)
+    midnight = datetime.combine(local.date() + timedelta(days=1), datetime.min.time())
+    return midnight.replace(tzinfo=zone)
+
+def _format_wait(seconds):
+    hours, rest = divmod(int(seconds), 3600)
+    return f"{hours}h {rest // 60:02d}m" if hours else f"{rest // 60}m {rest % 60:02d}s"
+
+def error_reason(error):
+    """
+    Extracts the API error reason (e.g. 'quotaExceeded') from an HttpError.
+    """
+    try:
+        content = json.loads(error.content.decode("utf-8"))
+        errors = content["error"].get("errors") or []
+        if errors:
+            return errors[0].get("reason", "")
+        return content["error"].get("status", "")
+    except Exception:
+        return ""
+
+class TokenBucket:
+    """Blocking token bucket rate limiter, safe to share between threads."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class QuotaScheduler:
+    """
+    Central gate for Data API calls of one run.
+    Rate limits every call, tracks quota units spent against `budget`, retries
+    transient errors with backoff, and pauses on quotaExceeded so the caller
+    resumes on the same page instead of losing it.
+
+    When the quota is used up for the day (the API keeps answering
+    quotaExceeded, or `budget` is spent), QuotaExhausted is raised and the
+    caller keeps a partial result. With `wait_for_reset` the call instead
+    sleeps until the next daily reset (midnight Pacific), reporting the
+    time left, grants another `budget` and carries on. close() ends such
+    a wait, or a quota pause, e.g. when the client has gone.
+
+    `sleep` replaces the pauses and backoff delays (tests); close() can't
+    interrupt it.
+    """
+
+    def __init__(self, budget=DAILY_QUOTA_UNITS, rate=REQUESTS_PER_SECOND, burst=BURST_SIZE,
+                 costs=None, sleep=None, wait_for_reset=False):
+        self.budget = budget
+        self.daily_budget = budget
+        self.wait_for_reset = wait_for_reset
+        self.closed = threading.Event()
+        self._reset_at = None
+        self.costs = dict(QUOTA_COSTS, **(costs or {}))
+        self.bucket = TokenBucket(rate, burst)
+        self.spent = 0
+        # Units of calls in flight, counted against the budget until charged
+        self.reserved = 0
+        self.calls = {}
+        self.retries = 0
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        self._last_report = 0
+
+    @property
+    def remaining(self):
+        return max(0, self.budget - self.spent)
+
+    def summary(self):
+        """Returns a one-line quota status for the progress stream."""
+        calls = ", ".join(f"{endpoint} {count}" for endpoint, count in sorted(self.calls.items()))
+        return (f"Quota: {self.spent} units used, {self.remaining} of {self.budget} remaining"
+                f" ({calls or 'no calls'}; {self.retries} retries)")
+
+    def close(self):
+        """Stops waits for the quota reset and quota pauses; they raise QuotaExhausted."""
+        self.closed.set()
+
+    def _pause(self, seconds):
+        # Returns True if close() was called
+        if self.sleep is None:
+            return self.closed.wait(seconds)
+        self.sleep(seconds)
+        return self.closed.is_set()
+
+    def _wait_for_reset(self, reason, emit):
+        # Every worker that runs out waits for the same reset; the budget is
+        # topped up once per reset
+        with self._lock:
+            if self._reset_at is None:
+                self._reset_at = next_quota_reset() + timedelta(seconds=QUOTA_RESET_MARGIN_SECONDS)
+            reset_at = self._reset_at
+        local_time = reset_at.astimezone().strftime("%H:%M")
+        while True:
+            left = (reset_at - datetime.now(timezone.utc)).total_seconds()
+            if left <= 0:
+                break
+            if emit:
+                emit(f"  > {reason}: waiting {_format_wait(left)} for the daily quota reset "
+                     f"(midnight Pacific, {local_time} local)...")
+            if self.closed.wait(min(left, QUOTA_WAIT_REPORT_SECONDS)):
+                raise QuotaExhausted(f"{reason}; stopped while waiting for the quota reset")
+        with self._lock:
+            if self._reset_at == reset_at:
+                self._reset_at = None
+                self.budget = self.spent + self.daily_budget
+        if emit:
+            emit(f"  > Quota reset; resuming with {self.remaining} units.")
+
+    def _charge(self, endpoint, cost, emit):
+        # Turns the call's reservation into spent units
+        with self._lock:
+            self.reserved -= cost
+            self.spent += cost
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+            report = self.spent - self._last_report >= QUOTA_REPORT_EVERY
+            if report:
+                self._last_report = self.spent
+        if report and emit:
+            emit(f"  > {self.summary()}")
+
+    def execute(self, request, endpoint, emit=None, execute=None):
+        """
+        Runs `request` under the rate limit and quota budget.
+        `emit` receives retry/pause notices; `execute(request, endpoint)` performs
+        the call (defaults to request.execute()). Raises QuotaExhausted when
+        the budget or the API quota is used up.
+        """
+        execute = execute or (lambda req, _endpoint: req.execute())
+        cost = self.costs.get(endpoint, 1)
+        attempt = 0
+        pauses = 0
+
+        while True:
+            # Reserve the units before the call, so concurrent workers can't
+            # all pass the check and overshoot the budget together
+            with self._lock:
+                over_budget = self.spent + self.reserved + cost > self.budget
+                if not over_budget:
+                    self.reserved += cost
+            if over_budget:
+                reason = f"Quota budget of {self.daily_budget} units used up"
+                if not self.wait_for_reset:
+                    raise QuotaExhausted(reason)
+                self._wait_for_reset(reason, emit)
+                continue
+
+            charged = False
+            try:
+                self.bucket.acquire()
+                response = execute(request, endpoint)
+                charged = True
+                self._charge(endpoint, cost, emit)
+                return response
+            except HttpError as e:
+                status = e.resp.status
+                reason = error_reason(e)
+
+                if status == 304:
+                    # Not modified still costs the call
+                    charged = True
+                    self._charge(endpoint, cost, emit)
+                    raise
+
+                if status == 403 and reason in _QUOTA_REASONS:
+                    pauses += 1
+                    if pauses > MAX_QUOTA_PAUSES:
+                        if not self.wait_for_reset:
+                            raise QuotaExhausted(f"API quota exceeded ({reason})")
+                        self._wait_for_reset(f"API quota exceeded ({reason})", emit)
+                        pauses = 0
+                        continue
+                    if emit:
+                        emit(f"  > API quota exceeded, pausing {QUOTA_PAUSE_SECONDS}s before resuming "
+                             f"({pauses}/{MAX_QUOTA_PAUSES})...")
+                    if self._pause(QUOTA_PAUSE_SECONDS):
+                        raise QuotaExhausted(f"API quota exceeded ({reason}); stopped while pausing")
+                    continue
+
+                if status == 429 or status >= 500 or reason in _RATE_LIMIT_REASONS:
+                    attempt += 1
+                    if attempt > MAX_RETRIES:
+                        raise
+                    with self._lock:
+                        self.retries += 1
+                    delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+                    if emit:
+                        emit(f"  > {endpoint} returned {status}{' ' + reason if reason else ''}, "
+                             f"retrying in {delay:.1f}s ({attempt}/{MAX_RETRIES})...")
+                    if self._pause(delay):
+                        raise
+                    continue
+
+                raise
+            finally:
+                if not charged:
+                    # Refund the reservation of a call that failed uncharged
+                    with self._lock:
+                        self.reserved -= cost
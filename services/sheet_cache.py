@@ -0,0 +1,308 @@
+import os
+import json
+import time
+import bisect
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime, date
+
+# Parsed copies of uploaded spreadsheets: one SQLite file per distinct file
+# content, so re-uploading or re-opening a sheet never parses Excel again
+SHEET_CACHE_DIR = os.path.join("uploads", "sheet_cache")
+
+# Bump when the sidecar layout changes; older sidecars are parsed again
+SHEET_CACHE_VERSION = 1
+
+# Sidecars kept; the least recently used ones are deleted beyond this
+MAX_CACHED_SHEETS = 50
+
+# Hex digits of the content hash used as the sheet ID
+SHEET_ID_LENGTH = 24
+
+# Rows per page of /api/sheets/<id>/rows
+SHEET_PAGE_SIZE = 50
+MAX_SHEET_PAGE_SIZE = 500
+
+# Rows inserted per executemany() while parsing
+PARSE_BATCH_SIZE = 2000
+
+HASH_CHUNK_BYTES = 1 << 20
+
+# Spreadsheet columns the table shows; the full row is kept as JSON
+TITLE_COLUMN = "Video Title"
+CHANNEL_COLUMN = "Channel"
+PUBLISHED_COLUMN = "Published Date"
+URL_COLUMN = "Video URL"
+ID_COLUMN = "Video ID"
+
+# Sort keys accepted by rows() -> sidecar column
+SORT_COLUMNS = {
+    "row": "row_no",
+    TITLE_COLUMN: "title COLLATE NOCASE",
+    CHANNEL_COLUMN: "channel COLLATE NOCASE",
+    PUBLISHED_COLUMN: "published",
+}
+
+def _cell(value):
+    """Excel cell value as stored in the sidecar (dates as ISO strings)."""
+    if isinstance(value, datetime):
+        if value.hour == value.minute == value.second == value.microsecond == 0:
+            return value.date().isoformat()
+        return value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def _text(value):
+    return None if value is None else str(value)
+
+def _like(text):
+    """LIKE pattern matching `text` anywhere (case-insensitive for ASCII)."""
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+def parse_row_ranges(spec):
+    """
+    Parses a row selection like "1-200,305,410-412" into sorted, merged
+    (first, last) pairs. Raises ValueError on anything else.
+    """
+    ranges = []
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        first = int(first)
+        last = int(last) if last else first
+        if first < 1 or last < first:
+            raise ValueError(f"invalid row range: {part}")
+        ranges.append((first, last))
+    ranges.sort()
+    merged = []
+    for first, last in ranges:
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+    return merged
+
+def _in_ranges(row_no, ranges, firsts):
+    i = bisect.bisect_right(firsts, row_no) - 1
+    return i >= 0 and row_no <= ranges[i][1]
+
+class SheetCache:
+    """
+    Uploaded video spreadsheets, parsed once into a SQLite sidecar named by
+    the file's content hash (the sheet ID). The process page reads pages of
+    rows from the sidecar instead of receiving the whole sheet, and jobs
+    select videos by sheet ID and row filter instead of a list of URLs.
+    """
+
+    def __init__(self, folder=SHEET_CACHE_DIR, max_sheets=MAX_CACHED_SHEETS):
+        self.folder = folder
+        self.max_sheets = max_sheets
+        self._lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+
+    def _path(self, sheet_id):
+        if not sheet_id or len(sheet_id) != SHEET_ID_LENGTH or not all(c in "0123456789abcdef" for c in sheet_id):
+            return None
+        return os.path.join(self.folder, sheet_id + ".db")
+
+    def _connect(self, sheet_id):
+        """Read-only connection to a sidecar, or None if there is none."""
+        path = self._path(sheet_id)
+        if not path or not os.path.exists(path):
+            return None
+        return sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True, timeout=30)
+
+    def add(self, path, file_name=None):
+        """
+        Caches the spreadsheet at `path` unless an identical file was cached
+        before. Returns (sheet_id, reused).
+        """
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+                digest.update(chunk)
+        sheet_id = digest.hexdigest()[:SHEET_ID_LENGTH]
+        file_name = file_name or os.path.basename(path)
+
+        info = self.info(sheet_id)
+        if info and info.get("version") == SHEET_CACHE_VERSION:
+            os.utime(self._path(sheet_id))  # most recently used
+            if info.get("file_name") != file_name:
+                self._set_info(sheet_id, {"file_name": file_name, "full_path": os.path.abspath(path)})
+            return sheet_id, True
+
+        self._parse(path, sheet_id, file_name)
+        self._prune()
+        return sheet_id, False
+
+    def _parse(self, path, sheet_id, file_name):
+        """Streams the first worksheet into a new sidecar, then moves it into place."""
+        from openpyxl import load_workbook
+
+        started = time.perf_counter()
+        target = self._path(sheet_id)
+        temp_path = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        conn = sqlite3.connect(temp_path)
+        try:
+            conn.execute("PRAGMA journal_mode=OFF")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.executescript("""
+                CREATE TABLE sheet (key TEXT PRIMARY KEY, value TEXT);
+                CREATE TABLE rows (
+                    row_no INTEGER PRIMARY KEY,
+                    video_id TEXT,
+                    title TEXT,
+                    channel TEXT,
+                    published TEXT,
+                    url TEXT,
+                    data TEXT NOT NULL
+                );
+            """)
+            sheet = workbook.worksheets[0]
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None) or ()
+            columns = [str(name) if name is not None else f"Unnamed: {i}" for i, name in enumerate(header)]
+
+            count, batch = 0, []
+            for values in rows:
+                if not any(v is not None for v in values):
+                    continue  # blank rows below the data
+                record = {column: _cell(value) for column, value in zip(columns, values)}
+                count += 1
+                batch.append((count, _text(record.get(ID_COLUMN)), _text(record.get(TITLE_COLUMN)),
+                              _text(record.get(CHANNEL_COLUMN)), _text(record.get(PUBLISHED_COLUMN)),
+                              _text(record.get(URL_COLUMN)), json.dumps(record, default=str)))
+                if len(batch) >= PARSE_BATCH_SIZE:
+                    conn.executemany("INSERT INTO rows VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+                    batch = []
+            if batch:
+                conn.executemany("INSERT INTO rows VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+
+            info = {
+                "version": SHEET_CACHE_VERSION,
+                "sheet_id": sheet_id,
+                "file_name": file_name,
+                "full_path": os.path.abspath(path),
+                "columns": columns,
+                "rows": count,
+                "source_bytes": os.path.getsize(path),
+                "parsed_at": datetime.now().isoformat(timespec="seconds"),
+                "parse_seconds": round(time.perf_counter() - started, 3),
+            }
+            conn.executemany("INSERT INTO sheet VALUES (?, ?)", [(k, json.dumps(v)) for k, v in info.items()])
+            conn.commit()
+        except Exception:
+            conn.close()
+            os.remove(temp_path)
+            raise
+        finally:
+            workbook.close()
+        conn.close()
+        os.replace(temp_path, target)
+        print(f"DEBUG: Cached sheet {file_name} as {sheet_id}: {count} rows in {info['parse_seconds']}s")
+
+    def _set_info(self, sheet_id, values):
+        conn = sqlite3.connect(self._path(sheet_id), timeout=30)
+        try:
+            conn.executemany("INSERT OR REPLACE INTO sheet VALUES (?, ?)",
+                             [(k, json.dumps(v)) for k, v in values.items()])
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _prune(self):
+        """Deletes the least recently used sidecars beyond max_sheets."""
+        with self._lock:
+            sidecars = []
+            for entry in os.scandir(self.folder):
+                if entry.name.endswith(".db"):
+                    sidecars.append((entry.stat().st_mtime, entry.path))
+            sidecars.sort(reverse=True)
+            for _, path in sidecars[self.max_sheets:]:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    print(f"Warning: could not delete cached sheet {path}: {e}")
+
+    def info(self, sheet_id):
+        """The sheet's file name, columns and row count, or None if it is not cached."""
+        conn = self._connect(sheet_id)
+        if conn is None:
+            return None
+        try:
+            return {key: json.loads(value) for key, value in conn.execute("SELECT key, value FROM sheet")}
+        except sqlite3.DatabaseError:
+            return None
+        finally:
+            conn.close()
+
+    def _where(self, query, channel):
+        clauses, params = [], []
+        if query:
+            clauses.append("(title LIKE ? ESCAPE '\\' OR channel LIKE ? ESCAPE '\\')")
+            params += [_like(query), _like(query)]
+        if channel:
+            clauses.append("channel = ?")
+            params.append(channel)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def rows(self, sheet_id, query=None, channel=None, sort="row", descending=False,
+             offset=0, limit=SHEET_PAGE_SIZE):
+        """
+        One page of table rows matching `query` (title or channel) and
+        `channel`. Returns (rows, total), or None if the sheet is not cached.
+        """
+        conn = self._connect(sheet_id)
+        if conn is None:
+            return None
+        order = SORT_COLUMNS.get(sort, "row_no") + (" DESC" if descending else "")
+        where, params = self._where(query, channel)
+        try:
+            total = conn.execute(f"SELECT COUNT(*) FROM rows{where}", params).fetchone()[0]
+            cursor = conn.execute(
+                f"SELECT row_no, video_id, title, channel, published, url FROM rows{where} "
+                f"ORDER BY {order}, row_no LIMIT ? OFFSET ?", params + [limit, offset])
+            rows = [{"row": row_no, "videoId": video_id, "title": title, "channel": channel,
+                     "published": published, "url": url}
+                    for row_no, video_id, title, channel, published, url in cursor]
+        finally:
+            conn.close()
+        return rows, total
+
+    def select(self, sheet_id, query=None, channel=None, row_ranges=None):
+        """
+        Every row matching the filter and, if given, the (first, last)
+        `row_ranges`, in sheet order: [(row_no, video_id, title, url)].
+        Returns None if the sheet is not cached.
+        """
+        conn = self._connect(sheet_id)
+        if conn is None:
+            return None
+        where, params = self._where(query, channel)
+        try:
+            cursor = conn.execute(f"SELECT row_no, video_id, title, url FROM rows{where} ORDER BY row_no", params)
+            if row_ranges is None:
+                return cursor.fetchall()
+            firsts = [first for first, _ in row_ranges]
+            return [row for row in cursor if _in_ranges(row[0], row_ranges, firsts)]
+        finally:
+            conn.close()
+
+    def record(self, sheet_id, row_no):
+        """The full spreadsheet row (every column, descriptions included), or None."""
+        conn = self._connect(sheet_id)
+        if conn is None:
+            return None
+        try:
+            found = conn.execute("SELECT data FROM rows WHERE row_no = ?", (row_no,)).fetchone()
+        finally:
+            conn.close()
+        return json.loads(found[0]) if found else None
@@ -0,0 +1,379 @@
+import os
+import re
+import json
+import html
+import time
+import random
+import threading
+import xml.etree.ElementTree as ET
+from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from services import completion_service, metrics
+from services.download_registry import transcript_file_name
+
+# Overrides the site root, e.g. to point at benchmarks/fake_caption_server.py
+YOUTUBE_WATCH_ENDPOINT = os.environ.get("YOUTUBE_WATCH_ENDPOINT", "https://www.youtube.com")
+
+# Parallel caption downloads; each one is just an HTTP request, so this can be
+# far higher than the browser worker limit
+DEFAULT_HTTP_WORKERS = 8
+MAX_HTTP_WORKERS = 32
+
+# Per-request timeout; the job's per-video timeout is used when it is shorter
+REQUEST_TIMEOUT_SECONDS = 15
+
+# Retries for 429/5xx and connection errors, with jittered exponential backoff
+MAX_RETRIES = 3
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 20.0
+
+# Caption languages tried in order before falling back to any track
+PREFERRED_LANGUAGES = ("en", "en-US", "en-GB")
+
+# How quickly a stop request is noticed while downloads are running
+STOP_CHECK_SECONDS = 0.5
+
+_PLAYER_RESPONSE_MARKER = re.compile(r"ytInitialPlayerResponse\s*=\s*")
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_session = None
+_session_lock = threading.Lock()
+_save_lock = threading.Lock()
+
+class TranscriptUnavailable(Exception):
+    """The video has no usable transcript (no captions, private, removed...); retrying will not help."""
+
+def get_session():
+    """
+    Returns the process-wide requests.Session. Its connection pool is sized
+    for MAX_HTTP_WORKERS, so parallel downloads reuse keep-alive connections
+    instead of opening one per request.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_HTTP_WORKERS)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update({
+                    "User-Agent": ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                                   "(KHTML, like Gecko) Chrome/120.0 Safari/537.36"),
+                    "Accept-Language": "en-US,en;q=0.9",
+                })
+                # Skips the EU cookie consent interstitial
+                session.cookies.set("CONSENT", "YES+cb", domain=".youtube.com")
+                _session = session
+    return _session
+
+# --- Watch page ---
+
+def extract_player_response(page):
+    """Returns the ytInitialPlayerResponse object embedded in a watch page, or None."""
+    match = _PLAYER_RESPONSE_MARKER.search(page)
+    if not match:
+        return None
+    try:
+        player_response, _ = json.JSONDecoder().raw_decode(page, match.end())
+    except ValueError:
+        return None
+    return player_response if isinstance(player_response, dict) else None
+
+def choose_track(tracks, languages=PREFERRED_LANGUAGES):
+    """
+    Picks the caption track to download: a manual track in a preferred
+    language, then an auto-generated one ("asr"), then whatever is first.
+    """
+    if not tracks:
+        return None
+    for language in languages:
+        for asr in (False, True):
+            for track in tracks:
+                if track.get("languageCode") == language and (track.get("kind") == "asr") == asr:
+                    return track
+    manual = [t for t in tracks if t.get("kind") != "asr"]
+    return (manual or tracks)[0]
+
+def _track_name(track):
+    name = track.get("name") or {}
+    if "simpleText" in name:
+        return name["simpleText"]
+    runs = name.get("runs") or []
+    return "".join(run.get("text", "") for run in runs) or track.get("languageCode", "?")
+
+# --- Caption formats ---
+
+def parse_captions(payload):
+    """
+    Returns the caption segments in `payload`, which may be json3,
+    srv1/srv2/srv3 or TTML XML, or WebVTT. Raises ValueError if the
+    format is not recognised.
+    """
+    payload = payload.lstrip("\ufeff").strip()
+    if not payload:
+        return []
+    if payload.startswith("{"):
+        return _parse_json3(json.loads(payload))
+    if payload.startswith("WEBVTT"):
+        return _parse_vtt(payload)
+    if payload.startswith("<"):
+        return _parse_xml(payload)
+    raise ValueError("unrecognised caption format")
+
+def _parse_json3(data):
+    segments = []
+    for event in data.get("events") or []:
+        text = "".join(seg.get("utf8", "") for seg in event.get("segs") or [])
+        if text.strip():
+            segments.append(text)
+    return segments
+
+def _parse_xml(payload):
+    root = ET.fromstring(payload)
+    segments = []
+    for element in root.iter():
+        tag = element.tag.rsplit("}", 1)[-1]  # TTML elements are namespaced
+        if tag == "text":  # srv1: <transcript><text start dur>...</text>
+            # srv1 text is HTML-escaped a second time (&amp;#39;)
+            segments.append(html.unescape("".join(element.itertext())))
+        elif tag == "p":  # srv3 <timedtext><body><p><s>...</s></p> and TTML
+            segments.append("".join(element.itertext()))
+    return segments
+
+_VTT_TIMING = re.compile(r"^\S+\s+-->\s+\S+")
+_VTT_TAGS = re.compile(r"<[^>]+>")
+
+def _parse_vtt(payload):
+    segments = []
+    cue = []
+    in_header = True
+    for line in payload.splitlines() + [""]:
+        line = line.strip()
+        if in_header:
+            in_header = bool(line)
+            continue
+        if not line:
+            if cue:
+                segments.append(html.unescape(_VTT_TAGS.sub("", " ".join(cue))))
+                cue = []
+        elif _VTT_TIMING.match(line):
+            cue = []  # drops an optional cue identifier line
+        elif not line.startswith("NOTE"):
+            cue.append(line)
+    return segments
+
+def transcript_text(segments):
+    """Joins segments the way the userscript joins the transcript panel's rows."""
+    return " ".join(" ".join(s.split()) for s in segments if s.strip())
+
+# --- Fetching ---
+
+def _get(session, url, timeout, params=None):
+    """GET with retries for 429/5xx and connection errors."""
+    import requests
+
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            response = session.get(url, params=params, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == MAX_RETRIES:
+                raise
+        else:
+            if response.status_code not in _RETRY_STATUSES or attempt == MAX_RETRIES:
+                return response
+        delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt)
+        time.sleep(delay * random.uniform(0.5, 1.0))
+
+def fetch_transcript(video_id, session=None, timeout=REQUEST_TIMEOUT_SECONDS,
+                     endpoint=None, languages=PREFERRED_LANGUAGES):
+    """
+    Downloads one video's transcript without a browser: reads the caption
+    tracks from the watch page, then downloads and parses the chosen track.
+    Returns (title, text, track_name). Raises TranscriptUnavailable when the
+    video has no transcript and requests exceptions on network errors.
+    """
+    session = session or get_session()
+    endpoint = (endpoint or YOUTUBE_WATCH_ENDPOINT).rstrip("/")
+
+    response = _get(session, endpoint + "/watch", timeout, params={"v": video_id, "hl": "en"})
+    if response.status_code == 404:
+        raise TranscriptUnavailable("Video not found")
+    response.raise_for_status()
+
+    player_response = extract_player_response(response.text)
+    if player_response is None:
+        raise TranscriptUnavailable("Could not read the watch page")
+    playability = player_response.get("playabilityStatus") or {}
+    if playability.get("status", "OK") != "OK":
+        raise TranscriptUnavailable(f"Video unavailable: {playability.get('reason') or playability['status']}")
+
+    title = (player_response.get("videoDetails") or {}).get("title") or "transcript"
+    tracks = (((player_response.get("captions") or {})
+               .get("playerCaptionsTracklistRenderer") or {})
+              .get("captionTracks") or [])
+    track = choose_track(tracks, languages)
+    if track is None or not track.get("baseUrl"):
+        raise TranscriptUnavailable("No captions available")
+
+    response = _get(session, urljoin(endpoint + "/", track["baseUrl"]), timeout)
+    response.raise_for_status()
+    try:
+        text = transcript_text(parse_captions(response.text))
+    except (ValueError, ET.ParseError) as e:
+        raise TranscriptUnavailable(f"Unreadable caption track: {e}")
+    if not text:
+        raise TranscriptUnavailable("Transcript not found or empty")
+    return title, text, _track_name(track)
+
+def default_download_dir():
+    """Where Chrome saves downloads when no folder is chosen."""
+    return os.path.join(os.path.expanduser("~"), "Downloads")
+
+def save_transcript(download_dir, title, text, video_id=None, registry=None):
+    """
+    Writes `text` under the file name the userscript would use. If
+    `registry` says that name belongs to another video (one with the same
+    title), writes "<title> (<videoId>)_transcript.txt" instead; a video's
+    own earlier file is overwritten. Returns the file name.
+    """
+    os.makedirs(download_dir, exist_ok=True)
+    with _save_lock:
+        # Decided and noted together, so parallel workers never pick the same name
+        file_name = transcript_file_name(title)
+        if video_id and registry is not None:
+            owner = registry.video_for_file(file_name)
+            if owner and owner != video_id:
+                file_name = transcript_file_name(f"{title} ({video_id})")
+            registry.assign_file(file_name, video_id)
+    path = os.path.join(download_dir, file_name)
+    temp_path = path + ".part"
+    try:
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(temp_path, path)
+    except OSError:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    return file_name
+
+def fetch_transcripts_generator(video_urls, download_dir=None, wait_seconds=REQUEST_TIMEOUT_SECONDS,
+                                workers=DEFAULT_HTTP_WORKERS, positions=None, total=None, on_video=None,
+                                stop=None, registry=None, report=None, session=None, endpoint=None):
+    """
+    The HTTP counterpart of browser_service.open_videos_generator: downloads
+    transcripts straight from the caption tracks, `workers` at a time over
+    one pooled session, and writes the same <title>_transcript.txt files.
+    Yields progress messages.
+
+    Each result is passed to `report` as the userscript would POST it to
+    /api/log ({videoId, title, status, message}). `positions`, `total`,
+    `on_video`, `stop` and `registry` work as in open_videos_generator;
+    network errors get the outcome "error" so download jobs retry them.
+    """
+    positions = positions or range(1, len(video_urls) + 1)
+    total = total or len(video_urls)
+    on_video = on_video or (lambda *args: None)
+    report = report or (lambda entry: None)
+    session = session or get_session()
+    download_dir = download_dir or default_download_dir()
+    timeout = min(wait_seconds or REQUEST_TIMEOUT_SECONDS, REQUEST_TIMEOUT_SECONDS)
+    stop = stop or threading.Event()
+
+    outcomes = {"downloaded": 0, "unavailable": 0, "error": 0, "skipped": 0}
+    todo = []
+    for position, url in zip(positions, video_urls):
+        if registry is not None and completion_service.video_id_from_url(url) in registry:
+            outcomes["skipped"] += 1
+            on_video(position, url, "success", "skipped", None)
+        else:
+            todo.append((position, url))
+    workers = max(1, min(workers, MAX_HTTP_WORKERS, len(todo) or 1))
+    run_stats = metrics.RunStats("http")
+
+    def record_video(outcome, started):
+        run_stats.observe(f"video {outcome}", time.perf_counter() - started, metrics.VIDEO_SECONDS,
+                          engine="http", outcome=outcome)
+
+    def download(position, url):
+        # Returns (position, url, line, state, outcome, entry)
+        if stop.is_set():
+            return position, url, None, "pending", "stopped", None
+        video_id = completion_service.video_id_from_url(url)
+        if not video_id:
+            entry = {"message": "Not a YouTube video URL"}
+            return position, url, f"[{position}/{total}] ERROR: {url}: {entry['message']}", "failed", "error", entry
+        if registry is not None and video_id in registry:
+            return position, url, f"[{position}/{total}] Skipping (already downloaded): {url}", "success", "skipped", None
+
+        on_video(position, url, "in_progress", None, None)
+        started = time.perf_counter()
+        try:
+            title, text, track = fetch_transcript(video_id, session, timeout, endpoint)
+            file_name = save_transcript(download_dir, title, text, video_id, registry)
+        except TranscriptUnavailable as e:
+            record_video("unavailable", started)
+            entry = {"videoId": video_id, "title": None, "status": "FAILED", "message": str(e)}
+            report(entry)
+            return position, url, f"[{position}/{total}] FAILED {video_id}: {e}", "failed", "unavailable", entry
+        except Exception as e:
+            record_video("error", started)
+            entry = {"message": f"{type(e).__name__}: {e}"}
+            return position, url, f"[{position}/{total}] ERROR {video_id}: {entry['message']}", "failed", "error", entry
+
+        seconds = time.perf_counter() - started
+        record_video("downloaded", started)
+        # Same timing fields as the userscript's reports (see LogStore.timings)
+        entry = {"videoId": video_id, "title": title, "status": "SUCCESS", "message": "Downloaded " + file_name,
+                 "totalMs": round(seconds * 1000), "bytes": len(text.encode("utf-8")), "trigger": "http"}
+        report(entry)
+        line = f"[{position}/{total}] SUCCESS in {seconds:.2f}s ({track}): {file_name}"
+        return position, url, line, "success", "downloaded", entry
+
+    executor = None
+    finished = False
+    try:
+        if outcomes["skipped"]:
+            yield f"Skipping {outcomes['skipped']} of {len(video_urls)} videos: already downloaded."
+        if not todo:
+            finished = True
+            yield f"Nothing to download. {outcomes['skipped']} skipped."
+            return
+        yield f"Downloading {len(todo)} transcripts over HTTP with {workers} parallel requests to {download_dir}"
+
+        run_started = time.monotonic()
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="transcript-http")
+        running = {executor.submit(download, position, url) for position, url in todo}
+        while running:
+            done, running = wait(running, timeout=STOP_CHECK_SECONDS, return_when=FIRST_COMPLETED)
+            for future in done:
+                position, url, line, state, outcome, entry = future.result()
+                if outcome == "stopped":
+                    on_video(position, url, state, None, None)
+                    continue
+                if line:
+                    yield line
+                # "unavailable" is a FAILED report, the job must not retry it
+                on_video(position, url, state, "reported" if outcome == "unavailable" else outcome, entry)
+                outcomes[outcome] += 1
+        finished = True
+
+        run_time = time.monotonic() - run_started
+        fetched = outcomes["downloaded"] + outcomes["unavailable"] + outcomes["error"]
+        headline = "Stopped." if stop.is_set() else "All videos processed."
+        yield (f"{headline} {outcomes['downloaded']} downloaded, {outcomes['unavailable']} without transcript, "
+               f"{outcomes['error']} errors, {outcomes['skipped']} skipped; "
+               f"{run_time:.1f}s total, {fetched / run_time if run_time else 0:.1f} videos/s.")
+        yield run_stats.summary(videos=fetched)
+    finally:
+        if not finished:
+            # Client went away: let running downloads finish, start no more
+            stop.set()
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,89 @@
+import os
+import json
+import threading
+from contextlib import contextmanager
+
+# Overrides the API root URL, e.g. to point at benchmarks/fake_youtube_api.py
+YOUTUBE_API_ENDPOINT = os.environ.get("YOUTUBE_API_ENDPOINT")
+
+# Idle clients kept per API key between runs
+MAX_IDLE_CLIENTS_PER_KEY = 16
+
+_discovery_document = None
+_discovery_lock = threading.Lock()
+
+_idle_clients = {}
+_pool_lock = threading.Lock()
+_pool_stats = {"built": 0, "reused": 0}
+
+def get_discovery_document():
+    """
+    Returns the parsed YouTube Data API v3 discovery document.
+    It ships with google-api-python-client, so it is read and parsed only
+    once per process instead of on every build().
+    """
+    global _discovery_document
+    if _discovery_document is None:
+        with _discovery_lock:
+            if _discovery_document is None:
+                from googleapiclient.discovery_cache import get_static_doc
+                _discovery_document = json.loads(get_static_doc("youtube", "v3"))
+    return _discovery_document
+
+def build_client(api_key):
+    """
+    Builds a YouTube Data API client from the cached discovery document,
+    with its own keep-alive HTTP connection. Honours YOUTUBE_API_ENDPOINT.
+    Clients are not thread-safe; use lease_client() to share them.
+    """
+    from googleapiclient.discovery import build_from_document
+    from googleapiclient.http import build_http
+
+    client_options = {"api_endpoint": YOUTUBE_API_ENDPOINT} if YOUTUBE_API_ENDPOINT else None
+    client = build_from_document(
+        get_discovery_document(),
+        developerKey=api_key,
+        http=build_http(),
+        client_options=client_options,
+    )
+    with _pool_lock:
+        _pool_stats["built"] += 1
+    return client
+
+@contextmanager
+def lease_client(api_key):
+    """
+    Lends a client for `api_key` to the calling thread and takes it back
+    afterwards, so later requests reuse its open connection.
+    """
+    with _pool_lock:
+        idle = _idle_clients.get(api_key)
+        client = idle.pop() if idle else None
+        if client is not None:
+            _pool_stats["reused"] += 1
+
+    if client is None:
+        client = build_client(api_key)
+
+    try:
+        yield client
+    finally:
+        with _pool_lock:
+            idle = _idle_clients.setdefault(api_key, [])
+            if len(idle) < MAX_IDLE_CLIENTS_PER_KEY:
+                idle.append(client)
+
+def warm_up():
+    """
+    Does the slow one-time work ahead of the first request: imports the API
+    client and pandas, and parses the discovery document. Meant to run in a
+    background thread right after start-up.
+    """
+    import googleapiclient.discovery  # noqa: F401
+    import services.metadata_service  # noqa: F401  (pulls in pandas)
+    get_discovery_document()
+
+def pool_stats():
+    """Returns counts of clients built and reused since start-up."""
+    with _pool_lock:
+        return dict(_pool_stats, idle=sum(len(clients) for clients in _idle_clients.values()))
@@ -1,13 +1,42 @@
-import pandas as pd
-from googleapiclient.discovery import build
 import os
 from datetime import datetime
-import isodate  # You might need to add this to requirements.txt
+from services import catalog_service, metrics
+from services.api_cache import ResponseCache
+from services.quota_scheduler import QuotaScheduler, QuotaExhausted, DAILY_QUOTA_UNITS
+from services.export_service import EXPORT_FORMATS, RowSpool, open_writer
+from services.youtube_client import lease_client
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 # Store API Key temporarily or pass it in. 
 # For this service, we'll accept it as an argument.
 
-def get_uploads_playlist_id(youtube, channel_id):
+# Number of channels fetched at the same time
+MAX_CONCURRENT_CHANNELS = 4
+
+# Playlist pages fetched ahead of the detail lookups, per channel
+PAGE_BUFFER_SIZE = 2
+
+# Export modes: "full" re-fetches everything, "delta" exports only videos not yet
+# in the local catalog, "merged" exports new videos plus the catalog's known ones
+SYNC_MODES = ("full", "delta", "merged")
+
+# Marks the end of a channel's progress messages
+_CHANNEL_DONE = object()
+
+# Marks the end of a channel's playlist pages
+_PAGES_DONE = object()
+
+def execute_request(request, endpoint):
+    """
+    Runs an API request directly. Callers accept any callable with this
+    signature, so caching and quota scheduling can wrap the call.
+    """
+    return request.execute()
+
+def get_uploads_playlist_id(youtube, channel_id, execute=execute_request):
     """
     Fetches the ID of the 'Uploads' playlist for a given channel.
     """
@@ -15,7 +44,7 @@ def get_uploads_playlist_id(youtube, channel_id):
         id=channel_id,
         part="contentDetails,snippet"  # Added snippet to get channel name
     )
-    response = request.execute()
+    response = execute(request, "channels")
     
     if not response.get("items"):
         raise ValueError(f"Channel ID {channel_id} not found.")
@@ -26,9 +55,11 @@ def get_uploads_playlist_id(youtube, channel_id):
     
     return uploads_id, channel_name
 
-def get_video_details(youtube, video_ids):
+def get_video_details(youtube, video_ids, execute=execute_request):
     """
     Fetches detailed information (duration, tags) for a list of video IDs.
+    Durations are returned as raw ISO-8601 strings ("DurationISO");
+    metadata_service.normalize_page parses them for a whole page at once.
     """
     video_details = {}
     
@@ -39,30 +70,270 @@ def get_video_details(youtube, video_ids):
             id=",".join(chunk),
             part="contentDetails,snippet"
         )
-        response = request.execute()
+        response = execute(request, "videos")
         
         for item in response.get("items", []):
             vid = item["id"]
-            duration_iso = item["contentDetails"].get("duration", "PT0S")
-            duration = isodate.parse_duration(duration_iso)
             
             video_details[vid] = {
-                "Duration": str(duration),
+                "DurationISO": item["contentDetails"].get("duration", "PT0S"),
                 "Tags": ",".join(item["snippet"].get("tags", [])),
                 "CategoryId": item["snippet"].get("categoryId", "")
             }
             
     return video_details
 
-def fetch_channel_videos_generator(api_key, channel_ids_str):
+def _put_until_stopped(pages, item, stop):
+    """Puts `item` on the bounded page queue, giving up once `stop` is set."""
+    while not stop.is_set():
+        try:
+            pages.put(item, timeout=0.5)
+            return
+        except queue.Full:
+            continue
+
+def _fetch_playlist_pages(lease_client, uploads_playlist_id, pages, stop, timings, known_ids, execute, filters):
+    """
+    Producer thread: pages through the uploads playlist and queues each response.
+    The queue is bounded, so at most PAGE_BUFFER_SIZE pages wait for details.
+    Uploads are newest-first, so paging stops at the first page with a known
+    video or with a video older than the filters' published_after date.
+    """
+    try:
+        with lease_client() as youtube:
+            next_page_token = None
+
+            while not stop.is_set():
+                started = time.perf_counter()
+                request = youtube.playlistItems().list(
+                    playlistId=uploads_playlist_id,
+                    part="snippet,contentDetails",
+                    maxResults=50,
+                    pageToken=next_page_token
+                )
+                response = execute(request, "playlistItems")
+                timings["pages"] += time.perf_counter() - started
+
+                _put_until_stopped(pages, response, stop)
+
+                if known_ids and any(
+                    item["snippet"].get("resourceId", {}).get("videoId") in known_ids
+                    for item in response.get("items", [])
+                ):
+                    break
+
+                if filters and any(
+                    filters.is_before_range(item["snippet"]["publishedAt"])
+                    for item in response.get("items", [])
+                ):
+                    break
+
+                next_page_token = response.get("nextPageToken")
+                if not next_page_token:
+                    break
+    except Exception as e:
+        _put_until_stopped(pages, e, stop)
+    finally:
+        _put_until_stopped(pages, _PAGES_DONE, stop)
+
+def fetch_channel_videos(lease_client, channel_id, emit, sink, sync_mode="full", execute=execute_request,
+                         filters=None):
+    """
+    Fetches the uploads of a single channel and records them in the catalog.
+    The next playlist page is requested while details for the current page
+    resolve. `lease_client()` must return a context manager that lends a
+    client to the calling thread (see youtube_client.lease_client).
+    Rows are handed to `sink(rows)` one page at a time, so memory does not
+    grow with the channel size.
+    With sync_mode "delta" or "merged" only videos missing from the catalog
+    are fetched; see SYNC_MODES for what is passed on.
+    Active `filters` (filter_service.VideoFilters) drop videos as early as
+    possible; a filtered run only reads the catalog, since its rows are not
+    a complete picture of the channel.
+    API calls go through `execute` (see execute_request).
+    Progress messages are passed to `emit`; returns (channel_name, video_count).
+    """
+    with lease_client() as youtube:
+        return _fetch_channel_videos(youtube, lease_client, channel_id, emit, sink, sync_mode, execute, filters)
+
+def _fetch_channel_videos(youtube, lease_client, channel_id, emit, sink, sync_mode, execute, filters):
+    """Body of fetch_channel_videos, run with a leased client."""
+    from services.metadata_service import normalize_page
+
+    channel_started = time.perf_counter()
+
+    emit(f"Resolving Channel ID {channel_id}...")
+    uploads_playlist_id, channel_name = get_uploads_playlist_id(youtube, channel_id, execute)
+    emit(f"Found Channel: {channel_name}")
+
+    known_ids = set()
+    stop_at_known = False
+    if sync_mode != "full":
+        known_ids = catalog_service.get_known_video_ids(channel_id)
+        # After an interrupted sync the catalog has gaps, so page through everything
+        stop_at_known = catalog_service.is_channel_complete(channel_id)
+        emit(f"Catalog has {len(known_ids)} known videos for this channel.")
+
+    if filters and not filters.is_active:
+        filters = None
+    write_catalog = filters is None
+
+    video_count = 0
+    skipped_before_details = 0
+    skipped_after_details = 0
+    new_ids = set()
+    partial = False
+    page_count = 0
+    timings = {"pages": 0.0, "details": 0.0, "waiting": 0.0}
+
+    emit(f"Starting video fetch for playlist: {uploads_playlist_id}")
+
+    # Flagged incomplete until the fetch finishes: if the run stops early, the next
+    # incremental sync must not stop at the newest uploads, or the missing older
+    # ones would never be fetched
+    if write_catalog:
+        catalog_service.save_channel(channel_id, channel_name, uploads_playlist_id, complete=False)
+
+    pages = queue.Queue(maxsize=PAGE_BUFFER_SIZE)
+    stop = threading.Event()
+    producer = threading.Thread(
+        target=_fetch_playlist_pages,
+        args=(lease_client, uploads_playlist_id, pages, stop, timings,
+              known_ids if stop_at_known else None, execute, filters),
+        daemon=True
+    )
+    producer.start()
+
+    try:
+        while True:
+            started = time.perf_counter()
+            response = pages.get()
+            timings["waiting"] += time.perf_counter() - started
+
+            if response is _PAGES_DONE:
+                break
+            if isinstance(response, Exception):
+                raise response
+
+            page_count += 1
+
+            video_ids_in_batch = []
+            batch_items = []
+            published_at = {}
+
+            for item in response.get("items", []):
+                snippet = item["snippet"]
+                # Skip private/deleted videos
+                if "resourceId" not in snippet:
+                    continue
+                vid_id = snippet["resourceId"]["videoId"]
+                # Already in the catalog, no need for details
+                if vid_id in known_ids:
+                    continue
+                # Outside the date range or title filter, no need for details
+                if filters and not filters.accepts_snippet(snippet):
+                    skipped_before_details += 1
+                    continue
+                video_ids_in_batch.append(vid_id)
+                batch_items.append(item)
+                published_at[vid_id] = snippet["publishedAt"]
+
+            emit(f"  > Page {page_count}: Found {len(video_ids_in_batch)} videos.")
+
+            # Fetch extra details (duration)
+            if video_ids_in_batch:
+                started = time.perf_counter()
+                details_map = get_video_details(youtube, video_ids_in_batch, execute)
+                timings["details"] += time.perf_counter() - started
+
+                videos = normalize_page(batch_items, details_map)
+                new_ids.update(video_ids_in_batch)
+
+                if filters:
+                    kept = [video for video in videos if filters.accepts_row(video)]
+                    skipped_after_details += len(videos) - len(kept)
+                    videos = kept
+                else:
+                    catalog_service.save_videos(channel_id, videos, published_at)
+
+                sink(videos)
+                video_count += len(videos)
+    except QuotaExhausted as e:
+        # Keep what we have rather than dropping the whole channel
+        partial = True
+        emit(f"  > {e}. Keeping the {video_count} videos fetched so far for this channel; the export "
+             f"will be partial. Run a 'merged' sync after the daily quota reset (midnight Pacific) "
+             f"to complete it.")
+    finally:
+        # Unblocks the producer if we stopped early
+        stop.set()
+
+    if partial and write_catalog:
+        emit("  > Channel marked incomplete; the next sync will page through all uploads.")
+    elif write_catalog:
+        catalog_service.save_channel(channel_id, channel_name, uploads_playlist_id, complete=True)
+
+    if filters:
+        emit(f"  > Filters: skipped {skipped_before_details} videos before detail lookups "
+             f"and {skipped_after_details} after.")
+
+    if sync_mode != "full":
+        emit(f"Sync: {len(new_ids)} new videos since last run.")
+    if sync_mode == "merged":
+        for batch in catalog_service.iter_channel_videos(channel_id, exclude_ids=new_ids):
+            if filters:
+                batch = [video for video in batch if filters.accepts_row(video)]
+            sink(batch)
+            video_count += len(batch)
+
+    emit(f"Channel Complete. Collected {video_count} videos.")
+    emit(
+        f"  > Timings: pages {timings['pages']:.2f}s, details {timings['details']:.2f}s, "
+        f"waiting for pages {timings['waiting']:.2f}s, total {time.perf_counter() - channel_started:.2f}s"
+    )
+    return channel_name, video_count
+
+def export_filename(first_channel_name, channel_count, sync_mode, export_format):
+    """
+    Builds the timestamped export file name, e.g. Channel_Name_20240101_120000.xlsx.
+    """
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    safe_channel_name = "".join([c for c in first_channel_name if c.isalnum() or c in (' ', '-', '_')]).strip()
+
+    # Delta exports only hold new videos, mark them so they are not mistaken for a full list
+    suffix = "_new" if sync_mode == "delta" else ""
+
+    # If multiple channels, append "and_others"
+    if channel_count > 1:
+        return f"MultiChannel_{safe_channel_name}_and_others{suffix}_{timestamp}.{export_format}"
+    return f"Channel_{safe_channel_name}{suffix}_{timestamp}.{export_format}"
+
+def fetch_channel_videos_generator(api_key, channel_ids_str, max_workers=MAX_CONCURRENT_CHANNELS, sync_mode="full",
+                                   use_cache=True, quota_budget=DAILY_QUOTA_UNITS, export_format="xlsx",
+                                   filters=None, wait_for_quota_reset=False):
     """
     Generator that yields progress messages and finally the filename.
     Accepts comma-separated channel IDs.
+    `sync_mode` is one of SYNC_MODES. With `use_cache` API responses are
+    served from the on-disk ResponseCache where possible. Calls that reach
+    the API go through a QuotaScheduler limited to `quota_budget` units;
+    when the quota runs out, channels keep what they fetched (a partial
+    export) unless `wait_for_quota_reset`, which waits for the daily reset.
+    Channels are fetched by up to `max_workers` threads; each channel's messages
+    are streamed in channel order so the output matches a sequential run.
+    Rows are spooled to disk per channel and streamed into the export file
+    (`export_format`, one of EXPORT_FORMATS), so memory stays flat.
+    `filters` (filter_service.VideoFilters) limits which videos are fetched.
     """
+    executor = None
+    scheduler = None
+    spools = []
+    writer = None
+    filepath = None
+    finished = False
     try:
         yield f"Connecting to YouTube API..."
-        youtube = build("youtube", "v3", developerKey=api_key)
-        
+
         # Split and clean IDs
         channel_ids = [cid.strip() for cid in channel_ids_str.split(',') if cid.strip()]
         
@@ -70,111 +341,158 @@ def fetch_channel_videos_generator(api_key, channel_ids_str):
             yield "Error: No valid Channel IDs provided."
             return
 
-        all_videos = []
-        first_channel_name = "Unknown"
+        if sync_mode not in SYNC_MODES:
+            yield f"Error: Unknown sync mode '{sync_mode}'."
+            return
 
-        for idx, channel_id in enumerate(channel_ids):
-            yield f"--- Processing Channel {idx+1}/{len(channel_ids)}: {channel_id} ---"
-            
+        if export_format not in EXPORT_FORMATS:
+            yield f"Error: Unknown export format '{export_format}'."
+            return
+
+        if filters and filters.is_active:
+            yield f"Filters: {filters.describe()}"
+
+        workers = max(1, min(int(max_workers or 1), len(channel_ids)))
+        if workers > 1:
+            yield f"Fetching {len(channel_ids)} channels with up to {workers} parallel workers..."
+
+        from services.metadata_service import VIDEO_COLUMNS
+
+        # googleapiclient objects are not thread-safe, so each thread leases its own
+        # from a pool that keeps clients (and their connections) between runs
+        def lease():
+            return lease_client(api_key)
+
+        cache = ResponseCache() if use_cache else None
+        scheduler = QuotaScheduler(budget=quota_budget, wait_for_reset=wait_for_quota_reset)
+        run_stats = metrics.RunStats("fetch")
+
+        def timed_request(request, endpoint, spent):
+            # One HTTP request; the scheduler calls this again for each retry
+            started = time.perf_counter()
+            status = "200"
             try:
-                yield f"Resolving Channel ID {channel_id}..."
-                uploads_playlist_id, channel_name = get_uploads_playlist_id(youtube, channel_id)
-                yield f"Found Channel: {channel_name}"
-                
-                if idx == 0:
-                    first_channel_name = channel_name
-                
-                videos = []
-                next_page_token = None
-                page_count = 0
-                
-                yield f"Starting video fetch for playlist: {uploads_playlist_id}"
-        
-                while True:
-                    page_count += 1
-                    # yield f"Fetching page {page_count}..." # Reduce noise
-                    
-                    request = youtube.playlistItems().list(
-                        playlistId=uploads_playlist_id,
-                        part="snippet,contentDetails",
-                        maxResults=50,
-                        pageToken=next_page_token
-                    )
-                    response = request.execute()
-        
-                    video_ids_in_batch = []
-                    batch_items = []
-        
-                    for item in response.get("items", []):
-                        snippet = item["snippet"]
-                        # Skip private/deleted videos
-                        if "resourceId" not in snippet:
-                            continue
-                        vid_id = snippet["resourceId"]["videoId"]
-                        video_ids_in_batch.append(vid_id)
-                        batch_items.append(item)
-        
-                    yield f"  > Page {page_count}: Found {len(video_ids_in_batch)} videos."
-        
-                    # Fetch extra details (duration)
-                    if video_ids_in_batch:
-                        # yield f"  > Fetching details..."
-                        details_map = get_video_details(youtube, video_ids_in_batch)
-                        
-                        for item in batch_items:
-                            snippet = item["snippet"]
-                            vid_id = snippet["resourceId"]["videoId"]
-                            details = details_map.get(vid_id, {})
-                            
-                            video_data = {
-                                "Video Title": snippet["title"],
-                                "Channel": snippet["channelTitle"],
-                                "Published Date": pd.to_datetime(snippet["publishedAt"]).date(),
-                                "Video URL": f"https://www.youtube.com/watch?v={vid_id}",
-                                "Description": snippet["description"],
-                                "Video ID": vid_id,
-                                "Duration": details.get("Duration", "N/A"),
-                                "Tags": details.get("Tags", ""),
-                                "Type": "Video"
-                            }
-                            videos.append(video_data)
-        
-                    next_page_token = response.get("nextPageToken")
-                    
-                    if not next_page_token:
-                        break
-                
-                yield f"Channel Complete. Collected {len(videos)} videos."
-                all_videos.extend(videos)
+                return request.execute()
+            except Exception as e:
+                status = str(getattr(getattr(e, "resp", None), "status", None) or "error")
+                raise
+            finally:
+                seconds = time.perf_counter() - started
+                spent.append(seconds)
+                metrics.API_CALLS.inc(endpoint=endpoint, status=status)
+                run_stats.observe(f"{endpoint} calls", seconds, metrics.API_CALL_SECONDS, endpoint=endpoint)
+
+        def make_execute(emit):
+            def scheduled(request, endpoint):
+                # Whatever the scheduler adds around the requests is rate limiting and backoff
+                spent = []
+                started = time.perf_counter()
+                try:
+                    return scheduler.execute(request, endpoint, emit,
+                                             lambda req, ep: timed_request(req, ep, spent))
+                finally:
+                    run_stats.count("throttled seconds", time.perf_counter() - started - sum(spent),
+                                    metrics.API_THROTTLE_SECONDS, endpoint=endpoint)
+
+            # Cache hits are answered locally and cost no quota
+            def execute(request, endpoint):
+                if cache:
+                    missed = []
+                    response = cache.execute(request, endpoint,
+                                             lambda req, ep: missed.append(ep) or scheduled(req, ep))
+                    if not missed:
+                        run_stats.count("cache hits", 1, metrics.API_CACHE_HITS, endpoint=endpoint)
+                else:
+                    response = scheduled(request, endpoint)
+                if endpoint == "playlistItems":
+                    run_stats.count("pages")
+                return response
+            return execute
 
+        message_queues = [queue.Queue() for _ in channel_ids]
+        results = [None] * len(channel_ids)
+        spools = [RowSpool() for _ in channel_ids]
+
+        def process_channel(idx, channel_id):
+            emit = message_queues[idx].put
+            emit(f"--- Processing Channel {idx+1}/{len(channel_ids)}: {channel_id} ---")
+            try:
+                results[idx] = fetch_channel_videos(lease, channel_id, emit, spools[idx].write,
+                                                    sync_mode, make_execute(emit), filters)
             except Exception as e:
-                yield f"Error processing channel {channel_id}: {str(e)}"
-                continue # Try next channel
-
-        if all_videos:
-            yield f"--- Total: {len(all_videos)} videos collected from {len(channel_ids)} channels ---"
-            if not os.path.exists('uploads'):
-                os.makedirs('uploads')
-                
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            safe_channel_name = "".join([c for c in first_channel_name if c.isalnum() or c in (' ', '-', '_')]).strip()
-            
-            # If multiple channels, append "and_others"
-            if len(channel_ids) > 1:
-                filename = f"MultiChannel_{safe_channel_name}_and_others_{timestamp}.xlsx"
-            else:
-                filename = f"Channel_{safe_channel_name}_{timestamp}.xlsx"
-
-            filepath = os.path.join('uploads', filename)
-            abs_path = os.path.abspath(filepath)
-            
-            df = pd.DataFrame(all_videos)
-            df.to_excel(filepath, index=False)
-            
+                emit(f"Error processing channel {channel_id}: {str(e)}")
+            finally:
+                emit(_CHANNEL_DONE)
+
+        executor = ThreadPoolExecutor(max_workers=workers)
+        for idx, channel_id in enumerate(channel_ids):
+            executor.submit(process_channel, idx, channel_id)
+
+        # Drain channel queues in order: the current channel streams live,
+        # later channels buffer until it finishes. Each finished channel's
+        # rows are then copied from its spool into the export file.
+        total_videos = 0
+        export_seconds = 0.0
+        for idx, message_queue in enumerate(message_queues):
+            while True:
+                message = message_queue.get()
+                if message is _CHANNEL_DONE:
+                    break
+                yield message
+
+            spool = spools[idx]
+            if spool.count:
+                started = time.perf_counter()
+                if writer is None:
+                    if not os.path.exists('uploads'):
+                        os.makedirs('uploads')
+                    first_channel_name = results[0][0] if results[0] else "Unknown"
+                    filename = export_filename(first_channel_name, len(channel_ids), sync_mode, export_format)
+                    filepath = os.path.join('uploads', filename)
+                    writer = open_writer(filepath, export_format, VIDEO_COLUMNS)
+                for batch in spool.batches():
+                    writer.write_rows(batch)
+                total_videos += spool.count
+                export_seconds += time.perf_counter() - started
+            spool.close()
+
+        if cache:
+            yield cache.summary()
+        yield scheduler.summary()
+        run_stats.count("quota units", scheduler.spent, metrics.QUOTA_UNITS)
+        metrics.VIDEOS_FETCHED.inc(total_videos)
+
+        if writer:
+            yield f"--- Total: {total_videos} videos collected from {len(channel_ids)} channels ---"
+            started = time.perf_counter()
+            writer.close()
+            finished = True
+            export_seconds += time.perf_counter() - started
+            run_stats.observe("export", export_seconds, metrics.EXPORT_SECONDS, format=export_format)
+            yield f"Export: wrote {total_videos} rows as {export_format} in {export_seconds:.2f}s"
+
             yield f"Success! Saved to: {filename}"
-            yield f"Full Path: {abs_path}" 
+            yield f"Full Path: {os.path.abspath(filepath)}" 
+        elif sync_mode == "delta":
+            yield "No new videos since the last sync."
         else:
              yield "Error: No videos found."
+        yield run_stats.summary(videos=total_videos)
 
     except Exception as e:
         yield f"Critical Error: {str(e)}"
+    finally:
+        if scheduler:
+            scheduler.close()  # ends any wait for the quota reset
+        if executor:
+            # Client may have disconnected; drop channels that have not started yet
+            executor.shutdown(wait=False, cancel_futures=True)
+        for spool in spools:
+            spool.close()
+        if writer and not finished:
+            # Do not leave a half-written export behind
+            try:
+                writer.close()
+                os.remove(filepath)
+            except Exception:
+                pass
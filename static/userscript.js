@@ -1,7 +1,7 @@
 // ==UserScript==
 // @name         YouTube Auto Transcript Opener & Downloader (Fixed)
 // @namespace    http://tampermonkey.net/
-// @version      3.1
+// @version      4.3
 // @description  Open transcript panel and download transcript as text file. PREVENTS DUPLICATES.
 // @match        https://www.youtube.com/watch*
 // @grant        none
@@ -10,9 +10,25 @@
 (function () {
     'use strict';
 
-    let lastVideoId = null;
-    let attempts = 0;
-    const maxAttempts = 15;
+    const SERVER = 'http://localhost:5000';
+
+    // Longest waits for the transcript button and for the transcript text
+    const BUTTON_TIMEOUT_MS = 20000;
+    const SEGMENTS_TIMEOUT_MS = 15000;
+
+    // If the panel has not opened this long after a click (page still hydrating), click again
+    const PANEL_OPEN_TIMEOUT_MS = 1500;
+    const MAX_CLICKS = 5;
+
+    // Segments are rendered in chunks; the list counts as complete after this long without new ones
+    const SEGMENTS_SETTLE_MS = 200;
+
+    const BUTTON_SELECTOR = 'button[aria-label="Show transcript"], ' +
+        'ytd-video-description-transcript-section-renderer button';
+    const SEGMENT_TEXT_SELECTOR = '#segments-container ytd-transcript-segment-renderer .segment-text';
+
+    let currentRun = null;
+    let navigationStarted = null;
 
     // --- HELPER: LOGGING ---
     // We use a prefix to easily spot our logs
@@ -48,18 +64,27 @@
         sessionStorage.setItem('subs_downloaded_' + videoId, 'true');
     }
 
+    // Asks the local server whether this video was downloaded in an earlier
+    // session. Resolves false if the server is not running.
+    function checkServerRegistry(videoId) {
+        return fetch(SERVER + '/api/downloaded/' + encodeURIComponent(videoId))
+            .then(response => response.ok ? response.json() : { downloaded: false })
+            .then(data => data.downloaded === true)
+            .catch(() => false);
+    }
+
     // --- API REPORTING ---
-    function reportToLocalServer(videoId, title, status, message) {
-        // Try to report to localhost
-        // Use GM_xmlhttpRequest if available, otherwise fetch
-        const data = {
+    // `timing` adds timeToButtonMs, timeToSegmentsMs, totalMs, segmentCount
+    // and bytes, so the server can measure per-video latency.
+    function reportToLocalServer(videoId, title, status, message, timing) {
+        const data = Object.assign({
             videoId: videoId,
             title: title,
             status: status,
             message: message
-        };
+        }, timing || {});
 
-        fetch('http://localhost:5000/api/log', {
+        fetch(SERVER + '/api/log', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -70,47 +95,106 @@
             .catch(error => console.log('Failed to report to server:', error));
     }
 
-    function extractAndDownloadTranscript() {
-        const currentVideoId = getVideoId();
-        const videoTitle = getVideoTitle();
+    // A skipped video still gets a report, so an automation run waiting for
+    // it moves on instead of timing out. SKIPPED keeps it out of the success
+    // counts and timings. `title` may be null (page not loaded yet).
+    function reportSkipped(videoId, title, reason) {
+        log('Skipping ' + videoId + ' (' + reason + ')');
+        reportToLocalServer(videoId, title, 'SKIPPED', 'Skipped (' + reason + ')');
+    }
 
-        // Double check before downloading
-        if (hasAlreadyDownloaded(currentVideoId)) {
-            log('Already downloaded this session. Skipping.');
-            return true; // Return true so we stop trying
-        }
+    // --- DOM WAITING ---
+    // Resolves with find()'s result as soon as it is truthy, checking again on
+    // DOM mutations instead of polling. Rejects after timeoutMs, or with
+    // 'cancelled' when the run is dropped (navigation to another video).
+    function waitFor(find, timeoutMs, run, what) {
+        return new Promise((resolve, reject) => {
+            const found = find();
+            if (found) return resolve(found);
+
+            const observer = new MutationObserver(() => {
+                const result = find();
+                if (result) finish(resolve, result);
+            });
+            const timer = setTimeout(() => finish(reject, new Error(what + ' not found')), timeoutMs);
+            const cancel = () => finish(reject, new Error('cancelled'));
+            function finish(settle, value) {
+                observer.disconnect();
+                clearTimeout(timer);
+                run.cleanups.delete(cancel);
+                settle(value);
+            }
 
-        const container = document.querySelector('#segments-container');
+            observer.observe(document.documentElement, {
+                childList: true, subtree: true, attributes: true, attributeFilter: ['aria-label', 'hidden']
+            });
+            run.cleanups.add(cancel);
+        });
+    }
 
-        if (!container) {
-            log('Transcript container not found yet...');
-            return false;
-        }
+    // Resolves once `container` has had no new children for SEGMENTS_SETTLE_MS
+    function waitForSettle(container, run) {
+        return new Promise((resolve, reject) => {
+            let timer = setTimeout(() => finish(resolve), SEGMENTS_SETTLE_MS);
+            const observer = new MutationObserver(() => {
+                clearTimeout(timer);
+                timer = setTimeout(() => finish(resolve), SEGMENTS_SETTLE_MS);
+            });
+            const cancel = () => finish(reject, new Error('cancelled'));
+            function finish(settle, value) {
+                observer.disconnect();
+                clearTimeout(timer);
+                run.cleanups.delete(cancel);
+                settle(value);
+            }
 
-        const segments = container.querySelectorAll('ytd-transcript-segment-renderer');
+            observer.observe(container, { childList: true, subtree: true });
+            run.cleanups.add(cancel);
+        });
+    }
 
-        if (segments.length === 0) {
-            log('No transcript segments found yet...');
-            return false;
-        }
+    function findSegmentsContainer() {
+        const first = document.querySelector(SEGMENT_TEXT_SELECTOR);
+        return first && first.textContent.trim() ? document.querySelector('#segments-container') : null;
+    }
 
-        let transcriptText = '';
+    function since(run) {
+        return Math.round(performance.now() - run.started);
+    }
 
-        segments.forEach(segment => {
-            const textElement = segment.querySelector('.segment-text');
-            if (textElement) {
-                transcriptText += textElement.textContent.trim() + ' ';
+    // Clicks "Show transcript" until the panel opens; clicks made while the
+    // page is still hydrating are ignored by YouTube
+    async function openTranscriptPanel(run) {
+        for (let click = 1; click <= MAX_CLICKS; click++) {
+            if (isTranscriptOpen() || findSegmentsContainer()) return;
+            const button = await waitFor(() => document.querySelector(BUTTON_SELECTOR), BUTTON_TIMEOUT_MS, run,
+                'Transcript button');
+            if (run.timing.timeToButtonMs === undefined) run.timing.timeToButtonMs = since(run);
+            button.click();
+            try {
+                await waitFor(() => isTranscriptOpen() || document.querySelector('#segments-container'),
+                    PANEL_OPEN_TIMEOUT_MS, run, 'Transcript panel');
+                return;
+            } catch (err) {
+                if (err.message === 'cancelled') throw err;
+                log('Transcript panel did not open, clicking again (' + click + ')');
             }
-        });
-
-        if (transcriptText.trim().length === 0) {
-            return false;
         }
+    }
 
-        // Create and download the file
-        const fileName = sanitizeFileName(videoTitle) + '_transcript.txt';
+    // --- MAIN FLOW ---
+    function extractTranscriptText(container) {
+        // One pass over the segments, joined once at the end
+        const texts = [];
+        container.querySelectorAll('ytd-transcript-segment-renderer .segment-text').forEach(el => {
+            const text = el.textContent.trim();
+            if (text) texts.push(text);
+        });
+        return { text: texts.join(' '), segmentCount: texts.length };
+    }
 
-        const blob = new Blob([transcriptText.trim()], { type: 'text/plain' });
+    function downloadText(fileName, text) {
+        const blob = new Blob([text], { type: 'text/plain' });
         const url = URL.createObjectURL(blob);
         const a = document.createElement('a');
         a.href = url;
@@ -119,96 +203,89 @@
         a.click();
         document.body.removeChild(a);
         URL.revokeObjectURL(url);
-
-        log('Transcript downloaded: ' + fileName);
-
-        // --- MARK AS DONE & REPORT ---
-        markAsDownloaded(currentVideoId);
-        reportToLocalServer(currentVideoId, videoTitle, 'SUCCESS', 'Downloaded ' + fileName);
-
-        return true;
+        return blob.size;
     }
 
-    function waitForTranscriptAndDownload() {
-        let downloadAttempts = 0;
-        const maxDownloadAttempts = 20;
-
-        const checkInterval = setInterval(() => {
-            downloadAttempts++;
-
-            // Abort if ID changed mid-process
-            if (getVideoId() !== lastVideoId) {
-                clearInterval(checkInterval);
-                return;
-            }
-
-            if (extractAndDownloadTranscript()) {
-                clearInterval(checkInterval);
-            } else if (downloadAttempts >= maxDownloadAttempts) {
-                log('Could not extract transcript after maximum attempts');
-                reportToLocalServer(getVideoId(), getVideoTitle(), 'FAILED', 'Transcript not found or empty after timeout');
-                clearInterval(checkInterval);
-            }
-        }, 500);
-    }
-
-    function clickTranscript() {
-        const currentVideoId = getVideoId();
-
-        // If ID changed or null, reset state
-        if (currentVideoId !== lastVideoId) {
-            attempts = 0;
-            lastVideoId = currentVideoId;
-        }
-
-        if (!currentVideoId) return;
-
-        // --- CHECK HISTORY ---
-        if (hasAlreadyDownloaded(currentVideoId)) {
-            log('Skipping ' + currentVideoId + ' (Already Done)');
-            return;
-        }
-
-        if (attempts >= maxAttempts) {
-            log('Max attempts reached for opening panel.');
+    async function processVideo(run) {
+        const videoId = run.videoId;
+        // Ask the server first: a video downloaded before is skipped without
+        // waiting for its transcript panel (or its timeout, if it has none)
+        if (await checkServerRegistry(videoId)) {
+            if (run !== currentRun) return;
+            markAsDownloaded(videoId);
+            reportSkipped(videoId, null, 'already downloaded, per server');
             return;
         }
-
-        if (isTranscriptOpen()) {
-            waitForTranscriptAndDownload();
-            return;
+        if (run !== currentRun) return;
+
+        try {
+            await openTranscriptPanel(run);
+            const container = await waitFor(findSegmentsContainer, SEGMENTS_TIMEOUT_MS, run, 'Transcript');
+            await waitForSettle(container, run);
+            run.timing.timeToSegmentsMs = since(run);
+            if (run !== currentRun) return;
+
+            const { text, segmentCount } = extractTranscriptText(container);
+            if (!text) throw new Error('Transcript not found or empty');
+
+            const videoTitle = getVideoTitle();
+            const fileName = sanitizeFileName(videoTitle) + '_transcript.txt';
+            run.timing.segmentCount = segmentCount;
+            run.timing.bytes = downloadText(fileName, text);
+            run.timing.totalMs = since(run);
+
+            log('Transcript downloaded: ' + fileName + ' (' + run.timing.totalMs + ' ms)');
+
+            // --- MARK AS DONE & REPORT ---
+            markAsDownloaded(videoId);
+            reportToLocalServer(videoId, videoTitle, 'SUCCESS', 'Downloaded ' + fileName, run.timing);
+        } catch (err) {
+            if (err.message === 'cancelled' || run !== currentRun) return;
+            run.timing.totalMs = since(run);
+            const message = err.message.startsWith('Transcript not found')
+                ? 'Transcript not found or empty after timeout' : err.message + ' after timeout';
+            log('Could not extract transcript: ' + message);
+            reportToLocalServer(videoId, getVideoTitle(), 'FAILED', message, run.timing);
         }
+    }
 
-        attempts++;
+    // Starts on the current video unless it is already being handled.
+    // Timings count from `started` (performance.now() of the page load or SPA navigation).
+    function start(trigger, started) {
+        const videoId = getVideoId();
+        if (!videoId) return;
+        if (currentRun && currentRun.videoId === videoId) return;
 
-        const transcriptBtn = document.querySelector('button[aria-label="Show transcript"]');
-        const secondaryBtn = document.querySelector('button[aria-label="Show transcript"]'); // sometimes selector varies
+        if (currentRun) {
+            currentRun.cleanups.forEach(cancel => cancel());
+            currentRun = null;
+        }
 
-        if (transcriptBtn) {
-            transcriptBtn.click();
-            // Wait for panel to open and load
-            setTimeout(() => {
-                waitForTranscriptAndDownload();
-            }, 1000);
+        // --- CHECK HISTORY ---
+        if (hasAlreadyDownloaded(videoId)) {
+            reportSkipped(videoId, null, 'already downloaded in this session');
             return;
         }
 
-        // Retry
-        setTimeout(clickTranscript, 800);
+        log('Watching for the transcript of ' + videoId + ' (' + trigger + ')');
+        currentRun = { videoId: videoId, started: started, cleanups: new Set(), timing: { trigger: trigger } };
+        processVideo(currentRun);
     }
 
     // --- EVENT LISTENERS ---
 
-    // 1. Initial Load (Increased delay for Selenium automation)
-    if (getVideoId()) {
-        setTimeout(clickTranscript, 5000); // Wait longer for page hydration in automation
-    }
+    // 1. Initial Load: no fixed delay, the observers wait for the page
+    start('load', 0);
 
-    // 2. Navigation (SPA behavior)
+    // 2. Navigation (SPA behavior). The automation also dispatches
+    // yt-navigate-finish after a page load; the same video is not started twice.
+    window.addEventListener('yt-navigate-start', () => {
+        navigationStarted = performance.now();
+    });
     window.addEventListener('yt-navigate-finish', () => {
         log('Navigation detected.');
-        attempts = 0; // Reset attempts for new video
-        setTimeout(clickTranscript, 1500);
+        start('navigate', navigationStarted === null ? performance.now() : navigationStarted);
+        navigationStarted = null;
     });
 
 })();